@@ -0,0 +1,241 @@
+# 채팅 기록 분석 롤업 (자주 묻는 질문 / 답변하지 못한 질문 / 문서별 인용 수)
+# chat_messages 원본을 매번 훑지 않도록, 마지막으로 처리한 message_id(워터마크) 이후의 새 행만 읽어
+# 롤업 테이블에 누적합니다. 결과는 캐시 사전 준비 목록과 대시보드(dashboard.py)에서 사용합니다.
+# 사용법 (한밭대챗봇 폴더에서):
+#   python analytics.py run        # 새 메시지 집계 (cron 등으로 주기 실행)
+#   python analytics.py report     # 상위 질문 / 미답변 질문 / 문서 인용 수 출력
+import argparse
+import os
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+
+import config
+
+JOB_NAME = "chat_rollup"
+SOURCES_MARKER = "--- 참고 문서 ---" # save_message에 저장되는 복사 텍스트의 참고 문서 구분선
+FALLBACK_MARKERS = ("찾을 수 없습니다",) # 문서에서 답을 찾지 못했을 때의 안내 문구
+ERROR_MARKER = "⚠️"
+
+
+def ensure_tables(conn):
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS analytics_state (
+            job TEXT PRIMARY KEY,
+            last_message_id INTEGER NOT NULL,
+            updated_at TEXT
+        );
+        CREATE TABLE IF NOT EXISTS analytics_daily (
+            day TEXT PRIMARY KEY,
+            questions INTEGER NOT NULL DEFAULT 0,
+            answers INTEGER NOT NULL DEFAULT 0,
+            fallback_answers INTEGER NOT NULL DEFAULT 0,
+            error_answers INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS analytics_source_citations (
+            source TEXT,
+            day TEXT,
+            citations INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (source, day)
+        );
+        CREATE TABLE IF NOT EXISTS analytics_question_clusters (
+            cluster_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            representative TEXT,
+            centroid BLOB,
+            question_count INTEGER NOT NULL DEFAULT 0,
+            fallback_count INTEGER NOT NULL DEFAULT 0,
+            last_seen TEXT
+        );
+        CREATE TABLE IF NOT EXISTS analytics_cluster_members (
+            message_id INTEGER PRIMARY KEY,
+            cluster_id INTEGER
+        );
+    ''')
+
+
+def parse_cited_sources(content):
+    if SOURCES_MARKER not in content:
+        return []
+    tail = content.rsplit(SOURCES_MARKER, 1)[1].strip()
+    return [s.strip() for s in tail.split(",") if s.strip()]
+
+
+def is_fallback_answer(content):
+    return any(marker in content for marker in FALLBACK_MARKERS)
+
+
+class QuestionClusterer:
+    # 질문 임베딩을 코사인 유사도로 가장 가까운 군집에 배정하고, 임계값 미만이면 새 군집을 만듭니다.
+    # 군집 중심은 배정될 때마다 이동 평균으로 갱신합니다.
+    def __init__(self, conn, threshold=None):
+        self.conn = conn
+        self.threshold = threshold or config.ANALYTICS_CLUSTER_THRESHOLD
+        rows = conn.execute("SELECT cluster_id, centroid, question_count FROM analytics_question_clusters").fetchall()
+        self.ids = [r[0] for r in rows]
+        self.counts = [r[2] for r in rows]
+        self.centroids = np.array([np.frombuffer(r[1], dtype="float32") for r in rows], dtype="float32")
+
+    def assign(self, question, vector, timestamp):
+        vector = np.asarray(vector, dtype="float32")
+        vector /= np.linalg.norm(vector) or 1.0
+        if len(self.ids):
+            similarities = self.centroids @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.threshold:
+                n = self.counts[best] + 1
+                centroid = self.centroids[best] * (n - 1) / n + vector / n
+                self.centroids[best] = centroid / (np.linalg.norm(centroid) or 1.0)
+                self.counts[best] = n
+                self.conn.execute(
+                    "UPDATE analytics_question_clusters SET centroid = ?, question_count = ?, last_seen = ? WHERE cluster_id = ?",
+                    (self.centroids[best].tobytes(), n, timestamp, self.ids[best]))
+                return self.ids[best]
+        cursor = self.conn.execute(
+            "INSERT INTO analytics_question_clusters (representative, centroid, question_count, last_seen) VALUES (?, ?, 1, ?)",
+            (question, vector.tobytes(), timestamp))
+        self.ids.append(cursor.lastrowid)
+        self.counts.append(1)
+        self.centroids = vector.reshape(1, -1) if not len(self.centroids) else np.vstack([self.centroids, vector])
+        return cursor.lastrowid
+
+
+def run_incremental(db_name, embeddings_model, batch_size=None):
+    # 워터마크 이후의 새 메시지만 배치 단위로 집계합니다. 배치마다 롤업과 워터마크를 한 트랜잭션으로 커밋하므로
+    # 중간에 중단돼도 같은 행을 두 번 세지 않습니다. 처리한 메시지 수를 반환합니다.
+    batch_size = batch_size or config.ANALYTICS_BATCH_SIZE
+    conn = sqlite3.connect(db_name)
+    ensure_tables(conn)
+    row = conn.execute("SELECT last_message_id FROM analytics_state WHERE job = ?", (JOB_NAME,)).fetchone()
+    watermark = row[0] if row else 0
+    clusterer = QuestionClusterer(conn)
+    processed = 0
+    try:
+        while True:
+            rows = conn.execute(
+                "SELECT message_id, session_id, role, content, timestamp FROM chat_messages "
+                "WHERE message_id > ? ORDER BY message_id LIMIT ?", (watermark, batch_size)).fetchall()
+            if not rows:
+                break
+            questions = [r for r in rows if r[2] == "user"]
+            vectors = embeddings_model.embed_documents([r[3] for r in questions]) if questions else []
+            vector_by_id = {q[0]: v for q, v in zip(questions, vectors)}
+            with conn:
+                for message_id, session_id, role, content, timestamp in rows:
+                    _apply_message(conn, clusterer, vector_by_id, message_id, session_id, role, content or "", timestamp)
+                watermark = rows[-1][0]
+                conn.execute(
+                    "INSERT INTO analytics_state (job, last_message_id, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(job) DO UPDATE SET last_message_id = excluded.last_message_id, updated_at = excluded.updated_at",
+                    (JOB_NAME, watermark, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            processed += len(rows)
+    finally:
+        conn.close()
+    return processed
+
+
+def _apply_message(conn, clusterer, vector_by_id, message_id, session_id, role, content, timestamp):
+    day = (timestamp or "")[:10]
+    conn.execute("INSERT OR IGNORE INTO analytics_daily (day) VALUES (?)", (day,))
+    if role == "user":
+        conn.execute("UPDATE analytics_daily SET questions = questions + 1 WHERE day = ?", (day,))
+        cluster_id = clusterer.assign(content, vector_by_id[message_id], timestamp)
+        conn.execute("INSERT OR REPLACE INTO analytics_cluster_members (message_id, cluster_id) VALUES (?, ?)",
+                     (message_id, cluster_id))
+        return
+
+    fallback = is_fallback_answer(content)
+    error = content.startswith(ERROR_MARKER)
+    conn.execute("UPDATE analytics_daily SET answers = answers + 1, fallback_answers = fallback_answers + ?, "
+                 "error_answers = error_answers + ? WHERE day = ?", (int(fallback), int(error), day))
+    for source in parse_cited_sources(content):
+        conn.execute("INSERT INTO analytics_source_citations (source, day, citations) VALUES (?, ?, 1) "
+                     "ON CONFLICT(source, day) DO UPDATE SET citations = citations + 1", (source, day))
+    if fallback:
+        # 이 답변 직전의 사용자 질문이 속한 군집에 미답변 횟수를 더합니다.
+        conn.execute('''
+            UPDATE analytics_question_clusters SET fallback_count = fallback_count + 1
+            WHERE cluster_id = (
+                SELECT cluster_id FROM analytics_cluster_members WHERE message_id = (
+                    SELECT MAX(message_id) FROM chat_messages
+                    WHERE session_id = ? AND role = 'user' AND message_id < ?
+                )
+            )
+        ''', (session_id, message_id))
+
+
+# --- 조회 함수 (대시보드 / 캐시 사전 준비 목록) ---
+
+def top_questions(conn, limit=20):
+    rows = conn.execute(
+        "SELECT cluster_id, representative, question_count, fallback_count, last_seen FROM analytics_question_clusters "
+        "ORDER BY question_count DESC LIMIT ?", (limit,)).fetchall()
+    return [dict(zip(["cluster_id", "question", "count", "fallbacks", "last_seen"], r)) for r in rows]
+
+
+def unanswered_questions(conn, limit=20):
+    rows = conn.execute(
+        "SELECT cluster_id, representative, question_count, fallback_count, last_seen FROM analytics_question_clusters "
+        "WHERE fallback_count > 0 ORDER BY fallback_count DESC, question_count DESC LIMIT ?", (limit,)).fetchall()
+    return [dict(zip(["cluster_id", "question", "count", "fallbacks", "last_seen"], r)) for r in rows]
+
+
+def daily_stats(conn, days=30):
+    rows = conn.execute(
+        "SELECT day, questions, answers, fallback_answers, error_answers FROM analytics_daily "
+        "ORDER BY day DESC LIMIT ?", (days,)).fetchall()
+    return [{"day": d, "questions": q, "answers": a, "fallback_rate": f / a if a else 0.0, "errors": e}
+            for d, q, a, f, e in reversed(rows)]
+
+
+def source_citations(conn):
+    rows = conn.execute("SELECT source, SUM(citations) FROM analytics_source_citations GROUP BY source "
+                        "ORDER BY SUM(citations) DESC").fetchall()
+    return [{"source": s, "citations": c} for s, c in rows]
+
+
+def prewarm_questions(db_name, limit=None, min_count=2):
+    # 답변 캐시 사전 준비용 질문 목록: 자주 묻고 실제로 답변이 된(미답변 비율이 낮은) 군집의 대표 질문
+    limit = limit or config.PREWARM_MINED_LIMIT
+    if not os.path.exists(db_name):
+        return []
+    conn = sqlite3.connect(db_name)
+    try:
+        ensure_tables(conn)
+        rows = conn.execute(
+            "SELECT representative FROM analytics_question_clusters WHERE question_count >= ? "
+            "AND fallback_count * 2 < question_count ORDER BY question_count DESC LIMIT ?", (min_count, limit)).fetchall()
+        return [r[0] for r in rows]
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="채팅 기록 분석 롤업")
+    parser.add_argument("command", choices=["run", "report"])
+    parser.add_argument("--db", default=config.DB_NAME)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        from backends import create_embeddings
+        processed = run_incremental(args.db, create_embeddings(os.getenv("OPENAI_API_KEY")))
+        print(f"✅ 새 메시지 {processed}개를 집계했습니다.")
+        return
+
+    conn = sqlite3.connect(args.db)
+    ensure_tables(conn)
+    print("[자주 묻는 질문]")
+    for q in top_questions(conn, args.limit):
+        print(f"  {q['count']:>5}회 (미답변 {q['fallbacks']}) {q['question']}")
+    print("\n[답변하지 못한 질문]")
+    for q in unanswered_questions(conn, args.limit):
+        print(f"  미답변 {q['fallbacks']:>3}/{q['count']}회 {q['question']}")
+    print("\n[문서별 인용 수]")
+    for s in source_citations(conn):
+        print(f"  {s['citations']:>5}  {s['source']}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import threading
+from collections import OrderedDict
+
+from langchain_core.embeddings import Embeddings
+
+import config
+import metrics
+from text_utils import normalize_query
+
+# --- 답변 / 질문 임베딩 캐시 (프로세스 메모리) ---
+# 같은 독립 질문은 같은 문서를 검색해 같은 답을 내므로, (정규화된 질문, 인덱스 버전)을 키로 답변을 재사용합니다.
+# 문서나 인덱스 설정이 바뀌면 인덱스 버전이 달라져 이전 답변은 자연히 쓰이지 않습니다.
+
+
+class _LRU:
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class AnswerCache:
+    def __init__(self, index_version, max_size=None):
+        self.index_version = index_version
+        self._lru = _LRU(max_size or config.ANSWER_CACHE_SIZE)
+
+    def key(self, query):
+        return (normalize_query(query), self.index_version)
+
+    def get(self, query):
+        response = self._lru.get(self.key(query))
+        metrics.incr("answer_cache_hits" if response is not None else "answer_cache_misses")
+        return response
+
+    def put(self, query, response):
+        self._lru.put(self.key(query), response)
+        metrics.set_gauge("answer_cache_size", len(self._lru))
+
+    def __contains__(self, query):
+        return self._lru.get(self.key(query)) is not None
+
+
+class CachedQueryEmbeddings(Embeddings):
+    # 검색 질문 임베딩(embed_query)만 캐시하는 래퍼. 문서 임베딩(인덱스 빌드)은 그대로 전달합니다.
+    def __init__(self, embeddings, max_size=None):
+        self.embeddings = embeddings
+        self._lru = _LRU(max_size or config.QUERY_EMBEDDING_CACHE_SIZE)
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        key = normalize_query(text)
+        vector = self._lru.get(key)
+        if vector is None:
+            metrics.incr("query_embedding_cache_misses")
+            vector = self.embeddings.embed_query(text)
+            self._lru.put(key, vector)
+        else:
+            metrics.incr("query_embedding_cache_hits")
+        return vector
+
+    def embed_queries(self, texts):
+        # 여러 질문을 한 번에 임베딩합니다. 캐시에 없는 질문만 모아 embed_documents 한 번으로 요청합니다.
+        # (설정된 백엔드들은 embed_query와 embed_documents가 같은 벡터를 돌려줍니다.)
+        keys = [normalize_query(t) for t in texts]
+        found = {k: self._lru.get(k) for k in set(keys)}
+        missing = {k: t for k, t in zip(keys, texts) if found[k] is None}
+        metrics.incr("query_embedding_cache_hits", len(keys) - sum(found[k] is None for k in keys))
+        if missing:
+            metrics.incr("query_embedding_cache_misses", len(missing))
+            for k, vector in zip(missing, self.embeddings.embed_documents(list(missing.values()))):
+                found[k] = vector
+                self._lru.put(k, vector)
+        return [found[k] for k in keys]
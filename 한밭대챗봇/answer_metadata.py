@@ -0,0 +1,60 @@
+import json
+import os
+
+# --- 답변별 검색 메타데이터 ---
+# 봇 답변을 저장할 때 어떤 청크로 답했는지(청크 id, 출처, start_index, 검색 거리/재순위 점수),
+# 어떤 인덱스 버전과 검색 질문을 썼는지, 단계별 소요 시간을 작은 JSON으로 함께 저장합니다.
+# 대화를 다시 불러올 때 검색을 다시 하지 않고 참고 문서 / 복사 버튼 / 디버그 정보를 되살리고,
+# 새 인덱스 버전으로 같은 검색을 다시 실행해 결과를 비교(회귀 벤치마크)하는 데 사용합니다.
+
+
+def source_name(metadata):
+    # 화면에 표시하는 출처 이름 (파일명에서 .txt 제외)
+    return os.path.basename(metadata.get("source", "알 수 없는 출처")).replace(".txt", "")
+
+
+def answer_sources(documents):
+    return sorted({source_name(doc.metadata) for doc in documents})
+
+
+def _round(value):
+    return None if value is None else round(float(value), 4)
+
+
+def retrieval_metadata(response, index_version, query, condensed=False, timings=None):
+    chunks = []
+    for doc in response.get("source_documents", []):
+        chunk = {"id": doc.id, "source": os.path.basename(doc.metadata.get("source", ""))}
+        for key, value in (("start_index", doc.metadata.get("start_index")),
+                           ("distance", _round(doc.metadata.get("vector_distance"))),
+                           ("rerank_score", _round(doc.metadata.get("rerank_score")))):
+            if value is not None: # 값이 없는 항목은 저장하지 않습니다.
+                chunk[key] = value
+        chunks.append(chunk)
+    metadata = {"index_version": index_version, "query": query, "chunks": chunks}
+    if condensed:
+        metadata["condensed"] = True # 대화 맥락으로 바꾼 독립 질문으로 검색한 경우
+    if response.get("degraded"):
+        metadata["degraded"] = True
+    if response.get("faq"):
+        metadata["faq"] = True # 사전 계산 FAQ 표에서 가져온 답변 (faq_table.py)
+    if timings:
+        metadata["timings_ms"] = {name: round(seconds * 1000) for name, seconds in timings.items()}
+    return metadata
+
+
+def metadata_sources(metadata):
+    return sorted({source_name(chunk) for chunk in metadata["chunks"]})
+
+
+def encode_metadata(metadata):
+    return json.dumps(metadata, ensure_ascii=False, separators=(",", ":"))
+
+
+def decode_metadata(text):
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
@@ -0,0 +1,166 @@
+import os
+
+import config
+import metrics
+from rag_system import PROMPT_TEMPLATE, fetch_documents
+from rate_limit import LLMOverloaded
+from resilience import call_with_deadline, is_transient
+from single_flight import SingleFlight
+from text_utils import estimate_tokens, normalize_query
+
+# --- 답변 파이프라인 ---
+# 화면 처리, 캐시 사전 준비, 배치 질의가 모두 같은 경로로 답변을 얻도록 QA 체인 호출을 한곳에 모읍니다.
+
+_PROMPT_TOKENS = estimate_tokens(PROMPT_TEMPLATE)
+
+
+def estimate_request_tokens(query, k=None):
+    # 호출 전 추정치: 프롬프트 + 검색 청크 k개 + 질문 + 예상 답변 길이
+    k = k or config.RETRIEVER_K
+    return (_PROMPT_TOKENS + k * estimate_tokens("가" * config.CHUNK_SIZE) + estimate_tokens(query)
+            + config.LLM_COMPLETION_TOKENS_ESTIMATE)
+
+
+def response_tokens(query, response):
+    # 호출 후 실제 프롬프트(검색된 청크)와 답변으로 다시 계산한 사용량
+    context = "".join(doc.page_content for doc in response.get("source_documents", []))
+    return _PROMPT_TOKENS + estimate_tokens(context) + estimate_tokens(query) + estimate_tokens(response.get("result", ""))
+
+
+DEGRADED_NOTICE = "⚠️ 지금은 답변 생성 서비스가 원활하지 않아, 질문과 관련된 규정 원문 일부를 대신 보여드립니다."
+
+
+def degraded_response(query, documents, max_chars=None):
+    # 생성 없이 검색된 청크 원문을 출처와 함께 보여주는 저하 모드 응답
+    max_chars = max_chars or config.DEGRADED_EXCERPT_CHARS
+    excerpts = []
+    for doc in documents:
+        source = os.path.basename(doc.metadata.get("source", "알 수 없는 출처")).replace(".txt", "")
+        text = " ".join(doc.page_content.split())
+        excerpts.append(f"[{source}] {text[:max_chars]}{'…' if len(text) > max_chars else ''}")
+    result = DEGRADED_NOTICE + "\n\n" + "\n\n".join(excerpts) if excerpts else DEGRADED_NOTICE
+    return {"query": query, "result": result, "source_documents": documents, "degraded": True}
+
+
+class AnswerPipeline:
+    def __init__(self, qa_chain, index_version, answer_cache=None, governor=None, coalesce=True, breaker=None,
+                 faq_table=None, llm_cache=None):
+        self.qa_chain = qa_chain
+        self.index_version = index_version
+        self.answer_cache = answer_cache
+        self.faq_table = faq_table # 오프라인으로 미리 생성해 둔 FAQ 답변 (faq_table.py)
+        self.governor = governor
+        self.breaker = breaker
+        self.llm_cache = llm_cache # 전역으로 등록된 LLM 응답 캐시 (llm_cache.py). 캐시 적중은 거버너를 거치지 않습니다.
+        # 같은 (정규화된 질문, 인덱스 버전)의 동시 요청은 한 번만 계산해 결과를 나눠 받습니다.
+        self.single_flight = SingleFlight() if coalesce else None
+
+    def answer(self, query, queue_timeout=None, budget_reserve=0.0, documents=None):
+        # 독립 질문(대화 맥락이 이미 반영된 질문)을 받아 {"result", "source_documents"} 응답을 돌려줍니다.
+        # LLM 예산이 부족해 대기 시간 안에 실행하지 못하면 LLMOverloaded를 발생시킵니다.
+        # documents를 주면 검색을 건너뛰고 그 청크로 답변합니다. (배치 질의 엔진이 검색을 한꺼번에 끝낸 경우)
+        cached = self.lookup(query)
+        if cached is not None:
+            return cached
+        if self.single_flight is None:
+            return self._compute(query, queue_timeout, budget_reserve, documents)
+        key = (normalize_query(query), self.index_version)
+        return self.single_flight.do(key, lambda: self._compute(query, queue_timeout, budget_reserve, documents))
+
+    def lookup(self, query):
+        # LLM 호출 없이 바로 줄 수 있는 답변을 사전 계산 FAQ 표, 답변 캐시 순서로 찾습니다. 없으면 None
+        if self.faq_table is not None:
+            response = self.faq_table.get(query)
+            if response is not None:
+                return response
+        return self.answer_cache.get(query) if self.answer_cache is not None else None
+
+    def _compute(self, query, queue_timeout, budget_reserve, documents=None):
+        if self.answer_cache is not None and query in self.answer_cache:
+            # 캐시를 확인한 직후 앞선 요청이 끝나 답변이 막 저장된 경우
+            return self.answer_cache.get(query)
+        if self.breaker is not None and not self.breaker.allow():
+            return self._degraded(query, documents)
+        try:
+            response = self._invoke(query, queue_timeout, budget_reserve, documents)
+        except LLMOverloaded:
+            # 예산 부족은 LLM 장애가 아니므로 차단기에 반영하지 않고, 반 열림 상태의 시험 호출 자리만 돌려줍니다.
+            if self.breaker is not None:
+                self.breaker.release_probe()
+            raise
+        except Exception as e:
+            metrics.incr("llm_failures")
+            if self.breaker is None:
+                raise
+            if not is_transient(e):
+                # 일시적인 장애가 아니면(인증 오류, 코드 오류 등) 차단기에 세지 않고 저하 모드 답변으로 가리지도 않습니다.
+                self.breaker.release_probe()
+                raise
+            self.breaker.record_failure()
+            return self._degraded(query, documents)
+        if self.breaker is not None:
+            self.breaker.record_success()
+        if self.answer_cache is not None:
+            self.answer_cache.put(query, response)
+        return response
+
+    def condense(self, condenser, history, question):
+        # 후속 질문 변환도 답변과 같은 거버너를 거치고 CONDENSE_TIMEOUT 안에 끝나야 합니다.
+        # 예산 부족, 시간 초과, 오류가 나면 답변은 계속 진행하도록 원래 질문을 그대로 돌려줍니다.
+        try:
+            return condenser.condense(history, question, call=lambda fn, estimated, usage: self.call_llm(
+                fn, estimated, timeout=config.CONDENSE_TIMEOUT, usage=usage))
+        except Exception:
+            metrics.incr("condense_failures")
+            return question
+
+    def _degraded(self, query, documents=None):
+        # 검색까지 실패하면(예: 임베딩 API도 장애) 원래 예외가 그대로 전달됩니다. 저하 모드 응답은 캐시하지 않습니다.
+        metrics.incr("degraded_answers")
+        if documents is None:
+            documents = self.qa_chain.retriever.invoke(query)
+        return degraded_response(query, documents)
+
+    def lookup_documents(self, ids):
+        # 답변에 쓰인 청크 원문을 id로 다시 읽습니다. (디버그 화면에서 표시할 때만 사용)
+        return fetch_documents(self.qa_chain.retriever.vectorstore, ids)
+
+    def _run_chain(self, query, documents):
+        if documents is None:
+            return self.qa_chain.invoke({"query": query})
+        # 검색이 끝난 청크를 QA 체인과 같은 stuff 프롬프트로 생성 단계에만 넘깁니다.
+        output = self.qa_chain.combine_documents_chain.invoke({"input_documents": documents, "question": query})
+        return {"query": query, "result": output["output_text"], "source_documents": documents}
+
+    def call_llm(self, fn, estimated, queue_timeout=None, budget_reserve=0.0, timeout=None, usage=None):
+        # LLM을 부르는 단계(답변 생성, 질문 변환)가 모두 같은 제한 시간과 거버너를 거치도록 합니다.
+        # 자리와 예산은 호출이 실제로 끝날 때 돌려줍니다. 제한 시간이 지나 결과를 버린 호출도 끝날 때까지는 자리를 차지하고,
+        # 헤지 요청은 빈 자리가 있을 때만 보냅니다. usage(결과)를 주면 실제 사용량으로 예산을 정산합니다.
+        if self.governor is None:
+            return call_with_deadline(fn, timeout)
+        if self.llm_cache is not None:
+            # 응답이 캐시에 있으면 자리와 예산을 얻지 않고 바로 돌려줍니다. (예산이 바닥나도 캐시된 답변은 나갑니다)
+            cached = self.llm_cache.probe(fn)
+            if cached is not None:
+                return cached
+        if not self.governor.acquire(estimated, timeout=queue_timeout, reserve=budget_reserve):
+            raise LLMOverloaded("LLM 사용량 한도에 도달했습니다.")
+
+        def release(future):
+            actual = estimated
+            try:
+                if usage is not None and not future.cancelled() and future.exception() is None:
+                    actual = usage(future.result())
+            finally:
+                self.governor.release(estimated, actual)
+
+        return call_with_deadline(fn, timeout, on_done=release,
+                                  admit_hedge=lambda: self.governor.try_acquire(estimated, reserve=budget_reserve))
+
+    def _invoke(self, query, queue_timeout, budget_reserve, documents=None):
+        if documents is None and self.llm_cache is not None and self.governor is not None:
+            # 캐시 확인과 실제 생성이 같은 검색 결과(같은 프롬프트)를 쓰도록 검색을 먼저 끝냅니다.
+            documents = call_with_deadline(lambda: self.qa_chain.retriever.invoke(query))
+        with metrics.timer("qa_chain"):
+            return self.call_llm(lambda: self._run_chain(query, documents), estimate_request_tokens(query),
+                                 queue_timeout, budget_reserve, usage=lambda response: response_tokens(query, response))
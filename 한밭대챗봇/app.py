@@ -3,19 +3,32 @@ import openai
 import os
 from dotenv import load_dotenv
 from datetime import datetime
+from collections import Counter
 import base64
+import ipaddress
 import time
-import sqlite3 # SQLite 데이터베이스 사용을 위한 임포트
 import uuid    # 고유임포트 ID 생성을 위한 
 
-# LangChain 관련 라이브러리 임포트 (RAG 구현용)
-from langchain_community.document_loaders import TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain.chains import RetrievalQA
-from langchain_openai import ChatOpenAI
-from langchain.prompts import PromptTemplate
+# RAG 구현 및 모델 백엔드 모듈 임포트
+from rag_init import FAILED, LOADING, READY, record_first_paint, start_rag_init # 시작 시간 측정 기준이므로 무거운 모듈보다 먼저 임포트
+import config
+from backends import create_embeddings, create_llm, create_reranker, requires_openai_key
+from rag_system import (load_documents, split_documents, compute_index_version, build_vectorstore,
+                        load_vectorstore, build_qa_chain)
+from chunk_store import chunk_store_path, compact_vectorstore
+from conversation import QueryCondenser, answer_copy_text, answer_from_copy_text, build_history_window, is_reask
+from answer_metadata import (answer_sources, decode_metadata, encode_metadata, metadata_sources,
+                             retrieval_metadata)
+from query_router import QueryRouter
+from answer_cache import AnswerCache, CachedQueryEmbeddings
+from answer_pipeline import AnswerPipeline
+from faq_table import load_faq_table, start_faq_refresh
+from llm_cache import install_llm_cache
+from warmup import start_warmup, warmup_questions
+from rate_limit import LLMGovernor, LLMOverloaded, RateLimiter
+from resilience import CircuitBreaker, LLMTimeout
+import metrics
+from storage import create_chat_store, session_title_from_question
 
 if "openai_api_key" in st.secrets:
     openai.api_key = st.secrets["openai_api_key"]
@@ -25,37 +38,13 @@ else:
 
 st.set_page_config(page_title="한밭대학교 AI 챗봇", layout="wide", initial_sidebar_state="auto") # 사이드바 초기 상태 변경
 
-# --- 데이터베이스 관련 설정 및 초기화 ---
-DB_NAME = 'chat_history.db' # 데이터베이스 파일명
-
-def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    # 채팅 세션 저장 테이블 (대화 목록을 위한 메타데이터)
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS chat_sessions (
-            session_id TEXT PRIMARY KEY,
-            title TEXT,
-            start_time TEXT,
-            last_updated TEXT
-        )
-    ''')
-    # 각 메시지 저장 테이블 (실제 대화 내용)
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS chat_messages (
-            message_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id TEXT,
-            role TEXT,
-            content TEXT,
-            timestamp TEXT,
-            FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id)
-        )
-    ''')
-    conn.commit()
-    conn.close()
+# --- 채팅 기록 저장소 (SQLite 파일 또는 서버 DB, config.CHAT_STORE_BACKEND) ---
+# 모든 사용자 세션이 하나의 저장소 객체(연결 풀)를 공유합니다. 생성 시 테이블 및 전문 검색 인덱스를 준비합니다.
+@st.cache_resource(show_spinner=False)
+def get_chat_store(backend):
+    return create_chat_store(backend)
 
-# --- 앱 시작 시 DB 초기화 호출 ---
-init_db()
+chat_store = get_chat_store(config.CHAT_STORE_BACKEND)
 
 # --- 이미지 파일을 Base64로 인코딩하는 함수 ---
 def get_image_as_base64(file_path):
@@ -545,174 +534,217 @@ st.markdown(
 
 actual_api_key = os.getenv("OPENAI_API_KEY")
 
-if not actual_api_key:
+# OpenAI 백엔드를 사용하는 경우에만 API 키가 필요합니다. (로컬 백엔드는 오프라인 동작)
+# 키가 없으면 여기서 실행을 멈추므로 아래 코드는 항상 필요한 키가 있는 상태에서 실행됩니다.
+if requires_openai_key() and not actual_api_key:
     st.error("⚠️ OpenAI API 키가 환경 변수(OPENAI_API_KEY)에 설정되지 않았습니다. `.env` 파일을 확인하거나 환경 변수를 설정해주세요.")
     st.stop()
 
-api_key_set = True
-try:
-    llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0.1, api_key=actual_api_key)
-    embeddings_model_instance = OpenAIEmbeddings(model="text-embedding-3-small")
-except Exception as e:
-    st.error(f"OpenAI 클라이언트 초기화 중 오류 발생: {e}. API 키를 확인해주세요.")
-    api_key_set = False
-    st.stop()
-
 # --- RAG 시스템 설정 (문서 로드 및 벡터 저장소 생성) ---
-# 프롬프트 개선
-PROMPT_TEMPLATE = """
-당신은 한밭대학교의 공식 학칙, 이수 학점 체계, 장학금 규정, 학생생활관 관리운영 지침에 기반한 정보를 제공하는 전문 AI 챗봇입니다.  
-다음 원칙에 따라 사용자의 질문에 답변해주세요:
-
-1. **문서 기반 우선**  
-   제공된 공식 문서(학칙, 규정 등)에 명시된 내용만을 바탕으로 답변하는 것을 원칙으로 합니다. 문서에 존재하지 않는 내용은 임의로 추론하지 마세요.
-
-2. **출처 명시**  
-   문서 기반 정보에는 반드시 출처를 함께 제공해주세요. (예: “한밭대학교 학칙 제N조에 따르면” 등)
-
-3. **문서에 정보가 없는 경우의 대응**  
-   제공된 문서에서 관련 정보를 찾을 수 없는 경우, 다음 두 가지 중 하나를 선택합니다:
-   
-   - **(1) 질문이 학교 공식 정보와 직접적으로 관련 있을 경우:**  
-     최신 정보를 제공하기 위해 한밭대학교 공식 웹사이트 또는 신뢰 가능한 출처를 조건부로 검색해, 반드시 **출처를 명확히 밝힌 후** 안내합니다.  
-     (예: “한밭대학교 홈페이지에 따르면... (출처: https://홈페이지주소)”)
-
-   - **(2) 질문이 학교 공식 문서 또는 신뢰 가능한 출처 어디에도 없는 경우:**  
-     “죄송합니다. 제공된 문서 및 공개된 정보에서는 해당 내용을 찾을 수 없습니다. 관련 부서에 직접 문의하시는 것을 권장드립니다.” 라고 안내합니다.
-
-4. **어조와 형식**  
-   답변은 간결하고 정중하며, 이해하기 쉬운 자연스러운 한국어로 제공되어야 합니다.
-
-5. **언어**  
-   사용자가 한국어로 질문할 경우에는 한국어로, 외국어(예: 영어)로 질문할 경우에는 해당 언어로 답변해주세요. 
-   단, 응답의 정확성을 위해 항상 문서 기반 정보를 바탕으로 하며, 출처 표기는 한국어 또는 해당 언어로 적절히 표현합니다.
-
----
-문서 내용:
-{context}
-
----
-질문: {question}
-
----
-답변:
-"""
-qa_chain_prompt = PromptTemplate(
-    input_variables=["context", "question"],
-    template=PROMPT_TEMPLATE,
-)
+# 백그라운드 스레드(rag_init.py)에서 실행되므로 화면(st.*)에 직접 쓰지 않고 status에 진행 단계와 경고를 남깁니다.
+RAG_SETUP_STEPS = 5
 
-@st.cache_resource(show_spinner="🎓 한밭대학교 학칙 문서들을 학습 중입니다. 잠시만 기다려 주세요...")
-def setup_rag(api_key): # API 키만 인자로 받도록 변경
-    # 함수 내부에서 API 키를 사용하여 모델을 초기화합니다.
+def setup_rag(api_key, embedding_backend, llm_backend, status):
+    # 설정된 백엔드(OpenAI 또는 로컬)로 모델을 초기화합니다.
+    status.advance("모델 초기화 중")
     try:
-        _llm_model = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0.1, api_key=api_key)
-        _embeddings_model = OpenAIEmbeddings(model="text-embedding-3-small", openai_api_key=api_key) # embedding 모델에도 api_key 명시
+        _llm_model = create_llm(api_key, backend=llm_backend)
+        _embeddings_model = CachedQueryEmbeddings(create_embeddings(api_key, backend=embedding_backend))
     except Exception as e:
         # 모델 초기화에 실패하면 에러 메시지와 함께 None 반환
-        return None, f"OpenAI 서비스 초기화 중 오류 발생: {e}. API 키를 확인해주세요."
-
-    doc_dir = "."
-    documents = []
-    file_names = [
-        "school_rules.txt", "credit_system.txt",
-        "scholarship_guidelines.txt", "dorm_rules.txt",
-        "wifi_info.txt"
-    ]
-    loaded_any_document = False
-    error_files = []
-    for file_name in file_names:
-        file_path = os.path.join(doc_dir, file_name)
-        if os.path.exists(file_path):
-            try:
-                loader = TextLoader(file_path, encoding='utf-8')
-                documents.extend(loader.load())
-                loaded_any_document = True
-            except Exception as e:
-                st.warning(f"'{file_name}' 파일 로드 중 오류: {e}")
-                error_files.append(file_name)
-        else:
-            st.warning(f"⚠️ '{file_name}' 파일을 찾을 수 없습니다. 앱과 같은 폴더에 있는지 확인해주세요.")
-            error_files.append(file_name)
-    if not loaded_any_document:
+        return None, f"모델 백엔드 초기화 중 오류 발생 (임베딩: {embedding_backend}, 생성: {llm_backend}): {e}"
+
+    _reranker = None
+    if config.RERANK_ENABLED:
+        try:
+            _reranker = create_reranker()
+        except Exception as e:
+            # 재순위화는 품질 향상용 선택 단계이므로 실패해도 벡터 검색만으로 계속 진행합니다.
+            status.warn(f"재순위화 모델을 불러오지 못해 벡터 검색 결과를 그대로 사용합니다: {e}")
+
+    status.advance("학칙 문서 불러오는 중")
+    documents, missing_files, failed_files = load_documents()
+    for file_name, e in failed_files.items():
+        status.warn(f"'{file_name}' 파일 로드 중 오류: {e}")
+    for file_name in missing_files:
+        status.warn(f"⚠️ '{file_name}' 파일을 찾을 수 없습니다. 앱과 같은 폴더에 있는지 확인해주세요.")
+    error_files = list(failed_files) + missing_files
+    if not documents:
         return None, "참고할 문서를 전혀 찾거나 로드할 수 없습니다. 모든 파일이 앱과 같은 디렉토리에 있고, UTF-8로 인코딩되었는지 확인해주세요."
     if error_files:
-        st.warning(f"다음 파일들을 처리하는 데 문제가 있었습니다: {', '.join(error_files)}. 해당 파일의 내용은 답변에 반영되지 않을 수 있습니다.")
+        status.warn(f"다음 파일들을 처리하는 데 문제가 있었습니다: {', '.join(error_files)}. 해당 파일의 내용은 답변에 반영되지 않을 수 있습니다.")
 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=250, chunk_overlap=100,
-        length_function=len, add_start_index=True,
-    )
-    texts = text_splitter.split_documents(documents)
+    status.advance("문서 나누는 중")
+    texts = split_documents(documents)
     if not texts:
         return None, "문서에서 텍스트를 추출하지 못했습니다. 파일 내용을 확인해주세요."
     try:
-        # 함수 내부에서 초기화된 _embeddings_model과 _llm_model을 사용
-        vectorstore = FAISS.from_documents(texts, _embeddings_model)
-        retriever = vectorstore.as_retriever(search_kwargs={'k': 4})
-        
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=_llm_model, chain_type="stuff", retriever=retriever,
-            chain_type_kwargs={"prompt": qa_chain_prompt},
-            return_source_documents=True
-        )
-        return qa_chain, None
+        # 오프라인으로 빌드해 둔 같은 버전의 인덱스가 있으면 불러오고, 없으면 여기서 빌드합니다.
+        status.advance("검색 인덱스 불러오는 중")
+        index_version = compute_index_version(documents)
+        vectorstore = load_vectorstore(_embeddings_model, index_version)
+        if vectorstore is None:
+            if config.VECTOR_INDEX_TYPE != "flat":
+                status.warn(f"미리 빌드된 '{config.VECTOR_INDEX_TYPE}' 인덱스가 없어 지금 빌드합니다. `python build_index.py`로 미리 빌드해두면 시작이 빨라집니다.")
+            status.step = "검색 인덱스 빌드 중 (처음 한 번만)" # 불러오기 대신 빌드하므로 같은 단계로 셉니다.
+            vectorstore = build_vectorstore(texts, _embeddings_model)
+        if config.MEMORY_LEAN_MODE:
+            # 청크 본문을 mmap 파일로 옮기고 메모리에 올라 있던 Document 객체들은 버립니다.
+            compact_vectorstore(vectorstore, chunk_store_path(index_version))
+        status.advance("답변 파이프라인 구성 중")
+        llm_cache = None
+        if config.LLM_CACHE_ENABLED:
+            try:
+                # 답변 체인과 질문 변환 등 이 프로세스의 모든 LLM 호출이 공유 응답 캐시를 거칩니다.
+                llm_cache = install_llm_cache(index_version)
+            except Exception as e:
+                status.warn(f"LLM 응답 캐시를 열지 못해 캐시 없이 진행합니다: {e}")
+        router = QueryRouter() if config.ROUTING_ENABLED else None
+        qa_chain = build_qa_chain(_llm_model, vectorstore, reranker=_reranker, router=router)
+        answer_cache = AnswerCache(index_version) if config.ANSWER_CACHE_ENABLED else None
+        governor = LLMGovernor() if config.GOVERNOR_ENABLED else None
+        breaker = CircuitBreaker() if config.BREAKER_ENABLED else None
+        faq_table = None
+        if config.FAQ_ENABLED:
+            try:
+                # 오프라인으로 생성해 둔 FAQ 답변 중 현재 문서로도 유효한 것만 읽습니다. (python faq_table.py build)
+                faq_table = load_faq_table(documents)
+            except Exception as e:
+                status.warn(f"사전 계산 FAQ 답변을 불러오지 못해 모든 질문의 답변을 새로 생성합니다: {e}")
+        pipeline = AnswerPipeline(qa_chain, index_version, answer_cache, governor, coalesce=config.COALESCE_ENABLED,
+                                  breaker=breaker, faq_table=faq_table, llm_cache=llm_cache)
+        if faq_table is not None and faq_table.stale and config.FAQ_AUTO_REFRESH:
+            # 문서가 바뀌어 무효가 된 FAQ 답변만 백그라운드에서 다시 생성합니다. 그동안 해당 질문은 일반 경로로 답합니다.
+            start_faq_refresh(pipeline, documents)
+        return pipeline, None
     except Exception as e:
         return None, f"벡터 저장소 또는 QA 체인 초기화 중 오류 발생: {e}."
 
-# setup_rag 함수를 호출할 때, 실제 API 키만 전달합니다.
-qa_chain, rag_error = setup_rag(actual_api_key)
+# 프로세스당 한 번 초기화를 시작하고 진행 상태 객체를 바로 돌려받습니다. (백엔드 설정이 바뀌면 새로 시작)
+# 화면은 기다리지 않고 그려지며, 준비가 끝나기 전까지 입력창은 꺼져 있습니다.
+@st.cache_resource(show_spinner=False)
+def start_rag_setup(api_key, embedding_backend, llm_backend):
+    return start_rag_init(lambda status: setup_rag(api_key, embedding_backend, llm_backend, status), RAG_SETUP_STEPS)
+
+rag_status = start_rag_setup(actual_api_key, config.EMBEDDING_BACKEND, config.LLM_BACKEND)
+answer_pipeline = rag_status.pipeline if rag_status.state == READY else None
+rag_error = rag_status.error
 
-if rag_error:
+# 자주 묻는 질문으로 답변 캐시를 미리 채웁니다. 백그라운드에서 진행되므로 화면 표시를 막지 않습니다.
+@st.cache_resource(show_spinner=False)
+def start_answer_warmup(_pipeline, index_version): # 인덱스 버전별로 한 번만 실행
+    return start_warmup(_pipeline, warmup_questions())
+
+# 클라이언트별 질문 속도 제한 (모든 사용자 세션이 같은 제한기를 공유)
+@st.cache_resource(show_spinner=False)
+def get_rate_limiter():
+    return RateLimiter()
+
+def is_loopback(ip_address):
+    try:
+        address = ipaddress.ip_address(ip_address)
+    except ValueError:
+        return False
+    return (getattr(address, "ipv4_mapped", None) or address).is_loopback
+
+def client_key():
+    # 실제 클라이언트 IP를 알 수 있으면 IP 단위, 아니면 브라우저 세션 단위로 제한합니다.
+    # (새 대화 버튼으로 current_session_id를 바꿔도 같은 제한을 받도록 별도 ID 사용)
+    # 로컬 접속이나 같은 서버의 리버스 프록시를 거친 접속은 모두 루프백 주소(::ffff:127.0.0.1 포함)로 보이므로
+    # IP로 구분하지 않습니다. (모든 사용자가 하나의 제한을 나눠 쓰게 됨)
+    ip_address = getattr(st.context, "ip_address", None)
+    if ip_address and not is_loopback(ip_address):
+        return "ip:" + ip_address
+    if "client_id" not in st.session_state:
+        st.session_state.client_id = str(uuid.uuid4())
+    return "session:" + st.session_state.client_id
+
+warmup_status = None
+if answer_pipeline is not None and config.WARMUP_ENABLED and config.ANSWER_CACHE_ENABLED:
+    warmup_status = start_answer_warmup(answer_pipeline, answer_pipeline.index_version)
+
+# 후속 질문을 독립 질문으로 바꾸는 단계 (대화 모드에서만 사용)
+@st.cache_resource(show_spinner=False)
+def setup_condenser(api_key, llm_backend):
+    try:
+        condense_llm = create_llm(api_key, backend=llm_backend, model=config.CONDENSE_MODEL or None,
+                                  max_tokens=config.CONDENSE_MAX_TOKENS)
+        return QueryCondenser(condense_llm)
+    except Exception:
+        return None # 초기화에 실패하면 대화 맥락 없이 원래 질문으로 검색합니다.
+
+condenser = setup_condenser(actual_api_key, config.LLM_BACKEND) if config.CONVERSATIONAL_MODE else None
+
+# 초기화가 진행 중(loading)이면 화면은 그대로 그리고, 입력창 위에 진행 상태를 표시합니다.
+rag_ready = rag_status.state == READY
+rag_failed = rag_status.state == FAILED
+for warning_message in rag_status.warnings:
+    st.warning(warning_message)
+if rag_failed:
     st.error(rag_error)
-    rag_ready = False
     st.toast("❌ 문서 학습 시스템 초기화 실패!", icon="⚠️")
-else:
-    rag_ready = True
+elif rag_ready:
     st.toast("⚡️ 챗봇이 질문에 답변할 준비가 되었습니다!", icon="✅")
 
 # --- 데이터베이스 메시지 저장/로드 함수 ---
-def save_message(session_id, role, content, is_initial_question=False):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    c.execute("INSERT INTO chat_messages (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
-              (session_id, role, content, timestamp))
-    
-    # 세션의 last_updated 시간 업데이트
-    c.execute("UPDATE chat_sessions SET last_updated = ? WHERE session_id = ?",
-              (timestamp, session_id))
-    
-    # 첫 사용자 질문일 경우 세션 제목 업데이트
-    if role == "user" and is_initial_question:
-        # 첫 질문 내용을 바탕으로 제목 생성 (최대 40자)
-        first_question_title = content.split('\n')[0][:40] 
-        if len(content.split('\n')[0]) > 40:
-            first_question_title += "..."
-        c.execute("UPDATE chat_sessions SET title = ? WHERE session_id = ?",
-                  (first_question_title, session_id))
-    
-    conn.commit()
-    conn.close()
+def save_message(session_id, role, content, is_initial_question=False, retrieval=None):
+    # 메시지 저장과 세션 last_updated 갱신을 함께 처리합니다.
+    # 첫 사용자 질문일 경우 질문 내용으로 세션 제목도 업데이트합니다. (최대 40자)
+    # 봇 답변은 검색 메타데이터(retrieval)도 함께 저장해, 다시 불러올 때 참고 문서와 디버그 정보를 되살립니다.
+    title = session_title_from_question(content) if role == "user" and is_initial_question else None
+    chat_store.save_message(session_id, role, content, title=title,
+                            retrieval=encode_metadata(retrieval) if retrieval is not None else None)
 
 def load_messages_from_db(session_id):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("SELECT role, content, timestamp FROM chat_messages WHERE session_id = ? ORDER BY timestamp ASC", (session_id,))
-    messages_data = c.fetchall()
-    conn.close()
+    messages_data = chat_store.load_messages(session_id)
     
     loaded_messages = []
-    for msg_role, msg_content, msg_timestamp_str in messages_data:
+    for msg_role, msg_content, msg_timestamp_str, msg_retrieval in messages_data:
         msg_time_obj = datetime.strptime(msg_timestamp_str, "%Y-%m-%d %H:%M:%S")
-        loaded_messages.append({
+        message = {
             "role": msg_role, 
             "content": msg_content, 
             "time": msg_time_obj.strftime("%H:%M")
-        })
+        }
+        retrieval = decode_metadata(msg_retrieval)
+        if msg_role == "assistant" and retrieval is not None:
+            # 저장된 검색 메타데이터로 참고 문서 목록 / 복사 버튼 / 디버그 정보를 검색 없이 되살립니다.
+            message["sources"] = metadata_sources(retrieval)
+            message["content"] = answer_from_copy_text(msg_content, message["sources"])
+            message["retrieval"] = retrieval
+            message["is_error"] = False
+        loaded_messages.append(message)
     return loaded_messages
 
+def sources_html(sources):
+    html = "<div class='source-documents'><strong><i class='fas fa-file-alt'></i> 참고 문서:</strong><ul>"
+    for filename in sources:
+        html += f"<li><i class='fas fa-check-circle'></i> {filename}</li>"
+    return html + "</ul></div>"
+
+def debug_source_text(msg):
+    # 검색된 청크 원문은 메시지마다 저장하지 않고, 디버그 정보를 표시할 때 청크 id로 다시 읽어옵니다.
+    # 답변 이후 인덱스가 다시 만들어졌으면 id가 다른 청크를 가리키므로 원문 없이 저장된 출처 정보만 보여줍니다.
+    retrieval = msg["retrieval"]
+    documents = {}
+    if answer_pipeline is not None and retrieval.get("index_version") == answer_pipeline.index_version:
+        documents = {doc.id: doc for doc in answer_pipeline.lookup_documents([c["id"] for c in retrieval["chunks"]])}
+    sections = []
+    for chunk in retrieval["chunks"]:
+        scores = "".join(f", {name}: {chunk[key]}" for key, name in (("distance", "거리"), ("rerank_score", "재순위 점수"))
+                         if key in chunk)
+        doc = documents.get(chunk["id"])
+        body = doc.page_content if doc is not None else "(인덱스가 바뀌어 원문을 불러올 수 없습니다)"
+        sections.append(f"--- {chunk['source']} (시작 인덱스: {chunk.get('start_index', 'N/A')}{scores}) ---\n{body}")
+    text = "\n\n".join(sections)
+    timings = ", ".join(f"{name} {ms}ms" for name, ms in retrieval.get("timings_ms", {}).items())
+    text = f"[인덱스 버전] {retrieval.get('index_version')}" + (f" · {timings}" if timings else "") + "\n\n" + text
+    if retrieval.get("faq"):
+        text = "[사전 계산 FAQ 답변]\n" + text
+    if retrieval.get("condensed"):
+        text = f"[검색에 사용한 독립 질문] {retrieval['query']}\n" + text
+    return text
+
 
 # --- 세션 상태 초기화 및 초기 메시지 설정 ---
 if "current_session_id" not in st.session_state:
@@ -723,18 +755,10 @@ if "current_session_id" not in st.session_state:
     st.session_state.show_delete_confirm = False # 삭제 모달 상태
     
     # 새 세션 시작 시 DB에 세션 정보 기록 (제목은 나중에 첫 질문으로 업데이트)
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    c.execute("INSERT INTO chat_sessions (session_id, title, start_time, last_updated) VALUES (?, ?, ?, ?)",
-              (st.session_state.current_session_id, "새로운 대화", start_time, start_time))
-    conn.commit()
-    conn.close()
+    chat_store.create_session(st.session_state.current_session_id)
 
     initial_message_content = "안녕하세요! 한밭대학교 학칙, 학점, 장학금, 생활관 규정에 대해 궁금한 점을 질문해주세요."
-    if not api_key_set:
-        initial_message_content = "안녕하세요! OpenAI API 키 설정이 필요합니다. 관리자에게 문의해주세요."
-    elif not rag_ready:
+    if rag_failed:
         initial_message_content = "안녕하세요! 현재 문서 학습에 문제가 있어 답변이 제한적일 수 있습니다. 관리자에게 문의해주세요."
     
     st.session_state.messages.append(
@@ -752,12 +776,29 @@ with st.sidebar:
         
     st.markdown("---")
 
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
+    # 대화 기록 전문 검색 (메시지 내용 및 제목)
+    def open_session_from_search(session_id):
+        # 위젯 콜백에서 실행되므로 아래 라디오 버튼의 선택 값도 함께 바꿀 수 있습니다.
+        st.session_state.current_session_id = session_id
+        st.session_state.messages = load_messages_from_db(session_id)
+        st.session_state.last_user_input = None
+        st.session_state.title_set_for_current_session = True
+        st.session_state.chat_session_selector_radio = session_id
+
+    search_query = st.text_input("🔍 대화 검색", key="chat_search_query", placeholder="예: 국가장학금",
+                                 help="이전 대화의 질문/답변 내용과 제목에서 검색합니다.")
+    if search_query.strip():
+        search_results = chat_store.search(search_query.strip(), limit=10)
+        if not search_results:
+            st.caption("검색 결과가 없습니다.")
+        for result in search_results:
+            label = result["title"] if result["title"] and result["title"] != "새로운 대화" else "새 대화"
+            st.button(f"{label} ({(result['timestamp'] or '')[:10]})", key=f"search_result_{result['session_id']}",
+                      help=result["snippet"] or None, on_click=open_session_from_search, args=(result["session_id"],))
+        st.markdown("---")
+
     # 모든 세션 불러오기 (최신 업데이트순으로 정렬)
-    c.execute("SELECT session_id, title, start_time, last_updated FROM chat_sessions ORDER BY last_updated DESC")
-    sessions = c.fetchall()
-    conn.close()
+    sessions = chat_store.list_sessions()
 
     if sessions:
         # Streamlit의 st.radio를 사용하여 세션 선택 UI를 구성합니다.
@@ -768,6 +809,14 @@ with st.sidebar:
             # 제목이 없거나 "새로운 대화"일 경우 날짜와 시간으로 표시
             display_title = title if title and title != "새로운 대화" else f"새 대화 {datetime.strptime(start_time, '%Y-%m-%d %H:%M:%S').strftime('%m/%d %H:%M')}"
             session_options_dict[session_id] = display_title
+        # 라디오 버튼은 표시 텍스트로 선택 항목을 구분하므로, 같은 표시 텍스트가 여러 세션을 가리키거나
+        # 한 세션을 가리키던 텍스트가 다른 세션으로 넘어가면 다른 사용자가 세션을 만들 때 엉뚱한 세션으로 바뀌어 열립니다.
+        # 제목이 같은 세션과, 제목이 생기기 전까지 시작 시각만 보이는 새 대화에는 세션 ID 앞부분을 붙여 구분합니다.
+        title_counts = Counter(session_options_dict.values())
+        for session_id, title, start_time, last_updated in sessions:
+            display_title = session_options_dict[session_id]
+            if title_counts[display_title] > 1 or not title or title == "새로운 대화":
+                session_options_dict[session_id] = f"{display_title} · {session_id[:6]}"
 
         # st.radio의 options는 리스트여야 합니다. 딕셔너리의 키(session_id) 리스트를 넘깁니다.
         session_ids_list = list(session_options_dict.keys())
@@ -844,8 +893,8 @@ if len(st.session_state.messages) == 1 and st.session_state.messages[0]["role"]
 # --- 채팅 메시지 표시 ---
 for i, msg in enumerate(st.session_state.messages):
     role = msg["role"]
-    # 메시지 내용을 HTML로 변환하여 줄바꿈을 적용합니다.
-    content_html = msg["content"]
+    # 메시지 내용을 HTML로 변환하여 줄바꿈을 적용합니다. (참고 문서 목록은 표시할 때 HTML로 붙입니다)
+    content_html = msg["content"] + (sources_html(msg["sources"]) if msg.get("sources") else "")
     # HTML 태그로 이미 포함된 경우, `br` 태그를 추가하지 않도록 조건 추가
     if not any(tag in content_html for tag in ['<br>', '<p>', '<div>', '<ul>', '<ol>', '<h3>', '<strong>', '<small>']):
         content_html = content_html.replace("\n", "<br>")
@@ -868,11 +917,12 @@ for i, msg in enumerate(st.session_state.messages):
 
     # 봇 메시지에만 복사 버튼 및 디버그 정보 표시
     if role == "assistant":
-        if "copy_text" in msg: # 복사 버튼은 순수 텍스트를 복사하도록
+        if "sources" in msg: # 복사 버튼은 순수 텍스트를 복사하도록
+            copy_text = answer_copy_text(msg).replace('`', '\\`') # JS 템플릿 문자열 안에 넣으므로 백틱 이스케이프
             st.markdown(f"""
                 <div class="copy-button-container">
                     <button class="copy-button" onclick="
-                        navigator.clipboard.writeText(`{msg['copy_text'].replace('`', '\\`')}`)
+                        navigator.clipboard.writeText(`{copy_text}`)
                         .then(() => alert('답변이 클립보드에 복사되었습니다!'))
                         .catch(err => console.error('복사 실패:', err));
                     ">
@@ -881,11 +931,11 @@ for i, msg in enumerate(st.session_state.messages):
                 </div>
                 """, unsafe_allow_html=True)
         
-        if "debug_source_content" in msg and st.session_state.get("show_debug_info", False):
+        if msg.get("retrieval") and st.session_state.get("show_debug_info", False):
             st.markdown(f"""
                 <div class="debug-info-box">
                     <strong>[디버그 정보 - 검색된 문서 내용]</strong>
-                    <pre>{msg['debug_source_content']}</pre>
+                    <pre>{debug_source_text(msg)}</pre>
                 </div>
             """, unsafe_allow_html=True)
 
@@ -909,6 +959,17 @@ if "last_user_input" in st.session_state and st.session_state.last_user_input an
 
 st.markdown('</div></div>', unsafe_allow_html=True) # chat-container 및 chat-wrapper 닫기
 
+# --- 문서 학습 진행 상태 (백그라운드 초기화 중에만 표시) ---
+@st.fragment(run_every=1)
+def rag_loading_indicator():
+    # 이 부분만 1초마다 다시 그리다가, 준비가 끝나면(또는 실패하면) 전체 화면을 다시 그려 입력창을 켭니다.
+    if rag_status.state != LOADING:
+        st.rerun()
+    st.progress(rag_status.progress, text=f"🎓 한밭대학교 학칙 문서들을 학습 중입니다. 잠시만 기다려 주세요... ({rag_status.step})")
+
+if rag_status.state == LOADING:
+    rag_loading_indicator()
+
 # --- 입력 폼 및 버튼 ---
 st.markdown('<div class="input-form-container">', unsafe_allow_html=True)
 with st.form("chat_input_form", clear_on_submit=True):
@@ -916,10 +977,10 @@ with st.form("chat_input_form", clear_on_submit=True):
     with input_col:
         user_input = st.text_input(
             "한밭대학교 규정에 대해 물어보세요...", label_visibility="collapsed",
-            disabled=(not api_key_set or not rag_ready), placeholder="여기에 질문을 입력하세요..."
+            disabled=not rag_ready, placeholder="여기에 질문을 입력하세요..."
         )
     with button_col:
-        submitted = st.form_submit_button("⬆️", help="질문 전송", disabled=(not api_key_set or not rag_ready))
+        submitted = st.form_submit_button("⬆️", help="질문 전송", disabled=not rag_ready)
 
 # --- "새 대화" 확인 모달 ---
 if st.session_state.show_new_chat_confirm:
@@ -937,17 +998,10 @@ if st.session_state.show_new_chat_confirm:
                 st.session_state.title_set_for_current_session = False # 새 세션이므로 제목 미설정 상태로
 
                 # 새 세션 정보를 DB에 기록
-                conn = sqlite3.connect(DB_NAME)
-                c = conn.cursor()
-                new_session_start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                c.execute("INSERT INTO chat_sessions (session_id, title, start_time, last_updated) VALUES (?, ?, ?, ?)",
-                          (st.session_state.current_session_id, "새로운 대화", new_session_start_time, new_session_start_time))
-                conn.commit()
-                conn.close()
+                chat_store.create_session(st.session_state.current_session_id)
 
                 new_initial_message = "새로운 대화를 시작합니다. 무엇이든 물어보세요!"
-                if not rag_ready and api_key_set: new_initial_message = "새 대화 시작. (문서 학습 문제로 답변 제한적일 수 있음)"
-                elif not api_key_set: new_initial_message = "새 대화 시작. (API 키 설정 필요)"
+                if rag_failed: new_initial_message = "새 대화 시작. (문서 학습 문제로 답변 제한적일 수 있음)"
                 st.session_state.messages.append(
                     {"role": "assistant", "content": new_initial_message, "time": datetime.now().strftime("%H:%M")}
                 )
@@ -971,12 +1025,7 @@ if st.session_state.show_delete_confirm:
         col_confirm_del, col_cancel_del = st.columns(2)
         with col_confirm_del:
             if st.button("삭제", key="confirm_delete_chat", help="현재 대화 삭제", type="secondary", class_name="confirm-btn"):
-                conn = sqlite3.connect(DB_NAME)
-                c = conn.cursor()
-                c.execute("DELETE FROM chat_messages WHERE session_id = ?", (st.session_state.current_session_id,))
-                c.execute("DELETE FROM chat_sessions WHERE session_id = ?", (st.session_state.current_session_id,))
-                conn.commit()
-                conn.close()
+                chat_store.delete_session(st.session_state.current_session_id)
                 
                 # 삭제 후 새로운 세션 시작
                 st.session_state.messages = []
@@ -984,17 +1033,10 @@ if st.session_state.show_delete_confirm:
                 st.session_state.title_set_for_current_session = False
                 
                 # 새로운 세션 DB에 기록
-                conn = sqlite3.connect(DB_NAME)
-                c = conn.cursor()
-                new_session_start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                c.execute("INSERT INTO chat_sessions (session_id, title, start_time, last_updated) VALUES (?, ?, ?, ?)",
-                          (st.session_state.current_session_id, "새로운 대화", new_session_start_time, new_session_start_time))
-                conn.commit()
-                conn.close()
+                chat_store.create_session(st.session_state.current_session_id)
 
                 initial_message_content = "새로운 대화를 시작합니다. 무엇이든 물어보세요!"
-                if not rag_ready and api_key_set: initial_message_content = "새 대화 시작. (문서 학습 문제로 답변 제한적일 수 있음)"
-                elif not api_key_set: initial_message_content = "새 대화 시작. (API 키 설정 필요)"
+                if rag_failed: initial_message_content = "새 대화 시작. (문서 학습 문제로 답변 제한적일 수 있음)"
                 st.session_state.messages.append(
                     {"role": "assistant", "content": initial_message_content, "time": datetime.now().strftime("%H:%M")}
                 )
@@ -1009,10 +1051,22 @@ if st.session_state.show_delete_confirm:
 
 
 st.markdown('</div>', unsafe_allow_html=True) # input-form-container 닫기
+record_first_paint() # 프로세스의 첫 화면이 그려진 시점 (RAG 초기화 완료와 별도로 기록)
 
 # --- 사용자 입력 처리 및 답변 생성 로직 ---
-if api_key_set and rag_ready:
-    if submitted and user_input:
+if rag_ready:
+    rate_limited = False
+    if submitted and user_input and config.RATE_LIMIT_ENABLED and not get_rate_limiter().allow(client_key()):
+        rate_limited = True
+        retry_after = get_rate_limiter().retry_after(client_key())
+        st.warning(f"질문을 너무 빠르게 보내고 있어요. {retry_after:.0f}초 후에 다시 시도해주세요.")
+    if submitted and user_input and not rate_limited:
+        # 직전 질문을 다시 입력한 경우(재질문) 집계 - 대화 모드 효과 측정용
+        previous_user_questions = [m["content"] for m in st.session_state.messages if m["role"] == "user"]
+        metrics.incr("user_questions")
+        if previous_user_questions and is_reask(previous_user_questions[-1], user_input):
+            metrics.incr("reasks")
+
         current_time = datetime.now().strftime("%H:%M")
         st.session_state.messages.append({"role": "user", "content": user_input, "time": current_time})
         
@@ -1033,68 +1087,89 @@ if api_key_set and rag_ready:
         del st.session_state.last_user_input
         
         with st.spinner("답변을 생성 중입니다... 문서를 참고하고 있어요! 🤔"):
+            sources = []
+            retrieval = None
+            is_error_reply = False # 오류 안내는 화면에만 표시하고 대화 기록(DB, 대화 맥락)에는 남기지 않습니다.
             try:
-                response = qa_chain.invoke({"query": query_to_process})
+                retrieval_query = query_to_process
+                timings = {}
+                if condenser is not None:
+                    # 마지막 사용자 메시지(현재 질문)를 제외한 최근 대화를 토큰 예산 안에서 참고합니다.
+                    history = build_history_window(st.session_state.messages[:-1])
+                    step_start = time.perf_counter()
+                    retrieval_query = answer_pipeline.condense(condenser, history, query_to_process)
+                    timings["condense"] = time.perf_counter() - step_start
+                step_start = time.perf_counter()
+                response = answer_pipeline.answer(retrieval_query)
+                timings["answer"] = time.perf_counter() - step_start
                 llm_answer = response["result"]
                 source_docs = response.get("source_documents", [])
                 
                 final_reply_content = llm_answer
-                copy_text_content = llm_answer # 복사할 텍스트는 순수 답변 내용으로 시작
-                
-                debug_source_content = ""
+                if response.get("degraded"):
+                    st.toast("답변 생성이 지연되어 관련 규정 원문을 대신 보여드립니다.", icon="⚠️")
+
                 if source_docs:
-                    cited_sources_filenames = sorted(list(set(
-                        os.path.basename(doc.metadata.get("source", "알 수 없는 출처")).replace(".txt", "")
-                        for doc in source_docs
-                    )))
-                    
-                    sources_html = "<div class='source-documents'><strong><i class='fas fa-file-alt'></i> 참고 문서:</strong><ul>"
-                    for filename in cited_sources_filenames:
-                        sources_html += f"<li><i class='fas fa-check-circle'></i> {filename}</li>"
-                    sources_html += "</ul></div>"
-                    final_reply_content += sources_html # UI에 표시할 내용에만 HTML 추가
-                    
-                    copy_text_content += "\n\n--- 참고 문서 ---\n" + ", ".join(cited_sources_filenames) # 복사 텍스트에는 순수 텍스트로 추가
-
-                    debug_source_content = "\n\n".join([
-                        f"--- {os.path.basename(doc.metadata.get('source', '알 수 없는 출처'))} (시작 인덱스: {doc.metadata.get('start_index', 'N/A')}) ---\n{doc.page_content}"
-                        for doc in source_docs
-                    ])
-                    
+                    # 화면에는 HTML 목록, 복사/저장용 텍스트에는 순수 텍스트로 붙입니다. (표시할 때 sources에서 생성)
+                    sources = answer_sources(source_docs)
+                # 디버그용 청크 원문은 id와 출처 정보만 기억해 두고 표시할 때 다시 읽습니다. (DB에도 함께 저장)
+                # 사전 계산 FAQ 답변은 생성 당시의 인덱스 버전을 함께 저장합니다. (청크 id가 그 인덱스 기준이므로)
+                retrieval = retrieval_metadata(response, response.get("index_version", answer_pipeline.index_version),
+                                               retrieval_query, condensed=retrieval_query != query_to_process,
+                                               timings=timings)
+
 
             except openai.AuthenticationError:
                 final_reply_content = "⚠️ OpenAI API 인증 오류가 발생했습니다. API 키가 유효한지 또는 사용량 한도를 확인해주세요."
-                copy_text_content = final_reply_content
+                is_error_reply = True
+                st.error(final_reply_content)
+            except LLMOverloaded:
+                final_reply_content = "⚠️ 지금 질문이 많아 답변을 만들 수 없습니다. 잠시 후 다시 시도해주세요."
+                is_error_reply = True
+                st.error(final_reply_content)
+            except LLMTimeout:
+                final_reply_content = "⚠️ 답변 생성 시간이 초과되었습니다. 잠시 후 다시 시도해주세요."
+                is_error_reply = True
                 st.error(final_reply_content)
             except openai.RateLimitError:
                 final_reply_content = "⚠️ API 호출 한도 초과 오류입니다. 잠시 후 다시 시도해주시거나 API 플랜을 확인해주세요."
-                copy_text_content = final_reply_content
+                is_error_reply = True
                 st.error(final_reply_content)
             except Exception as e:
                 final_reply_content = f"⚠️ 답변 생성 중 오류가 발생했습니다: {str(e)}"
-                copy_text_content = final_reply_content
+                is_error_reply = True
                 st.error(final_reply_content)
             
             current_time = datetime.now().strftime("%H:%M")
-            st.session_state.messages.append({
+            reply_message = {
                 "role": "assistant",
                 "content": final_reply_content,
                 "time": current_time,
-                "copy_text": copy_text_content, 
-                "debug_source_content": debug_source_content
-            })
-            save_message(st.session_state.current_session_id, "assistant", copy_text_content) # 봇 답변 저장 (출처 포함 텍스트)
+                "sources": sources,
+                "is_error": is_error_reply
+            }
+            if retrieval is not None:
+                reply_message["retrieval"] = retrieval
+            st.session_state.messages.append(reply_message)
+            if not is_error_reply:
+                # 봇 답변 저장 (출처 포함 텍스트 + 검색 메타데이터)
+                save_message(st.session_state.current_session_id, "assistant", answer_copy_text(reply_message),
+                             retrieval=retrieval)
             st.rerun()
 
-elif not api_key_set:
-    pass
-elif not rag_ready:
-    pass
-
 # --- 디버그 모드 토글 버튼 (개발 시 유용) ---
 with st.sidebar:
     st.checkbox("디버그 정보 표시 (참고 문서 내용)", key="show_debug_info", value=False,
                 help="챗봇 답변 아래에 LLM이 참고한 문서 청크의 원본 내용을 표시합니다. 문제 해결에 유용합니다.")
+    if warmup_status is not None and not warmup_status.finished:
+        st.progress(warmup_status.progress, text=f"자주 묻는 질문 답변 준비 중... ({warmup_status.done}/{warmup_status.total})")
+    if st.session_state.get("show_debug_info", False):
+        if warmup_status is not None and warmup_status.finished:
+            st.caption(f"답변 캐시 사전 준비: {warmup_status.done - warmup_status.failed}/{warmup_status.total} 완료")
+        st.caption(f"재질문 비율: {metrics.ratio('reasks', 'user_questions'):.1%}")
+        if config.LLM_CACHE_ENABLED:
+            st.caption(f"LLM 응답 캐시 적중률: {metrics.ratio('llm_cache_hits', 'llm_cache_lookups'):.1%}")
+        st.json(metrics.snapshot(), expanded=False)
 
 # --- 자동 스크롤 JavaScript (MutationObserver 사용) ---
 st.markdown("""
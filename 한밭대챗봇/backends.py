@@ -0,0 +1,67 @@
+import config
+
+# --- 임베딩 / 생성 모델 백엔드 ---
+# setup_rag와 벤치마크 스크립트가 모두 이 함수들을 통해 모델을 생성합니다.
+# 로컬 백엔드용 패키지(sentence-transformers, Ollama)는 선택 의존성이므로 필요할 때만 임포트합니다.
+
+SUPPORTED_BACKENDS = ("openai", "local")
+
+
+def requires_openai_key(embedding_backend=None, llm_backend=None):
+    embedding_backend = embedding_backend or config.EMBEDDING_BACKEND
+    llm_backend = llm_backend or config.LLM_BACKEND
+    return "openai" in (embedding_backend, llm_backend)
+
+
+def embedding_model_name(backend=None):
+    backend = backend or config.EMBEDDING_BACKEND
+    return config.OPENAI_EMBEDDING_MODEL if backend == "openai" else config.LOCAL_EMBEDDING_MODEL
+
+
+def llm_model_name(backend=None):
+    backend = backend or config.LLM_BACKEND
+    return config.OPENAI_CHAT_MODEL if backend == "openai" else config.LOCAL_LLM_MODEL
+
+
+def create_embeddings(api_key=None, backend=None):
+    backend = backend or config.EMBEDDING_BACKEND
+    if backend == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        return OpenAIEmbeddings(model=config.OPENAI_EMBEDDING_MODEL, openai_api_key=api_key)
+    if backend == "local":
+        try:
+            from langchain_community.embeddings import HuggingFaceEmbeddings
+        except ImportError as e:
+            raise RuntimeError("로컬 임베딩을 사용하려면 `pip install sentence-transformers`가 필요합니다.") from e
+        return HuggingFaceEmbeddings(
+            model_name=config.LOCAL_EMBEDDING_MODEL,
+            model_kwargs={"device": "cpu"},
+            encode_kwargs={"normalize_embeddings": True, "batch_size": config.LOCAL_EMBEDDING_BATCH_SIZE},
+        )
+    raise ValueError(f"지원하지 않는 임베딩 백엔드입니다: {backend} (지원: {', '.join(SUPPORTED_BACKENDS)})")
+
+
+def create_llm(api_key=None, backend=None, model=None, max_tokens=None):
+    # model/max_tokens를 지정하면 답변용 기본 설정 대신 사용합니다. (예: 질문 변환용 소형 모델)
+    backend = backend or config.LLM_BACKEND
+    if backend == "openai":
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(model_name=model or config.OPENAI_CHAT_MODEL, temperature=config.LLM_TEMPERATURE,
+                          api_key=api_key, max_tokens=max_tokens, timeout=config.LLM_REQUEST_TIMEOUT)
+    if backend == "local":
+        from langchain_community.chat_models import ChatOllama
+        return ChatOllama(model=model or config.LOCAL_LLM_MODEL, base_url=config.OLLAMA_BASE_URL,
+                          temperature=config.LLM_TEMPERATURE, num_predict=max_tokens,
+                          timeout=config.LLM_REQUEST_TIMEOUT)
+    raise ValueError(f"지원하지 않는 생성 백엔드입니다: {backend} (지원: {', '.join(SUPPORTED_BACKENDS)})")
+
+
+def create_reranker():
+    # 재순위화용 로컬 cross-encoder (CPU). sentence-transformers가 필요합니다.
+    try:
+        from sentence_transformers import CrossEncoder
+    except ImportError as e:
+        raise RuntimeError("재순위화를 사용하려면 `pip install sentence-transformers`가 필요합니다.") from e
+    from reranker import CrossEncoderReranker
+    model = CrossEncoder(config.RERANK_MODEL, device="cpu", max_length=config.RERANK_MAX_LENGTH)
+    return CrossEncoderReranker(model)
@@ -0,0 +1,125 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import config
+import metrics
+from vector_index import search_subset, with_distances
+
+# --- 배치 질의 엔진 ---
+# FAQ 사전 계산이나 평가처럼 많은 질문을 한꺼번에 처리할 때 질문마다 임베딩 요청과 FAISS 검색을 따로 하지 않고
+#  1) 질문을 BATCH_QUERY_SIZE개씩 묶어 임베딩 요청 한 번으로 벡터를 얻고
+#  2) 묶음 전체를 index.search 한 번(행렬 검색)으로 찾은 뒤 (라우팅을 쓰면 같은 카테고리 조합끼리 묶어 검색)
+#  3) 재순위화와 답변 생성은 크기가 제한된 작업자 풀에 나눠 맡깁니다.
+# 작업자가 앞 묶음의 답변을 생성하는 동안 다음 묶음의 임베딩과 검색이 진행됩니다.
+# setup_rag가 만든 답변 파이프라인의 검색 설정(k, 재순위화, 라우팅)과 캐시 / LLM 거버너 / 회로 차단기를 그대로 사용하므로
+# 응답 형식은 pipeline.answer와 같습니다.
+
+
+def default_workers():
+    # 파이썬 ThreadPoolExecutor 기본값과 같은 방식으로 코어 수에 맞춥니다.
+    return config.BATCH_QUERY_WORKERS or min(32, (os.cpu_count() or 1) + 4)
+
+
+def embed_queries(embeddings, queries):
+    # 질문 임베딩 캐시(CachedQueryEmbeddings)가 있으면 캐시를 거치고, 없으면 embed_documents 한 번으로 묶어 요청합니다.
+    batch = getattr(embeddings, "embed_queries", None)
+    return batch(queries) if batch is not None else embeddings.embed_documents(queries)
+
+
+def _documents(vectorstore, distances, indices):
+    found = [(int(i), d) for i, d in zip(indices, distances) if i != -1]
+    return with_distances([vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]) for i, _ in found],
+                          [d for _, d in found])
+
+
+def batch_search(vectorstore, query_vectors, k, allowed_ids=None):
+    # (질문 수, 차원) 벡터 행렬을 FAISS 검색 한 번으로 찾아 질문별 Document 목록(검색 거리 포함)을 돌려줍니다.
+    vectors = np.ascontiguousarray(query_vectors, dtype="float32").reshape(-1, vectorstore.index.d)
+    if getattr(vectorstore, "_normalize_L2", False):
+        import faiss
+        faiss.normalize_L2(vectors)
+    if allowed_ids:
+        distances, indices = search_subset(vectorstore.index, vectors, min(k, len(allowed_ids)), allowed_ids)
+    else:
+        distances, indices = vectorstore.index.search(vectors, k)
+    return [_documents(vectorstore, d, i) for d, i in zip(distances, indices)]
+
+
+class BatchQueryEngine:
+    def __init__(self, pipeline, batch_size=None, workers=None):
+        self.pipeline = pipeline
+        retriever = pipeline.qa_chain.retriever
+        self.vectorstore = retriever.vectorstore
+        self.reranker = getattr(retriever, "reranker", None)
+        self.router = getattr(retriever, "router", None)
+        self.ids_by_category = getattr(retriever, "ids_by_category", None) or {}
+        # 검색기와 같은 개수: 재순위화를 쓰면 fetch_k개 후보에서 k(top_n)개를 고릅니다.
+        self.k = getattr(retriever, "top_n", None) or retriever.k
+        self.fetch_k = retriever.fetch_k if self.reranker is not None else self.k
+        self.batch_size = batch_size or config.BATCH_QUERY_SIZE
+        self.workers = workers or default_workers()
+
+    def _search(self, queries):
+        with metrics.timer("batch_embedding"):
+            vectors = np.asarray(embed_queries(self.vectorstore.embeddings, queries), dtype="float32")
+        groups = defaultdict(list)
+        for row, query in enumerate(queries):
+            categories = self.router.route(query) if self.router is not None else None
+            if self.router is not None:
+                metrics.incr("routing_fallback" if categories is None else "routing_routed")
+            allowed = tuple(sorted(i for c in categories or [] for i in self.ids_by_category.get(c, [])))
+            groups[allowed].append(row) # 같은 카테고리 조합(또는 전체 검색)끼리 한 번에 검색
+        results = [None] * len(queries)
+        with metrics.timer("batch_search"):
+            for allowed, rows in groups.items():
+                for row, documents in zip(rows, batch_search(self.vectorstore, vectors[rows], self.fetch_k, allowed)):
+                    results[row] = documents
+        return results
+
+    def _finish(self, query, candidates):
+        if self.reranker is None:
+            return candidates
+        return self.reranker.rerank(query, candidates, top_n=self.k)
+
+    def _chunks(self, queries):
+        for start in range(0, len(queries), self.batch_size):
+            yield queries[start:start + self.batch_size]
+
+    def retrieve(self, queries):
+        # 질문별 검색 결과(Document 목록)를 질문 순서대로 돌려줍니다. 재순위화는 작업자 풀에서 실행합니다.
+        queries = list(queries)
+        futures = []
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch-query") as executor:
+            for chunk in self._chunks(queries):
+                futures += [executor.submit(self._finish, q, c) for q, c in zip(chunk, self._search(chunk))]
+        metrics.incr("batch_queries", len(queries))
+        return [f.result() for f in futures]
+
+    def answer(self, queries, queue_timeout=None, budget_reserve=0.0):
+        # 질문별 응답을 질문 순서대로 돌려줍니다. FAQ 표나 답변 캐시에 있는 질문은 검색 없이 그대로 가져오고,
+        # 실패한 질문(예: LLM 예산 부족)은 {"query", "error"}로 표시해 나머지 질문은 계속 진행합니다.
+        queries = list(queries)
+        # 묶음을 처리하는 동안 새 답변이 들어와 캐시에서 밀려날 수 있으므로 FAQ 표 / 캐시의 답변은 먼저 꺼내 둡니다.
+        cached = {q: self.pipeline.lookup(q) for q in queries}
+        results = {q: r for q, r in cached.items() if r is not None}
+        pending = list(dict.fromkeys(q for q in queries if q not in results)) # 같은 질문은 한 번만 처리
+
+        def generate(query, candidates):
+            try:
+                documents = self._finish(query, candidates)
+                return self.pipeline.answer(query, queue_timeout, budget_reserve, documents=documents)
+            except Exception as e:
+                metrics.incr("batch_query_failures")
+                return {"query": query, "error": str(e)}
+
+        futures = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch-query") as executor:
+            for chunk in self._chunks(pending):
+                for query, candidates in zip(chunk, self._search(chunk)):
+                    futures[query] = executor.submit(generate, query, candidates)
+        results.update((q, f.result()) for q, f in futures.items())
+        metrics.incr("batch_queries", len(queries))
+        return [results[q] for q in queries]
@@ -0,0 +1,82 @@
+# OpenAI 백엔드와 로컬 백엔드의 지연 시간, 처리량, 검색 품질을 비교합니다.
+# 사용법 (한밭대챗봇 폴더에서):
+#   python benchmarks/bench_backends.py --embedding openai,local --llm openai,local --generate 5
+import argparse
+import os
+import time
+
+import bench_utils
+from bench_utils import load_eval_questions, retrieval_scores, latency_summary, print_table
+
+import config
+from backends import create_embeddings, create_llm
+from rag_system import load_documents, split_documents, build_vectorstore, build_qa_chain
+
+
+def bench_embedding_backend(backend, texts, items, k, api_key):
+    embeddings = create_embeddings(api_key, backend=backend)
+
+    start = time.perf_counter()
+    vectorstore = build_vectorstore(texts, embeddings)
+    build_sec = time.perf_counter() - start
+
+    latencies = []
+    results = []
+    for item in items:
+        start = time.perf_counter()
+        results.append(vectorstore.similarity_search(item["question"], k=k))
+        latencies.append(time.perf_counter() - start)
+
+    row = {"embedding": backend, "chunks": len(texts), "index_build_s": build_sec,
+           "chunks_per_s": len(texts) / build_sec if build_sec else 0.0,
+           "queries_per_s": len(items) / sum(latencies)}
+    row.update(latency_summary(latencies))
+    row.update(retrieval_scores(results, items, k))
+    return row, vectorstore
+
+
+def bench_llm_backend(backend, vectorstore, items, api_key):
+    qa_chain = build_qa_chain(create_llm(api_key, backend=backend), vectorstore)
+    latencies = []
+    for item in items:
+        start = time.perf_counter()
+        qa_chain.invoke({"query": item["question"]})
+        latencies.append(time.perf_counter() - start)
+    row = {"llm": backend, "questions": len(items), "answers_per_s": len(items) / sum(latencies)}
+    row.update(latency_summary(latencies))
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="임베딩/생성 백엔드 비교 벤치마크")
+    parser.add_argument("--embedding", default="openai,local", help="비교할 임베딩 백엔드 (쉼표 구분)")
+    parser.add_argument("--llm", default="", help="비교할 생성 백엔드 (쉼표 구분, 비우면 생성 단계 생략)")
+    parser.add_argument("--generate", type=int, default=5, help="생성 벤치마크에 사용할 질문 수")
+    parser.add_argument("--k", type=int, default=config.RETRIEVER_K)
+    args = parser.parse_args()
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    documents, _, _ = load_documents()
+    texts = split_documents(documents)
+    items = load_eval_questions()
+
+    embedding_rows = []
+    vectorstores = {}
+    for backend in filter(None, args.embedding.split(",")):
+        row, vectorstores[backend] = bench_embedding_backend(backend, texts, items, args.k, api_key)
+        embedding_rows.append(row)
+    print(f"\n[검색] 질문 {len(items)}개, k={args.k}")
+    print_table(embedding_rows, ["embedding", "chunks", "index_build_s", "chunks_per_s", "queries_per_s",
+                                 "p50_ms", "p95_ms", "recall@k", "mrr"])
+
+    llm_backends = list(filter(None, args.llm.split(",")))
+    if llm_backends and vectorstores:
+        # 생성 단계는 검색 결과의 영향을 받지 않도록 첫 번째 임베딩 백엔드의 인덱스를 공통으로 사용합니다.
+        vectorstore = next(iter(vectorstores.values()))
+        llm_rows = [bench_llm_backend(b, vectorstore, items[:args.generate], api_key) for b in llm_backends]
+        print(f"\n[생성] 질문 {min(args.generate, len(items))}개")
+        print_table(llm_rows, ["llm", "questions", "answers_per_s", "mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
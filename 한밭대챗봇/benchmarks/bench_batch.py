@@ -0,0 +1,132 @@
+# 배치 질의 엔진(batch_query.py)과 질문을 하나씩 처리하는 기존 경로의 처리량(질문/초)을 비교합니다.
+#  1) 검색만: retriever.invoke를 질문마다 호출 vs 묶음 임베딩 + FAISS 행렬 검색
+#  2) 답변까지: pipeline.answer를 하나씩(순차 / 같은 수의 스레드) vs 배치 엔진(작업자 수별)
+# 기본값은 API 호출 없이 응답 시간을 흉내 내는 가짜 임베딩(요청당 왕복 지연 + 질문당 비용)과 가짜 LLM을 사용하고,
+# --real을 주면 설정된 백엔드(OpenAI 또는 로컬)를 사용합니다. (API 비용 발생)
+# 사용법 (한밭대챗봇 폴더에서):
+#   python benchmarks/bench_batch.py --queries 400 --workers 1 4 16 --generate 100
+import argparse
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import bench_utils
+from bench_utils import load_eval_questions, print_table
+
+from langchain_core.embeddings import Embeddings
+
+import config
+from answer_cache import CachedQueryEmbeddings
+from answer_pipeline import AnswerPipeline
+from backends import create_embeddings, create_llm
+from batch_query import BatchQueryEngine
+from bench_rate_limit import SlowFakeLLM
+from query_router import QueryRouter
+from rag_system import build_qa_chain, build_vectorstore, load_documents, split_documents
+
+
+class SlowFakeEmbeddings(Embeddings):
+    # 임베딩 API처럼 요청마다 왕복 지연(request_latency)이 있고 텍스트 수에 비례한 비용(per_text)이 드는 가짜 임베딩
+    def __init__(self, size=256, request_latency=0.05, per_text=0.0005):
+        self.size = size
+        self.request_latency = request_latency
+        self.per_text = per_text
+
+    def _vector(self, text):
+        seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest(), 16) % 10**8
+        return np.random.default_rng(seed).normal(size=self.size).tolist()
+
+    def embed_documents(self, texts):
+        time.sleep(self.request_latency + self.per_text * len(texts))
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def make_queries(n):
+    # 평가 질문에 번호를 붙여 서로 다른 질문 n개를 만듭니다. (임베딩 / 답변 캐시에 걸리지 않도록)
+    questions = [item["question"] for item in load_eval_questions()]
+    return [f"{questions[i % len(questions)]} ({i // len(questions) + 1}번째)" for i in range(n)]
+
+
+def make_models(args, api_key):
+    if args.real:
+        return create_embeddings(api_key), create_llm(api_key)
+    return (SlowFakeEmbeddings(request_latency=args.embed_latency, per_text=args.embed_per_text),
+            SlowFakeLLM(responses=["-"], latency=args.llm_latency))
+
+
+def make_pipeline(args, api_key, vectorstore):
+    # 측정마다 빈 질문 임베딩 캐시와 새 LLM으로 시작합니다. (청크 임베딩으로 만든 인덱스는 재사용)
+    embeddings, llm = make_models(args, api_key)
+    vectorstore.embedding_function = CachedQueryEmbeddings(embeddings)
+    router = QueryRouter() if config.ROUTING_ENABLED else None
+    # 처리량만 비교하도록 답변 캐시 / 거버너 / 회로 차단기 / 동시 요청 합치기는 끕니다.
+    return AnswerPipeline(build_qa_chain(llm, vectorstore, router=router), "bench", coalesce=False)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def row(mode, workers, n, seconds, baseline=None):
+    qps = n / seconds if seconds else 0.0
+    return {"mode": mode, "workers": workers, "queries": n, "seconds": seconds, "qps": qps,
+            "speedup": qps / baseline if baseline else 1.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="배치 질의 엔진 처리량 벤치마크")
+    parser.add_argument("--queries", type=int, default=400, help="검색 처리량 측정에 쓸 질문 수")
+    parser.add_argument("--generate", type=int, default=100, help="답변 생성까지 측정할 질문 수 (0이면 생략)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--batch-size", type=int, default=config.BATCH_QUERY_SIZE)
+    parser.add_argument("--real", action="store_true", help="가짜 모델 대신 설정된 임베딩 / 생성 백엔드 사용")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="가짜 임베딩 요청당 왕복 지연(초)")
+    parser.add_argument("--embed-per-text", type=float, default=0.0005, help="가짜 임베딩 질문당 비용(초)")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="가짜 LLM 응답 시간(초)")
+    args = parser.parse_args()
+    api_key = os.getenv("OPENAI_API_KEY")
+    documents, _, _ = load_documents()
+    vectorstore = build_vectorstore(split_documents(documents), make_models(args, api_key)[0])
+
+    queries = make_queries(args.queries)
+    pipeline = make_pipeline(args, api_key, vectorstore)
+    single = timed(lambda: [pipeline.qa_chain.retriever.invoke(q) for q in queries])
+    baseline = len(queries) / single
+    rows = [row("single", 1, len(queries), single)]
+    for workers in args.workers:
+        engine = BatchQueryEngine(make_pipeline(args, api_key, vectorstore), batch_size=args.batch_size, workers=workers)
+        rows.append(row("batch", workers, len(queries), timed(lambda: engine.retrieve(queries)), baseline))
+    print(f"\n[검색만] 질문 {len(queries)}개, 묶음 크기 {args.batch_size}, CPU 코어 {os.cpu_count()}개")
+    print_table(rows, ["mode", "workers", "queries", "seconds", "qps", "speedup"])
+
+    if not args.generate:
+        return
+    queries = make_queries(args.generate)
+    pipeline = make_pipeline(args, api_key, vectorstore)
+    single = timed(lambda: [pipeline.answer(q) for q in queries])
+    baseline = len(queries) / single
+    rows = [row("single", 1, len(queries), single)]
+    for workers in args.workers:
+        pipeline = make_pipeline(args, api_key, vectorstore)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            seconds = timed(lambda: list(executor.map(pipeline.answer, queries)))
+        rows.append(row("single_pool", workers, len(queries), seconds, baseline))
+        engine = BatchQueryEngine(make_pipeline(args, api_key, vectorstore), batch_size=args.batch_size, workers=workers)
+        responses = []
+        seconds = timed(lambda: responses.extend(engine.answer(queries)))
+        failed = sum("error" in r for r in responses)
+        rows.append(dict(row("batch", workers, len(queries), seconds, baseline), failed=failed))
+    print(f"\n[답변 생성까지] 질문 {len(queries)}개 (single_pool: 하나씩 처리하는 경로를 같은 수의 스레드로 실행)")
+    print_table(rows, ["mode", "workers", "queries", "seconds", "qps", "speedup", "failed"])
+
+
+if __name__ == "__main__":
+    main()
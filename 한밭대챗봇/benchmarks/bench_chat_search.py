@@ -0,0 +1,108 @@
+# 대용량 합성 채팅 기록에서 FTS5(trigram) 관련도 검색과 LIKE 스캔(정렬 없이 최신순 LIMIT)의 지연 시간을 비교합니다.
+# 사용법 (한밭대챗봇 폴더에서):
+#   python benchmarks/bench_chat_search.py --messages 2000000 --db /tmp/chat_bench.db
+import argparse
+import os
+import random
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import bench_utils
+from bench_utils import latency_summary, print_table
+
+import config
+from chat_search import search_messages
+from db_manager import init_db
+
+QUERIES = ["국가장학금", "기숙사 통금", "학사경고", "와이파이 비밀번호", "졸업 학점", "근로장학금 신청", "생활관비 분할"]
+
+
+def corpus_lines():
+    # 실제 문서 문장을 재조합해 한국어 질문/답변과 비슷한 분포의 텍스트를 만듭니다.
+    lines = []
+    for file_name in config.DOC_FILES:
+        with open(os.path.join(config.DOC_DIR, file_name), encoding="utf-8") as f:
+            lines.extend(line.strip(" *#-") for line in f if len(line.strip()) > 10)
+    return lines
+
+
+def generate(db_path, n_messages, messages_per_session=10, batch_size=50000, seed=0):
+    rng = random.Random(seed)
+    lines = corpus_lines()
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    start_time = datetime(2026, 1, 1)
+    start = time.perf_counter()
+    sessions, messages = [], []
+    for i in range(n_messages):
+        if i % messages_per_session == 0:
+            session_id = str(uuid.UUID(int=rng.getrandbits(128)))
+            ts = start_time + timedelta(seconds=i * 3)
+            sessions.append((session_id, rng.choice(lines)[:40], ts.strftime("%Y-%m-%d %H:%M:%S"),
+                             ts.strftime("%Y-%m-%d %H:%M:%S")))
+        role = "user" if i % 2 == 0 else "assistant"
+        content = rng.choice(lines) if role == "user" else " ".join(rng.choices(lines, k=3))
+        messages.append((session_id, role, content,
+                         (start_time + timedelta(seconds=i * 3)).strftime("%Y-%m-%d %H:%M:%S")))
+        if len(messages) >= batch_size:
+            _flush(conn, sessions, messages)
+    _flush(conn, sessions, messages)
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed
+
+
+def _flush(conn, sessions, messages):
+    with conn:
+        conn.executemany("INSERT INTO chat_sessions VALUES (?, ?, ?, ?)", sessions)
+        conn.executemany("INSERT INTO chat_messages (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+                         messages)
+    sessions.clear()
+    messages.clear()
+
+
+def like_search(conn, query, limit=20):
+    sql = "SELECT message_id FROM chat_messages WHERE " + " AND ".join("content LIKE ?" for _ in query.split())
+    return conn.execute(sql + " ORDER BY message_id DESC LIMIT ?", [f"%{t}%" for t in query.split()] + [limit]).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="채팅 기록 전문 검색 벤치마크")
+    parser.add_argument("--messages", type=int, default=2000000)
+    parser.add_argument("--db", default="/tmp/chat_search_bench.db")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-like", action="store_true", help="느린 LIKE 전체 스캔 비교를 생략합니다.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        elapsed = generate(args.db, args.messages)
+        print(f"합성 데이터 생성: 메시지 {args.messages:,}개, {elapsed:.1f}초 ({args.messages / elapsed:,.0f} rows/s, 트리거 색인 포함)")
+    print(f"DB 크기: {os.path.getsize(args.db) / 2**20:,.1f} MB")
+
+    conn = sqlite3.connect(args.db)
+    rows = []
+    for query in QUERIES:
+        fts, like = [], []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            hits = search_messages(conn, query, limit=20)
+            fts.append(time.perf_counter() - start)
+            if not args.skip_like:
+                start = time.perf_counter()
+                like_search(conn, query)
+                like.append(time.perf_counter() - start)
+        row = {"query": query, "hits": len(hits), "fts_p50_ms": latency_summary(fts)["p50_ms"],
+               "fts_p95_ms": latency_summary(fts)["p95_ms"]}
+        if like:
+            row["like_scan_p50_ms"] = latency_summary(like)["p50_ms"]
+        rows.append(row)
+    conn.close()
+    print_table(rows, ["query", "hits", "fts_p50_ms", "fts_p95_ms", "like_scan_p50_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# 동일 질문 동시 요청 합치기(single-flight) 부하 테스트 (가짜 LLM과 임베딩 사용, API 호출 없음)
+# 같은 질문 N개를 동시에 보냈을 때 LLM 호출 수와 응답 시간을 합치기 사용/미사용으로 비교합니다.
+# 표기만 다른 질문("기숙사 통금 시간 알려줘." / "기숙사  통금 시간 알려줘")도 같은 요청으로 합쳐집니다.
+# 사용법 (한밭대챗봇 폴더에서):
+#   python benchmarks/bench_coalescing.py --burst 50
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bench_utils
+from bench_utils import latency_summary, print_table
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+from answer_pipeline import AnswerPipeline
+from bench_rate_limit import SlowFakeLLM
+from rag_system import build_qa_chain, build_vectorstore, load_documents, split_documents
+
+QUESTION_VARIANTS = ["기숙사 통금 시간 알려줘.", "기숙사 통금 시간 알려줘", "기숙사  통금 시간 알려줘?"]
+
+
+def burst(pipeline, n):
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(n)
+
+    def ask(i):
+        barrier.wait() # 모든 요청이 같은 순간에 출발하도록
+        start = time.perf_counter()
+        pipeline.answer(QUESTION_VARIANTS[i % len(QUESTION_VARIANTS)])
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=n) as executor:
+        list(executor.map(ask, range(n)))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="동일 질문 동시 요청 합치기 부하 테스트")
+    parser.add_argument("--burst", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5, help="가짜 LLM 응답 시간(초)")
+    args = parser.parse_args()
+
+    documents, _, _ = load_documents()
+    vectorstore = build_vectorstore(split_documents(documents), DeterministicFakeEmbedding(size=256))
+
+    rows = []
+    for coalesce in (False, True):
+        llm = SlowFakeLLM(responses=["-"], latency=args.latency)
+        # 답변 캐시가 있어도 동시에 도착한 요청은 모두 캐시 미스이므로, 합치기 효과만 보기 위해 캐시는 끕니다.
+        pipeline = AnswerPipeline(build_qa_chain(llm, vectorstore), "bench", answer_cache=None, coalesce=coalesce)
+        latencies = burst(pipeline, args.burst)
+        rows.append(dict(coalesce=coalesce, requests=args.burst, llm_calls=llm.calls, **latency_summary(latencies)))
+
+    print(f"[동일 질문 {args.burst}개 동시 요청] 가짜 LLM 응답 시간 {args.latency}s")
+    print_table(rows, ["coalesce", "requests", "llm_calls", "p50_ms", "p95_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# 대화 맥락 반영 검색의 효과를 측정합니다.
+#  1) 후속 질문 검색 품질: 원래 질문 그대로 검색 vs. 독립 질문으로 변환 후 검색 (recall@k)
+#  2) 질문 변환 지연 시간: 최초 호출(LLM) vs. 캐시 적중
+#  3) chat_history.db 기준 재질문 비율 (배포일 전/후 비교)
+# 사용법 (한밭대챗봇 폴더에서):
+#   python benchmarks/bench_conversation.py --split-date 2026-10-20
+import argparse
+import os
+import sqlite3
+import time
+
+import bench_utils
+from bench_utils import retrieval_scores, latency_summary, print_table
+
+import config
+from backends import create_embeddings, create_llm
+from conversation import QueryCondenser, build_history_window, is_reask
+from rag_system import load_documents, split_documents, build_vectorstore
+
+# (첫 질문, 후속 질문, 후속 질문의 정답 문서, 정답 키워드)
+FOLLOW_UP_DIALOGS = [
+    ("기숙사 통금 시간 알려줘.", "그럼 외박은?", "dorm_rules.txt", ["외박"]),
+    ("기숙사 식사 시간이 언제야?", "점호는?", "dorm_rules.txt", ["점호"]),
+    ("국가장학금 신청 기준이 뭐야?", "그거 중복으로 받을 수 있어?", "scholarship_guidelines.txt", ["중복"]),
+    ("졸업하려면 총 몇 학점 들어야 해?", "그럼 학사경고 기준은?", "school_rules.txt", ["학사경고"]),
+    ("휴학은 최대 몇 학기까지 가능해?", "그럼 복학은 언제 신청해?", "school_rules.txt", ["복학"]),
+    ("공학계열 기본전공 학점은 얼마야?", "인문계열은?", "credit_system.txt", ["인문계열"]),
+    ("학교 와이파이 아이디가 뭐야?", "안드로이드는 어떻게 연결해?", "wifi_info.txt", ["GTC", "Android"]),
+]
+
+
+def reask_rate(db_path, split_date=None):
+    # 세션별로 연속된 사용자 질문을 비교해 재질문 비율을 계산합니다. split_date 기준 전/후로 나눕니다.
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        "SELECT session_id, content, timestamp FROM chat_messages WHERE role = 'user' ORDER BY session_id, message_id"
+    ).fetchall()
+    conn.close()
+    buckets = {"before": [0, 0], "after": [0, 0]}
+    previous = {}
+    for session_id, content, timestamp in rows:
+        bucket = buckets["after" if split_date and timestamp >= split_date else "before"]
+        bucket[0] += 1
+        if is_reask(previous.get(session_id), content):
+            bucket[1] += 1
+        previous[session_id] = content
+    return [{"period": name, "questions": total, "reasks": reasks, "reask_rate": reasks / total if total else 0.0}
+            for name, (total, reasks) in buckets.items() if total]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="대화 맥락 반영 검색 벤치마크")
+    parser.add_argument("--db", default=os.path.join(config.BASE_DIR, config.DB_NAME))
+    parser.add_argument("--split-date", default=None, help="재질문 비율을 전/후로 나눌 기준 시각 (예: 2026-10-20)")
+    parser.add_argument("--k", type=int, default=config.RETRIEVER_K)
+    args = parser.parse_args()
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    documents, _, _ = load_documents()
+    vectorstore = build_vectorstore(split_documents(documents), create_embeddings(api_key))
+    condenser = QueryCondenser(create_llm(api_key, model=config.CONDENSE_MODEL or None,
+                                          max_tokens=config.CONDENSE_MAX_TOKENS))
+
+    items, raw_results, condensed_results = [], [], []
+    cold, warm = [], []
+    for first_question, follow_up, source, keywords in FOLLOW_UP_DIALOGS:
+        # 이전 답변 자리에는 첫 질문의 최상위 검색 청크를 넣어 실제 대화와 비슷한 맥락을 만듭니다.
+        previous_answer = vectorstore.similarity_search(first_question, k=1)[0].page_content
+        messages = [
+            {"role": "user", "content": first_question},
+            {"role": "assistant", "content": previous_answer, "sources": []},
+        ]
+        history = build_history_window(messages)
+
+        start = time.perf_counter()
+        standalone = condenser.condense(history, follow_up)
+        cold.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        condenser.condense(history, follow_up)
+        warm.append(time.perf_counter() - start)
+
+        items.append({"question": follow_up, "source": source, "keywords": keywords})
+        raw_results.append(vectorstore.similarity_search(follow_up, k=args.k))
+        condensed_results.append(vectorstore.similarity_search(standalone, k=args.k))
+        print(f"  {follow_up!r} → {standalone!r}")
+
+    quality = [dict(mode="raw", **retrieval_scores(raw_results, items, args.k)),
+               dict(mode="condensed", **retrieval_scores(condensed_results, items, args.k))]
+    print(f"\n[후속 질문 검색 품질] 대화 {len(items)}개, k={args.k}")
+    print_table(quality, ["mode", "recall@k", "mrr"])
+
+    latency = [dict(call="cold (LLM)", **latency_summary(cold)), dict(call="cached", **latency_summary(warm))]
+    print("\n[질문 변환 추가 지연]")
+    print_table(latency, ["call", "mean_ms", "p50_ms", "p95_ms"])
+
+    if os.path.exists(args.db):
+        print(f"\n[재질문 비율] {args.db}")
+        print_table(reask_rate(args.db, args.split_date), ["period", "questions", "reasks", "reask_rate"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# 채팅 기록 내보내기 / 가져오기 처리량(rows/sec)과 최대 메모리(RSS) 측정
+# 각 단계를 별도 프로세스(chat_export.py CLI)로 실행해 단계별 최대 RSS를 따로 잽니다.
+# 사용법 (한밭대챗봇 폴더에서):
+#   python benchmarks/bench_export.py --messages 10000000 --workdir /tmp/chat_export_bench
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import bench_utils
+from bench_utils import print_table
+
+import config
+from bench_chat_search import generate
+
+CLI = os.path.join(config.BASE_DIR, "chat_export.py")
+
+
+def run_cli(*args):
+    output = subprocess.run([sys.executable, CLI, *args], check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="채팅 기록 내보내기 / 가져오기 벤치마크")
+    parser.add_argument("--messages", type=int, default=10000000)
+    parser.add_argument("--workdir", default="/tmp/chat_export_bench")
+    parser.add_argument("--keep", action="store_true", help="생성한 합성 DB를 재사용합니다.")
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    source_db = os.path.join(args.workdir, f"source_{args.messages}.db")
+    if not (args.keep and os.path.exists(source_db)):
+        if os.path.exists(source_db):
+            os.remove(source_db)
+        print(f"합성 DB 생성 중: 메시지 {args.messages}개 ...")
+        generate(source_db, args.messages)
+
+    rows = []
+    for fmt in ("jsonl", "parquet"):
+        out_dir = os.path.join(args.workdir, f"export_{fmt}")
+        shutil.rmtree(out_dir, ignore_errors=True)
+        stats = run_cli("export", "--db", source_db, "--out", out_dir, "--format", fmt)
+        size_mb = sum(os.path.getsize(os.path.join(out_dir, f)) for f in os.listdir(out_dir)) / 1024 ** 2
+        rows.append(dict(step=f"export {fmt}", rows=stats["messages"], rows_per_sec=stats["rows_per_sec"],
+                         peak_rss_mb=stats["peak_rss_mb"], output_mb=round(size_mb, 1)))
+        # 새 메시지가 없을 때 이어서 내보내기는 워터마크만 확인하고 바로 끝납니다.
+        resumed = run_cli("export", "--db", source_db, "--out", out_dir, "--format", fmt)
+        rows.append(dict(step=f"export {fmt} (resume)", rows=resumed["messages"], rows_per_sec="-",
+                         peak_rss_mb=resumed["peak_rss_mb"], output_mb="-"))
+
+        for mode, extra in (("preserve-ids", ["--preserve-ids"]), ("merge", [])):
+            target_db = os.path.join(args.workdir, f"import_{fmt}_{mode}.db")
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(target_db + suffix):
+                    os.remove(target_db + suffix)
+            stats = run_cli("import", "--db", target_db, "--in", out_dir, *extra)
+            rows.append(dict(step=f"import {fmt} ({mode})", rows=stats["messages_inserted"],
+                             rows_per_sec=stats["rows_per_sec"], peak_rss_mb=stats["peak_rss_mb"], output_mb="-"))
+
+    print(f"\n[채팅 기록 내보내기 / 가져오기] 메시지 {args.messages}개")
+    print_table(rows, ["step", "rows", "rows_per_sec", "peak_rss_mb", "output_mb"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# 합성 코퍼스에서 인덱스 종류별 recall@k / 지연 시간 / 메모리를 비교합니다.
+# 실제 임베딩 대신 군집 구조를 가진 랜덤 벡터를 사용하므로 API 키 없이 실행됩니다. (numpy, faiss-cpu 필요)
+# 사용법 (한밭대챗봇 폴더에서):
+#   python benchmarks/bench_index.py --n 100000 --dim 768 --types flat,ivf,ivf_sq8,ivf_pq,hnsw,hnsw_sq8
+import argparse
+import time
+
+import numpy as np
+
+import bench_utils
+from bench_utils import latency_summary, print_table
+
+from vector_index import build_index, configure_search_params, factory_string, index_memory_bytes
+
+
+def synthetic_corpus(n, dim, n_queries, n_clusters=256, seed=0):
+    # 실제 문서 임베딩처럼 주제별로 뭉쳐 있는 분포를 흉내 냅니다.
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim)).astype("float32")
+    labels = rng.integers(0, n_clusters, size=n + n_queries)
+    data = centers[labels] + 0.35 * rng.normal(size=(n + n_queries, dim)).astype("float32")
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    return data[:n], data[n:]
+
+
+def recall_at_k(found, truth, k):
+    return float(np.mean([len(set(f[:k]) & set(t[:k])) / k for f, t in zip(found, truth)]))
+
+
+def measure(index, queries, truth, k, single_queries):
+    start = time.perf_counter()
+    _, found = index.search(queries, k)
+    batch_sec = time.perf_counter() - start
+    latencies = []
+    for q in queries[:single_queries]:
+        start = time.perf_counter()
+        index.search(q.reshape(1, -1), k)
+        latencies.append(time.perf_counter() - start)
+    row = {"recall@k": recall_at_k(found, truth, k), "batch_qps": len(queries) / batch_sec}
+    row.update(latency_summary(latencies))
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="벡터 인덱스 종류별 recall/지연/메모리 벤치마크")
+    parser.add_argument("--n", type=int, default=100000, help="코퍼스 벡터(청크) 수")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--single-queries", type=int, default=200, help="단건 지연 측정에 쓸 질의 수")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", default="flat,flat_fp16,flat_int8,ivf,ivf_sq8,ivf_pq,hnsw,hnsw_sq8")
+    parser.add_argument("--nprobe", default="4,16,64", help="IVF 계열에서 시험할 nprobe 값들")
+    parser.add_argument("--ef", default="32,64,128", help="HNSW 계열에서 시험할 efSearch 값들")
+    args = parser.parse_args()
+
+    corpus, queries = synthetic_corpus(args.n, args.dim, args.queries)
+    exact = build_index(corpus, "flat")
+    _, truth = exact.search(queries, args.k)
+
+    rows = []
+    for index_type in args.types.split(","):
+        start = time.perf_counter()
+        index = build_index(corpus, index_type)
+        build_sec = time.perf_counter() - start
+        base = {"type": index_type, "factory": factory_string(index_type, args.dim, args.n),
+                "build_s": build_sec, "memory_mb": index_memory_bytes(index) / 2**20}
+        if index_type.startswith("ivf"):
+            sweep = [("nprobe", int(v)) for v in args.nprobe.split(",")]
+        elif index_type.startswith("hnsw"):
+            sweep = [("ef", int(v)) for v in args.ef.split(",")]
+        else:
+            sweep = [("-", None)]
+        for name, value in sweep:
+            if name == "nprobe":
+                configure_search_params(index, nprobe=value)
+            elif name == "ef":
+                configure_search_params(index, ef_search=value)
+            row = dict(base, param=f"{name}={value}" if value else "-")
+            row.update(measure(index, queries, truth, args.k, args.single_queries))
+            rows.append(row)
+
+    print(f"\n[인덱스 비교] N={args.n}, dim={args.dim}, 질의 {args.queries}개, k={args.k}")
+    print_table(rows, ["type", "factory", "param", "build_s", "memory_mb", "recall@k",
+                       "p50_ms", "p95_ms", "batch_qps"])
+
+
+if __name__ == "__main__":
+    main()
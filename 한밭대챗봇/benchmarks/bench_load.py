@@ -0,0 +1,330 @@
+# 동시 채팅 세션 부하 테스트: 실제 `streamlit run` 서버를 띄우고, 브라우저와 같은 웹소켓 프로토콜로 여러 세션을 동시에 구동합니다.
+# 각 세션은 질문 입력 → 전송 → (st.rerun, 타이핑 표시) → 답변 생성 → save_message → (st.rerun) 한 사이클이 끝날 때까지 기다리며,
+# 생각하는 시간(think time)을 두고 후속 질문이 섞인 대화 스크립트를 진행합니다.
+# 서버 프로세스의 LLM과 임베딩은 지연 시간을 조절할 수 있는 대역(stand-in)으로 바꿔 API 호출 없이 실행됩니다.
+# (Streamlit 테스트 API(AppTest)는 실행마다 전역 상태를 바꿔 동시 실행을 지원하지 않으므로 실제 서버를 사용합니다.)
+# 보고 항목: 동시 세션 수별 처리량(답변/초), 응답 지연 백분위수, 오류율, SQLite 잠금 오류 수, 세션당 서버 메모리(RSS)
+# 사용법 (한밭대챗봇 폴더에서, Linux):
+#   python benchmarks/bench_load.py --concurrency 1 10 50 100 --llm-latency 1.5
+#   (생각 시간이 짧으면 클라이언트별 속도 제한(RATE_LIMIT_*)에 걸리므로 처리량 한계를 볼 때는 --no-rate-limit을 함께 사용)
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import Counter
+
+import bench_utils
+from bench_utils import latency_summary, load_eval_questions, print_table
+
+APP_PATH = os.path.join(bench_utils.APP_DIR, "app.py")
+FOLLOW_UPS = ["그럼 신청 기간은 언제야?", "그거 조금 더 자세히 알려줘", "다른 조건도 있어?"]
+ANSWER = "한밭대학교 규정에 따르면 해당 내용은 다음과 같습니다. " * 8
+
+
+# --- 서버 프로세스 (--serve) ---
+
+def serve(args):
+    # app.py는 실행될 때마다 backends에서 함수를 가져오므로 이 프로세스의 모듈 속성만 바꾸면 대역으로 바뀝니다.
+    import backends
+    from langchain_community.embeddings import DeterministicFakeEmbedding
+    from langchain_core.language_models.llms import LLM
+    from streamlit.web import bootstrap
+
+    class StandInLLM(LLM):
+        # 평균 latency초(표준편차 latency*jitter)의 응답 시간을 흉내 냅니다. 질문 변환 프롬프트에는 후속 질문을 그대로 돌려줍니다.
+        latency: float = 1.0
+        jitter: float = 0.3
+
+        @property
+        def _llm_type(self):
+            return "stand-in"
+
+        def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+            if "독립된 질문:" in prompt:
+                time.sleep(self.latency * 0.2)
+                return prompt.rsplit("후속 질문:", 1)[1].split("\n")[0].strip()
+            time.sleep(max(0.0, random.gauss(self.latency, self.latency * self.jitter)))
+            return ANSWER
+
+    llm = StandInLLM(latency=args.llm_latency, jitter=args.llm_jitter)
+    backends.create_llm = lambda *a, **kw: llm
+    backends.create_embeddings = lambda *a, **kw: DeterministicFakeEmbedding(size=256)
+
+    flags = {"server.port": args.port, "server.headless": True, "browser.gatherUsageStats": False,
+             "global.developmentMode": False, "secrets.files": [os.path.join(args.workdir, "secrets.toml")]}
+    bootstrap.load_config_options(flag_options=flags)
+    bootstrap.run(APP_PATH, False, [], flags)
+
+
+# --- 웹소켓 클라이언트 (브라우저 대역) ---
+
+class ChatClient:
+    def __init__(self, url):
+        self.url = url
+        self.ws = None
+        self.elements = []
+        self.radio_value = None
+
+    async def connect(self):
+        from websockets.asyncio.client import connect
+        self.ws = await connect(self.url, max_size=None)
+        await self.rerun([])
+
+    async def rerun(self, widgets):
+        # 위젯 상태를 보내고, 중간의 st.rerun을 모두 거쳐 스크립트가 정상 종료될 때까지 화면 요소를 모읍니다.
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.widget_states.widgets.extend(widgets + self._radio_state())
+        await self.ws.send(msg.SerializeToString())
+        elements = []
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await self.ws.recv())
+            kind = forward.WhichOneof("type")
+            if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                elements.append(forward.delta.new_element)
+            elif kind == "script_finished":
+                if forward.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    elements = []
+                    continue
+                self.elements = elements
+                self._remember_radio()
+                return elements
+
+    def _radio_state(self):
+        # 브라우저처럼 사이드바 라디오 버튼의 현재 선택(표시 텍스트)을 함께 보냅니다.
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        radio = self.find("radio")
+        if radio is None or self.radio_value is None:
+            return []
+        return [WidgetState(id=radio.id, string_value=self.radio_value)]
+
+    def _remember_radio(self):
+        radio = self.find("radio")
+        if radio is None:
+            return
+        if radio.set_value:
+            self.radio_value = radio.raw_value
+        elif self.radio_value not in radio.options and radio.options:
+            self.radio_value = radio.options[radio.default]
+
+    def find(self, kind, predicate=lambda e: True):
+        for element in self.elements:
+            if element.WhichOneof("type") == kind and predicate(getattr(element, kind)):
+                return getattr(element, kind)
+        return None
+
+    async def ask(self, question):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        text_input = self.find("text_input", lambda e: e.form_id == "chat_input_form")
+        submit = self.find("button", lambda e: e.is_form_submitter)
+        if text_input is None or submit is None:
+            return "no_input"
+        await self.rerun([WidgetState(id=text_input.id, string_value=question),
+                          WidgetState(id=submit.id, trigger_value=True)])
+        return self.classify(question)
+
+    def classify(self, question):
+        for element in self.elements:
+            kind = element.WhichOneof("type")
+            if kind == "exception":
+                message = element.exception.message
+                return "sqlite_locked" if "database is locked" in message or "database is busy" in message else "error"
+            if kind == "alert" and "너무 빠르게" in element.alert.body:
+                return "rate_limited"
+        bubbles = [e.markdown.body for e in self.elements
+                   if e.WhichOneof("type") == "markdown" and ('class="chat-user"' in e.markdown.body
+                                                               or 'class="chat-bot"' in e.markdown.body)]
+        if len(bubbles) < 2 or question not in bubbles[-2]:
+            return "session_switched" # 방금 보낸 질문이 아닌 다른 대화가 보임
+        if "⚠️" in bubbles[-1]:
+            return "error"
+        return "ok" if ANSWER[:20] in bubbles[-1] else "no_answer"
+
+    async def close(self):
+        await self.ws.close()
+
+
+def conversation_scripts(count, turns):
+    # 평가용 질문에 후속 질문을 섞어 세션별 대화 스크립트를 만듭니다. (세션마다 시작 질문이 달라지도록 순환)
+    questions = [item["question"] for item in load_eval_questions()]
+    scripts = []
+    for i in range(count):
+        script = []
+        for t in range(turns):
+            if t % 2 == 1:
+                script.append(FOLLOW_UPS[(i + t) % len(FOLLOW_UPS)])
+            else:
+                script.append(questions[(i + t) % len(questions)])
+        scripts.append(script)
+    return scripts
+
+
+def server_rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def run_session(url, script, args, stats, all_done, release):
+    client = ChatClient(url)
+    try:
+        await asyncio.wait_for(client.connect(), args.timeout)
+        for question in script:
+            await asyncio.sleep(random.uniform(*args.think_time))
+            start = time.perf_counter()
+            try:
+                outcome = await asyncio.wait_for(client.ask(question), args.timeout)
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+            stats["turns"] += 1
+            stats[outcome] += 1
+            if outcome == "ok":
+                stats["latencies"].append(time.perf_counter() - start)
+            stats["errors_seen"].extend(e.exception.message[:200] for e in client.elements
+                                        if e.WhichOneof("type") == "exception")
+    except Exception as e:
+        stats["connection_errors"] += 1
+        stats["errors_seen"].append(repr(e)[:200])
+    finally:
+        stats["done"] += 1
+        if stats["done"] == stats["sessions"]:
+            all_done.set_result(None)
+    # 모든 세션이 끝날 때까지 연결을 유지해 서버가 세션 상태를 들고 있는 동안의 메모리를 잽니다.
+    await release
+    if client.ws is not None:
+        await client.close()
+
+
+async def run_level(url, pid, concurrency, args):
+    stats = Counter(sessions=concurrency)
+    stats["latencies"], stats["errors_seen"] = [], []
+    loop = asyncio.get_running_loop()
+    all_done, release = loop.create_future(), loop.create_future()
+    rss_before = server_rss_mb(pid)
+    start = time.perf_counter()
+    tasks = [asyncio.create_task(run_session(url, script, args, stats, all_done, release))
+             for script in conversation_scripts(concurrency, args.turns)]
+    await all_done
+    elapsed = time.perf_counter() - start
+    rss_after = server_rss_mb(pid)
+    release.set_result(None)
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for message, count in Counter(stats["errors_seen"]).most_common(3):
+        print(f"  예외 {count}회: {message}")
+    expected = concurrency * args.turns
+    return dict(
+        sessions=concurrency,
+        turns=stats["turns"],
+        throughput_qps=stats["ok"] / elapsed,
+        **latency_summary(stats["latencies"]),
+        error_rate=(expected - stats["ok"]) / expected,
+        sqlite_locked=stats["sqlite_locked"],
+        rate_limited=stats["rate_limited"],
+        timeouts=stats["timeout"],
+        session_switched=stats["session_switched"],
+        connection_errors=stats["connection_errors"],
+        server_rss_mb=rss_after,
+        rss_per_session_kb=max(0.0, rss_after - rss_before) * 1024 / concurrency,
+    )
+
+
+def start_server(args, workdir):
+    # config는 임포트 시점에 환경 변수를 읽으므로 서버 프로세스의 환경 변수로 설정합니다.
+    env = dict(os.environ, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "sk-load-test"),
+               CHAT_DB_PATH=os.path.join(workdir, "chat_history.db"),
+               INDEX_DIR=os.path.join(workdir, "vector_index"), # 실제 인덱스(다른 임베딩 차원)를 불러오지 않도록
+               CHUNK_STORE_DIR=os.path.join(workdir, "chunk_store"),
+               WARMUP_ENABLED="false")
+    if args.no_answer_cache:
+        env.update(ANSWER_CACHE_ENABLED="false", COALESCE_ENABLED="false")
+    if args.no_rate_limit:
+        env["RATE_LIMIT_ENABLED"] = "false"
+    with open(os.path.join(workdir, "secrets.toml"), "w", encoding="utf-8") as f:
+        f.write(f'openai_api_key = "{env["OPENAI_API_KEY"]}"\n')
+    log = open(os.path.join(workdir, "server.log"), "w")
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", "--port", str(args.port),
+                               "--workdir", workdir, "--llm-latency", str(args.llm_latency),
+                               "--llm-jitter", str(args.llm_jitter)],
+                              cwd=bench_utils.APP_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if server.poll() is not None: # 포트가 이미 쓰이는 경우 등 (다른 서버에 접속해 측정하지 않도록)
+            raise SystemExit(f"서버가 종료되었습니다. 로그: {log.name}")
+        try:
+            urllib.request.urlopen(f"http://localhost:{args.port}/_stcore/health", timeout=1)
+            return server
+        except OSError:
+            time.sleep(0.5)
+    server.terminate()
+    raise SystemExit(f"서버가 시작되지 않았습니다. 로그: {log.name}")
+
+
+async def run_all(args, server):
+    url = f"ws://localhost:{args.port}/_stcore/stream"
+    # 첫 세션이 RAG 초기화(백그라운드)를 시작하도록 접속하고, 입력창이 켜질 때까지 기다립니다. (초기화 시간은 측정에서 제외)
+    warm = ChatClient(url)
+    await warm.connect()
+    while warm.find("text_input", lambda e: e.form_id == "chat_input_form" and not e.disabled) is None:
+        await asyncio.sleep(0.5)
+        await warm.rerun([])
+    await warm.close()
+    rows = []
+    for concurrency in args.concurrency:
+        print(f"동시 세션 {concurrency}개 실행 중 ...", flush=True)
+        rows.append(await run_level(url, server.pid, concurrency, args))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="동시 채팅 세션 부하 테스트 (streamlit 서버 + 웹소켓 클라이언트)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 5, 10, 25, 50])
+    parser.add_argument("--turns", type=int, default=4, help="세션당 질문 수 (짝수 번째는 후속 질문)")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="대역 LLM 평균 응답 시간(초)")
+    parser.add_argument("--llm-jitter", type=float, default=0.3, help="응답 시간 표준편차 (평균 대비 비율)")
+    parser.add_argument("--think-time", type=float, nargs=2, default=[2.0, 6.0], metavar=("MIN", "MAX"),
+                        help="질문 사이 생각 시간(초) 범위")
+    parser.add_argument("--timeout", type=float, default=120, help="질문 하나의 응답 제한 시간(초)")
+    parser.add_argument("--no-answer-cache", action="store_true", help="답변 캐시 / 동일 질문 합치기를 끕니다.")
+    parser.add_argument("--no-rate-limit", action="store_true", help="클라이언트별 속도 제한을 끕니다.")
+    parser.add_argument("--port", type=int, default=8599)
+    parser.add_argument("--workdir", default=None, help="채팅 DB / 인덱스 / 서버 로그를 둘 폴더 (기본: 임시 폴더)")
+    parser.add_argument("--json", default=None, help="결과를 JSON 파일로도 저장")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="chatbot_load_")
+    os.makedirs(workdir, exist_ok=True)
+    server = start_server(args, workdir)
+    try:
+        rows = asyncio.run(run_all(args, server))
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"\n[부하 테스트] 세션당 질문 {args.turns}개, LLM 지연 {args.llm_latency}s, "
+          f"생각 시간 {args.think_time[0]}~{args.think_time[1]}s, 작업 폴더 {workdir}")
+    print_table(rows, ["sessions", "turns", "throughput_qps", "p50_ms", "p95_ms", "p99_ms", "error_rate",
+                       "sqlite_locked", "rate_limited", "timeouts", "session_switched", "connection_errors",
+                       "server_rss_mb", "rss_per_session_kb"])
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
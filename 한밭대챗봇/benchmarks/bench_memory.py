@@ -0,0 +1,170 @@
+# 프로세스 하나가 들고 있는 RAG 상태와 활성 세션 100개의 메모리(RSS) 측정: 기본 모드 vs 메모리 절약 모드
+#  - 기본: InMemoryDocstore(청크마다 Document 객체) + float32 Flat 인덱스,
+#          답변 메시지마다 화면용 HTML / 복사용 텍스트 / 디버그용 청크 원문을 모두 저장 (이전 방식)
+#  - 절약: mmap 청크 저장소 + float16 인덱스(flat_fp16, --lean-index-type로 변경),
+#          답변 본문 + 출처 파일명 + 검색 메타데이터(청크 id/출처/위치/점수)만 저장 (원문은 표시할 때 다시 읽음)
+# 모드마다 별도 프로세스에서 측정합니다. 실제 문서를 --scale배로 복제한 코퍼스와 가짜 임베딩을 사용하므로 API 키가 필요 없습니다.
+# 인덱스는 미리 빌드해 저장한 뒤 측정 프로세스에서 불러옵니다. (앱 시작 시와 같은 경로)
+# RssAnon은 프로세스 전용 메모리, VmRSS는 여러 프로세스가 공유하는 mmap 파일 페이지까지 포함한 값입니다.
+# 세션 메모리는 tracemalloc으로 잰 Python 할당량입니다.
+# 사용법 (한밭대챗봇 폴더에서):
+#   python benchmarks/bench_memory.py --scale 200 --sessions 100 --turns 10
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+import bench_utils
+from bench_utils import print_table
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_core.documents import Document
+
+from answer_metadata import answer_sources, retrieval_metadata
+from chunk_store import compact_vectorstore
+from conversation import answer_copy_text
+from rag_system import (build_vectorstore, fetch_documents, load_documents, load_vectorstore, save_vectorstore,
+                        split_documents)
+
+QUESTION = "학생생활관 외박 신청은 어떻게 하나요?"
+ANSWER = "학생생활관 관리운영 지침에 따르면 외박은 사전에 생활관 행정실에 신청해야 합니다. " * 6
+
+
+def memory_mb():
+    # /proc/self/status의 현재 RSS (Linux)
+    values = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                values[key] = int(rest.split()[0]) / 1024
+    return values
+
+
+def scaled_chunks(scale):
+    documents, _, _ = load_documents()
+    copies = [Document(page_content=d.page_content, metadata={"source": f"{d.metadata['source']}#{i}"})
+              for i in range(scale) for d in documents]
+    return split_documents(copies)
+
+
+def old_layout_message(docs):
+    # 이전 방식: 같은 답변을 HTML / 복사용 텍스트로 두 번, 검색된 청크 원문까지 메시지마다 저장
+    sources = sorted({os.path.basename(d.metadata["source"]) for d in docs})
+    html = "".join(f"<li><i class='fas fa-check-circle'></i> {s}</li>" for s in sources)
+    return {
+        "role": "assistant",
+        "content": ANSWER + f"<div class='source-documents'><strong>참고 문서:</strong><ul>{html}</ul></div>",
+        "time": "12:00",
+        "copy_text": ANSWER + "\n\n--- 참고 문서 ---\n" + ", ".join(sources),
+        "debug_source_content": "\n\n".join(
+            f"--- {os.path.basename(d.metadata['source'])} (시작 인덱스: {d.metadata.get('start_index')}) ---\n"
+            f"{d.page_content}" for d in docs),
+        "is_error": False,
+    }
+
+
+def lean_layout_message(docs):
+    return {
+        "role": "assistant",
+        "content": ANSWER,
+        "time": "12:00",
+        "sources": answer_sources(docs),
+        "retrieval": retrieval_metadata({"source_documents": docs}, "bench-lean", QUESTION),
+        "is_error": False,
+    }
+
+
+def build(mode, scale, dim, lean_index_type, workdir):
+    # 앱이 시작할 때처럼 미리 빌드해 저장한 인덱스를 불러와 측정하도록 먼저 디스크에 저장합니다.
+    texts = scaled_chunks(scale)
+    index_type = lean_index_type if mode == "lean" else "flat"
+    vectorstore = build_vectorstore(texts, DeterministicFakeEmbedding(size=dim), index_type=index_type)
+    index_version = f"bench-{mode}"
+    save_vectorstore(vectorstore, index_version, os.path.join(workdir, mode))
+    if mode == "lean":
+        compact_vectorstore(vectorstore, os.path.join(workdir, "chunks", index_version))
+    return index_type, len(texts)
+
+
+def child(mode, sessions, turns, dim, workdir):
+    # 부모 프로세스가 MEMORY_LEAN_MODE / CHUNK_STORE_DIR 환경 변수를 설정해 실행합니다.
+    gc.collect()
+    before = memory_mb()
+    vectorstore = load_vectorstore(DeterministicFakeEmbedding(size=dim), f"bench-{mode}", os.path.join(workdir, mode))
+    # 질문 몇 개를 검색해 실제로 청크를 읽어 봅니다. (mmap 파일 페이지 일부가 올라옴)
+    retrieved = [vectorstore.similarity_search(f"{QUESTION} {i}", k=4) for i in range(50)]
+    gc.collect()
+    rag_state = memory_mb()
+
+    # 세션 메시지는 크기가 작아 RSS 변화로는 잘 드러나지 않으므로 tracemalloc으로 Python 할당량을 잽니다.
+    make_message = lean_layout_message if mode == "lean" else old_layout_message
+    tracemalloc.start()
+    all_sessions = []
+    for s in range(sessions):
+        messages = []
+        for t in range(turns):
+            messages.append({"role": "user", "content": f"{QUESTION} ({s}-{t})", "time": "12:00"})
+            # 세션마다 답변 내용이 다르다고 보고 메시지마다 새 문자열을 만듭니다.
+            docs = [Document(id=d.id, page_content=d.page_content + f" ({s}-{t})", metadata=d.metadata)
+                    for d in retrieved[(s * turns + t) % len(retrieved)]]
+            message = make_message(docs)
+            message["content"] = message["content"] + f" ({s}-{t})"
+            messages.append(message)
+        all_sessions.append(messages)
+    session_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # 절약 모드의 복사 / 디버그 텍스트가 이전 방식과 같은 정보를 되살리는지 확인
+    if mode == "lean":
+        sample = retrieved[0]
+        assert [d.page_content for d in fetch_documents(vectorstore, [d.id for d in sample])] == \
+            [d.page_content for d in sample]
+        assert "--- 참고 문서 ---" in answer_copy_text(all_sessions[0][1])
+
+    return {
+        "rag_rss_mb": rag_state["VmRSS"] - before["VmRSS"],
+        "rag_anon_mb": rag_state["RssAnon"] - before["RssAnon"],
+        "per_100_sessions_mb": session_bytes / 1024 ** 2 * 100 / sessions,
+        "process_rss_mb": rag_state["VmRSS"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG 상태 / 세션 메모리(RSS) 벤치마크")
+    parser.add_argument("--scale", type=int, default=200, help="실제 문서를 몇 배로 복제할지")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=10, help="세션당 (질문, 답변) 턴 수")
+    parser.add_argument("--dim", type=int, default=1536, help="임베딩 차원 (text-embedding-3-small과 같은 1536)")
+    parser.add_argument("--lean-index-type", default="flat_fp16", help="절약 모드 인덱스 종류 (flat_fp16 / flat_int8)")
+    parser.add_argument("--child", choices=["normal", "lean"], help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.child, args.sessions, args.turns, args.dim, args.workdir)))
+        return
+
+    rows = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode in ("normal", "lean"):
+            index_type, n_chunks = build(mode, args.scale, args.dim, args.lean_index_type, workdir)
+            env = dict(os.environ, MEMORY_LEAN_MODE="true" if mode == "lean" else "false",
+                       CHUNK_STORE_DIR=os.path.join(workdir, "chunks"))
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode, "--workdir", workdir,
+                                     "--sessions", str(args.sessions), "--turns", str(args.turns), "--dim", str(args.dim)],
+                                    check=True, capture_output=True, text=True, env=env).stdout
+            rows.append(dict(mode=mode, index_type=index_type, chunks=n_chunks,
+                             **json.loads(output.strip().splitlines()[-1])))
+
+    print(f"\n[메모리] 세션 {args.sessions}개 × {args.turns}턴, 임베딩 {args.dim}차원 (MB)")
+    print_table(rows, ["mode", "index_type", "chunks", "rag_rss_mb", "rag_anon_mb", "per_100_sessions_mb",
+                       "process_rss_mb"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# 요청 속도 제한 / LLM 사용량 거버너 동작 확인 (API 호출 없이 가짜 LLM과 임베딩 사용)
+#  1) 한 클라이언트의 연타: 토큰 버킷이 허용하는 질문 수
+#  2) 여러 사용자의 동시 질문 폭주: 거버너가 지킨 최대 동시 호출 수 / 분당 토큰, 대기 / 거절 건수
+#  3) 예산 소진 중에도 캐시된 답변은 계속 제공되는지
+# 사용법 (한밭대챗봇 폴더에서):
+#   python benchmarks/bench_rate_limit.py --users 20 --tokens-per-minute 20000
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bench_utils
+from bench_utils import latency_summary, print_table
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.llms.fake import FakeListLLM
+
+import metrics
+from answer_cache import AnswerCache
+from answer_pipeline import AnswerPipeline
+from rag_system import build_qa_chain, build_vectorstore, load_documents, split_documents
+from rate_limit import LLMGovernor, LLMOverloaded, RateLimiter
+
+
+class SlowFakeLLM(FakeListLLM):
+    # 지연 시간을 흉내 내고 동시에 실행 중인 호출 수의 최댓값을 기록하는 가짜 LLM
+    latency: float = 0.3
+    active: int = 0
+    peak: int = 0
+    calls: int = 0
+
+    def _call(self, *args, **kwargs):
+        with _llm_lock:
+            self.active += 1
+            self.calls += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.latency)
+            return "가짜 답변입니다. " * 20
+        finally:
+            with _llm_lock:
+                self.active -= 1
+
+
+_llm_lock = threading.Lock()
+
+
+def spam_test(per_minute, burst, attempts):
+    limiter = RateLimiter(per_minute, burst)
+    allowed = sum(limiter.allow("spammer") for _ in range(attempts))
+    return {"attempts": attempts, "allowed": allowed, "rejected": attempts - allowed,
+            "retry_after_s": round(limiter.retry_after("spammer"), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="속도 제한 / LLM 거버너 벤치마크")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--questions-per-user", type=int, default=3)
+    parser.add_argument("--max-concurrency", type=int, default=4)
+    parser.add_argument("--tokens-per-minute", type=int, default=20000)
+    parser.add_argument("--queue-timeout", type=float, default=2.0)
+    parser.add_argument("--latency", type=float, default=0.3, help="가짜 LLM 응답 시간(초)")
+    args = parser.parse_args()
+
+    print("[클라이언트별 토큰 버킷] 분당 6회, 연속 3회 허용")
+    print_table([spam_test(6, 3, 20)], ["attempts", "allowed", "rejected", "retry_after_s"])
+
+    documents, _, _ = load_documents()
+    vectorstore = build_vectorstore(split_documents(documents), DeterministicFakeEmbedding(size=256))
+    llm = SlowFakeLLM(responses=["-"], latency=args.latency)
+    governor = LLMGovernor(args.max_concurrency, args.tokens_per_minute, args.queue_timeout)
+    pipeline = AnswerPipeline(build_qa_chain(llm, vectorstore), "bench", AnswerCache("bench"), governor)
+
+    outcomes, latencies = {"answered": 0, "shed": 0}, []
+    lock = threading.Lock()
+
+    def ask(question):
+        start = time.perf_counter()
+        try:
+            pipeline.answer(question)
+            outcome = "answered"
+        except LLMOverloaded:
+            outcome = "shed"
+        with lock:
+            outcomes[outcome] += 1
+            latencies.append(time.perf_counter() - start)
+
+    questions = [f"사용자{u}의 질문 {q}: 기숙사 외박 신청은 어떻게 해?" for u in range(args.users)
+                 for q in range(args.questions_per_user)]
+    with ThreadPoolExecutor(max_workers=args.users) as executor:
+        list(executor.map(ask, questions))
+
+    counters = metrics.snapshot()["counters"]
+    print(f"\n[동시 질문 폭주] 질문 {len(questions)}개, 동시 호출 한도 {args.max_concurrency}, "
+          f"분당 토큰 예산 {args.tokens_per_minute}")
+    print_table([{
+        "answered": outcomes["answered"], "shed": outcomes["shed"],
+        "queued": counters.get("governor_queued", 0), "llm_calls": llm.calls, "peak_concurrency": llm.peak,
+        "tokens_used": counters.get("governor_tokens_used", 0),
+        **latency_summary(latencies),
+    }], ["answered", "shed", "queued", "llm_calls", "peak_concurrency", "tokens_used", "p50_ms", "p95_ms"])
+
+    # 예산이 남아 있지 않은 상태에서도 이미 답한 질문은 캐시에서 바로 나옵니다.
+    calls_before = llm.calls
+    start = time.perf_counter()
+    pipeline.answer(questions[0])
+    print(f"\n[예산 소진 중 캐시 적중] 남은 예산 {governor.remaining()} 토큰, "
+          f"응답 {1000 * (time.perf_counter() - start):.2f}ms, 추가 LLM 호출 {llm.calls - calls_before}회")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# 저장된 답변을 현재 인덱스(문서/설정/인덱스 버전)로 다시 실행해 검색 결과가 얼마나 바뀌었는지 비교하는 오프라인 회귀 벤치마크
+# 채팅 기록 DB에서 검색 메타데이터(answer_metadata.py)가 저장된 봇 답변을 읽어, 저장된 검색 질문으로 현재 검색기를 다시 실행하고
+# 답변 당시의 청크와 청크 id 기준으로 비교합니다. 청크 id는 (문서 파일명, 시작 위치)로 정해지므로(chunk_store.chunk_id)
+# 인덱스를 다시 만들어도 같은 청크는 같은 id입니다.
+# --generate N을 주면 N개는 답변도 다시 생성해 저장된 답변과의 텍스트 유사도를 잽니다. (LLM 호출 비용 발생)
+# 사용법 (한밭대챗봇 폴더에서):
+#   python benchmarks/bench_replay.py --db chat_history.db --limit 200 --generate 20
+import argparse
+import difflib
+import os
+import sqlite3
+import statistics
+import time
+from collections import defaultdict
+
+import bench_utils
+from bench_utils import latency_summary, print_table
+
+import config
+from answer_metadata import answer_sources, decode_metadata, metadata_sources
+from backends import create_embeddings, create_llm, create_reranker
+from conversation import answer_from_copy_text
+from query_router import QueryRouter
+from rag_system import (build_qa_chain, build_retriever, build_vectorstore, compute_index_version, load_documents,
+                        load_vectorstore, split_documents)
+
+
+def load_answers(db_name, limit):
+    conn = sqlite3.connect(db_name)
+    rows = conn.execute("SELECT content, retrieval FROM chat_messages WHERE role = 'assistant' AND retrieval IS NOT NULL "
+                        "ORDER BY message_id DESC LIMIT ?", (limit,)).fetchall()
+    conn.close()
+    answers = []
+    for content, retrieval in rows:
+        metadata = decode_metadata(retrieval)
+        if metadata is not None and metadata.get("query"):
+            answers.append({"answer": answer_from_copy_text(content, metadata_sources(metadata)), "metadata": metadata})
+    return answers
+
+
+def current_pipeline(api_key):
+    # 앱과 같은 설정(라우팅, 재순위화)으로 현재 문서의 인덱스를 불러오거나 빌드합니다.
+    documents, _, _ = load_documents()
+    index_version = compute_index_version(documents)
+    embeddings = create_embeddings(api_key)
+    vectorstore = load_vectorstore(embeddings, index_version)
+    if vectorstore is None:
+        vectorstore = build_vectorstore(split_documents(documents), embeddings)
+    reranker = None
+    if config.RERANK_ENABLED:
+        try:
+            reranker = create_reranker()
+        except Exception as e:
+            print(f"⚠️ 재순위화 모델을 불러오지 못해 벡터 검색만 사용합니다: {e}")
+    router = QueryRouter() if config.ROUTING_ENABLED else None
+    return index_version, vectorstore, reranker, router
+
+
+def compare(metadata, documents):
+    old_keys = [c["id"] for c in metadata["chunks"]]
+    new_keys = [d.id for d in documents]
+    union = set(old_keys) | set(new_keys)
+    return {
+        "chunk_recall": len(set(old_keys) & set(new_keys)) / len(old_keys) if old_keys else 1.0,
+        "jaccard": len(set(old_keys) & set(new_keys)) / len(union) if union else 1.0,
+        "same_sources": metadata_sources(metadata) == answer_sources(documents),
+        "top1_same": bool(old_keys) and bool(new_keys) and old_keys[0] == new_keys[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="저장된 답변의 검색 재실행(회귀) 벤치마크")
+    parser.add_argument("--db", default=config.DB_NAME)
+    parser.add_argument("--limit", type=int, default=200, help="최근 답변 몇 개를 다시 실행할지")
+    parser.add_argument("--generate", type=int, default=0, help="답변까지 다시 생성해 비교할 개수 (0이면 생략)")
+    args = parser.parse_args()
+
+    answers = load_answers(args.db, args.limit)
+    if not answers:
+        raise SystemExit(f"'{args.db}'에 검색 메타데이터가 저장된 답변이 없습니다.")
+    api_key = os.getenv("OPENAI_API_KEY")
+    index_version, vectorstore, reranker, router = current_pipeline(api_key)
+    retriever = build_retriever(vectorstore, reranker=reranker, router=router)
+
+    groups = defaultdict(list)
+    latencies = defaultdict(list)
+    for item in answers:
+        metadata = item["metadata"]
+        start = time.perf_counter()
+        documents = retriever.invoke(metadata["query"])
+        stored_version = metadata.get("index_version")
+        latencies[stored_version].append(time.perf_counter() - start)
+        groups[stored_version].append(compare(metadata, documents))
+
+    rows = []
+    for stored_version, results in groups.items():
+        row = {"stored_version": stored_version, "same_index": stored_version == index_version, "answers": len(results)}
+        for key in ("chunk_recall", "jaccard", "same_sources", "top1_same"):
+            row[key] = statistics.mean(float(r[key]) for r in results)
+        row.update(latency_summary(latencies[stored_version]))
+        rows.append(row)
+    print(f"\n[검색 재실행] 현재 인덱스 버전 {index_version}, 답변 {len(answers)}개 (저장된 인덱스 버전별)")
+    print_table(rows, ["stored_version", "same_index", "answers", "chunk_recall", "jaccard", "same_sources", "top1_same",
+                       "p50_ms", "p95_ms"])
+
+    if args.generate:
+        qa_chain = build_qa_chain(create_llm(api_key), vectorstore, reranker=reranker, router=router)
+        similarities = []
+        for item in answers[:args.generate]:
+            new_answer = qa_chain.invoke({"query": item["metadata"]["query"]})["result"]
+            similarities.append(difflib.SequenceMatcher(None, item["answer"], new_answer).ratio())
+        print(f"\n[답변 재생성] {len(similarities)}개: 저장된 답변과의 평균 유사도 {statistics.mean(similarities):.3f}, "
+              f"최저 {min(similarities):.3f}")
+
+
+if __name__ == "__main__":
+    main()
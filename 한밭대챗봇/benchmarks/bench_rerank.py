@@ -0,0 +1,64 @@
+# 후보 과다 추출(fetch_k) + cross-encoder 재순위화의 recall 향상과 추가 지연을 측정합니다.
+# 사용법 (한밭대챗봇 폴더에서):
+#   python benchmarks/bench_rerank.py --fetch-k 30 --top-n 4
+import argparse
+import os
+import time
+
+import bench_utils
+from bench_utils import load_eval_questions, retrieval_scores, latency_summary, print_table
+
+import config
+from backends import create_embeddings, create_reranker
+from rag_system import load_documents, split_documents, build_vectorstore
+
+
+def main():
+    parser = argparse.ArgumentParser(description="재순위화 recall/지연 벤치마크")
+    parser.add_argument("--fetch-k", type=int, default=config.RERANK_FETCH_K)
+    parser.add_argument("--top-n", type=int, default=config.RERANK_TOP_N)
+    parser.add_argument("--budget-ms", type=float, default=config.RERANK_LATENCY_BUDGET_MS)
+    args = parser.parse_args()
+
+    documents, _, _ = load_documents()
+    vectorstore = build_vectorstore(split_documents(documents), create_embeddings(os.getenv("OPENAI_API_KEY")))
+    reranker = create_reranker()
+    items = load_eval_questions()
+
+    dense_top, dense_fetch, reranked = [], [], []
+    search_latencies, cold, warm = [], [], []
+    # 첫 추론은 모델 워밍업 비용이 섞이므로 측정 전에 한 번 실행합니다.
+    reranker.score("워밍업", ["워밍업"])
+    for item in items:
+        start = time.perf_counter()
+        candidates = vectorstore.similarity_search(item["question"], k=args.fetch_k)
+        search_latencies.append(time.perf_counter() - start)
+        dense_top.append(candidates[:args.top_n])
+        dense_fetch.append(candidates)
+
+        start = time.perf_counter()
+        reranked.append(reranker.rerank(item["question"], candidates, top_n=args.top_n, budget_ms=args.budget_ms))
+        cold.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        reranker.rerank(item["question"], candidates, top_n=args.top_n, budget_ms=args.budget_ms)
+        warm.append(time.perf_counter() - start)
+
+    quality = [
+        dict(mode=f"dense top-{args.top_n}", **retrieval_scores(dense_top, items, args.top_n)),
+        dict(mode=f"dense+rerank {args.fetch_k}→{args.top_n}", **retrieval_scores(reranked, items, args.top_n)),
+        dict(mode=f"dense top-{args.fetch_k} (상한)", **retrieval_scores(dense_fetch, items, args.fetch_k)),
+    ]
+    print(f"\n[검색 품질] 질문 {len(items)}개")
+    print_table(quality, ["mode", "recall@k", "mrr"])
+
+    latency = [
+        dict(stage=f"벡터 검색 (k={args.fetch_k})", **latency_summary(search_latencies)),
+        dict(stage="재순위화 (캐시 없음)", **latency_summary(cold)),
+        dict(stage="재순위화 (캐시 적중)", **latency_summary(warm)),
+    ]
+    print(f"\n[추가 지연] 예산 {args.budget_ms:.0f}ms, 배치 {config.RERANK_BATCH_SIZE}")
+    print_table(latency, ["stage", "mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# 상위 LLM 장애를 주입했을 때의 응답 시간(p50/p95/p99)과 결과 분포 비교 (가짜 LLM과 임베딩 사용, API 호출 없음)
+#  - 주입 장애: 일정 비율의 느린 응답(꼬리 지연), 멈춤(hang), 오류, 그리고 중간의 연속 장애 구간(outage)
+#  - 비교 설정: 보호 없음 / 제한 시간 / 제한 시간 + 헤지 요청 / 제한 시간 + 회로 차단기(저하 모드)
+# 사용법 (한밭대챗봇 폴더에서):
+#   python benchmarks/bench_resilience.py --requests 300 --rate 100
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bench_utils
+from bench_utils import latency_summary, print_table
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.llms.fake import FakeListLLM
+
+import config
+from answer_pipeline import AnswerPipeline
+from rag_system import build_qa_chain, build_vectorstore, load_documents, split_documents
+from resilience import CircuitBreaker
+
+
+class FaultyFakeLLM(FakeListLLM):
+    # 호출마다 정해진 확률로 느린 응답 / 멈춤 / 오류를 일으키는 가짜 LLM
+    base_latency: float = 0.05
+    slow_rate: float = 0.1
+    slow_latency: float = 0.8
+    hang_rate: float = 0.02
+    hang_latency: float = 5.0
+    error_rate: float = 0.05
+    outage: tuple = (1.0, 2.0) # 시작 후 이 시간 구간(초)에는 모든 호출이 오류
+    started_at: float = 0.0
+    calls: int = 0
+
+    def _call(self, *args, **kwargs):
+        with _lock:
+            self.calls += 1
+            roll = _rng.random()
+        if self.outage[0] <= time.perf_counter() - self.started_at < self.outage[1]:
+            time.sleep(self.base_latency)
+            raise ConnectionError("주입된 장애: 상위 서비스 중단")
+        if roll < self.hang_rate:
+            time.sleep(self.hang_latency)
+        elif roll < self.hang_rate + self.slow_rate:
+            time.sleep(self.slow_latency)
+        elif roll < self.hang_rate + self.slow_rate + self.error_rate:
+            time.sleep(self.base_latency)
+            raise ConnectionError("주입된 장애: 일시 오류")
+        else:
+            time.sleep(self.base_latency)
+        return "가짜 답변입니다."
+
+
+_lock = threading.Lock()
+_rng = random.Random(0)
+
+SCENARIOS = [
+    # (이름, 호출 제한 시간, 헤지 대기 시간, 회로 차단기 사용)
+    ("no protection", 3600, 0, False),
+    ("timeout", 1.0, 0, False),
+    ("timeout+hedge", 1.0, 0.3, False),
+    ("timeout+breaker", 1.0, 0, True),
+    ("timeout+hedge+breaker", 1.0, 0.3, True),
+]
+
+
+def run_scenario(vectorstore, name, timeout, hedge_after, use_breaker, n_requests, rate):
+    global _rng
+    _rng = random.Random(0) # 설정마다 같은 장애 순서를 주입합니다.
+    config.LLM_CALL_TIMEOUT, config.LLM_HEDGE_AFTER = timeout, hedge_after
+    llm = FaultyFakeLLM(responses=["-"], started_at=time.perf_counter())
+    # 벤치마크 전체가 수 초 안에 끝나므로 차단 유지 시간도 그에 맞춰 짧게 둡니다.
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.25) if use_breaker else None
+    pipeline = AnswerPipeline(build_qa_chain(llm, vectorstore), "bench", answer_cache=None, coalesce=False,
+                              breaker=breaker)
+    outcomes = {"answered": 0, "degraded": 0, "error": 0}
+    latencies = []
+
+    def ask(i):
+        # 앞선 요청의 완료와 상관없이 일정한 간격으로 도착하는 요청(개방형 부하)
+        time.sleep(max(0.0, llm.started_at + i / rate - time.perf_counter()))
+        start = time.perf_counter()
+        try:
+            response = pipeline.answer(f"질문 {i}: 기숙사 외박 신청 방법")
+            outcome = "degraded" if response.get("degraded") else "answered"
+        except Exception:
+            outcome = "error"
+        with _lock:
+            outcomes[outcome] += 1
+            latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=n_requests) as executor:
+        list(executor.map(ask, range(n_requests)))
+    return dict(setting=name, llm_calls=llm.calls, **outcomes, **latency_summary(latencies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM 장애 주입 시 응답 시간 벤치마크")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=100, help="초당 요청 수")
+    args = parser.parse_args()
+
+    documents, _, _ = load_documents()
+    vectorstore = build_vectorstore(split_documents(documents), DeterministicFakeEmbedding(size=256))
+    rows = [run_scenario(vectorstore, *scenario, args.requests, args.rate) for scenario in SCENARIOS]
+    print(f"[장애 주입] 요청 {args.requests}개 (초당 {args.rate:.0f}개), 느린 응답 10%(0.8s) / 멈춤 2%(5s) / "
+          f"오류 5% / 시작 후 1~2초 구간 전면 장애")
+    print_table(rows, ["setting", "answered", "degraded", "error", "llm_calls", "p50_ms", "p95_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# 카테고리 라우팅 검색과 전체 인덱스 검색의 지연 시간 / 검색 품질 / 답변 정확도를 비교합니다.
+# 사용법 (한밭대챗봇 폴더에서):
+#   python benchmarks/bench_routing.py --generate 10
+import argparse
+import os
+import time
+
+import numpy as np
+
+import bench_utils
+from bench_utils import load_eval_questions, retrieval_scores, latency_summary, print_table
+
+import config
+from backends import create_embeddings, create_llm
+from query_router import QueryRouter, category_id_map, routed_search
+from rag_system import load_documents, split_documents, build_vectorstore, build_qa_chain
+from vector_index import search_subset
+
+
+def answer_accuracy(qa_chain, items):
+    # 답변에 정답 키워드가 하나라도 들어 있으면 맞힌 것으로 봅니다. (대략적인 자동 채점)
+    correct = 0
+    for item in items:
+        answer = qa_chain.invoke({"query": item["question"]})["result"]
+        correct += any(k in answer for k in item["keywords"])
+    return correct / len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="카테고리 라우팅 검색 벤치마크")
+    parser.add_argument("--k", type=int, default=config.RETRIEVER_K)
+    parser.add_argument("--repeat", type=int, default=20, help="지연 측정 반복 횟수")
+    parser.add_argument("--generate", type=int, default=0, help="답변 정확도 측정에 쓸 질문 수 (0이면 생략)")
+    args = parser.parse_args()
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    documents, _, _ = load_documents()
+    vectorstore = build_vectorstore(split_documents(documents), create_embeddings(api_key))
+    ids_by_category = category_id_map(vectorstore)
+    router = QueryRouter()
+    items = load_eval_questions()
+
+    routes = [router.route(item["question"]) for item in items]
+    correct = sum(1 for r, item in zip(routes, items) if r and config.DOC_CATEGORIES[item["source"]] in r)
+    fallbacks = sum(1 for r in routes if r is None)
+    print(f"\n[분류기] 질문 {len(items)}개: 정답 카테고리 포함 {correct}개, 전체 검색 fallback {fallbacks}개")
+
+    # 임베딩 호출 시간이 섞이지 않도록 질의 벡터를 미리 계산하고 인덱스 검색만 측정합니다.
+    vectors = vectorstore.embeddings.embed_documents([item["question"] for item in items])
+    rows = []
+    for mode in ("full", "routed"):
+        results, latencies = [], []
+        for item, route, vector in zip(items, routes, vectors):
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                if mode == "routed" and route:
+                    allowed = sorted(i for c in route for i in ids_by_category.get(c, []))
+                    search_subset(vectorstore.index, [vector], args.k, allowed)
+                else:
+                    vectorstore.index.search(np.array([vector], dtype="float32"), args.k)
+                latencies.append(time.perf_counter() - start)
+            if mode == "routed":
+                results.append(routed_search(vectorstore, ids_by_category, item["question"], route, args.k))
+            else:
+                results.append(vectorstore.similarity_search(item["question"], k=args.k))
+        row = {"mode": mode}
+        row.update(latency_summary(latencies))
+        row.update(retrieval_scores(results, items, args.k))
+        rows.append(row)
+    print(f"\n[인덱스 검색] k={args.k}, 반복 {args.repeat}회")
+    print_table(rows, ["mode", "mean_ms", "p50_ms", "p95_ms", "recall@k", "mrr"])
+
+    if args.generate:
+        llm = create_llm(api_key)
+        subset = items[:args.generate]
+        accuracy = [
+            {"mode": "full", "answer_accuracy": answer_accuracy(build_qa_chain(llm, vectorstore), subset)},
+            {"mode": "routed", "answer_accuracy": answer_accuracy(build_qa_chain(llm, vectorstore, router=router), subset)},
+        ]
+        print(f"\n[답변 정확도] 질문 {len(subset)}개 (정답 키워드 포함 여부)")
+        print_table(accuracy, ["mode", "answer_accuracy"])
+
+
+if __name__ == "__main__":
+    main()
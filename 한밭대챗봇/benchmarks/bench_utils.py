@@ -0,0 +1,70 @@
+import json
+import os
+import statistics
+import sys
+
+# 벤치마크 스크립트에서 앱 모듈(config, rag_system 등)을 임포트할 수 있도록 경로를 추가합니다.
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+EVAL_QUESTIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eval_questions.jsonl")
+
+
+def load_eval_questions(path=EVAL_QUESTIONS_PATH):
+    # 각 항목: {"question": 질문, "source": 정답 문서 파일명, "keywords": 정답 청크에 포함될 키워드 목록}
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def is_relevant(doc, item):
+    # 정답 문서에서 나온 청크이면서 키워드를 하나 이상 포함하면 관련 청크로 봅니다.
+    source = os.path.basename(doc.metadata.get("source", ""))
+    return source == item["source"] and any(k in doc.page_content for k in item["keywords"])
+
+
+def retrieval_scores(results, items, k):
+    # results[i]는 items[i]에 대한 검색 결과(Document 리스트, 순위순)입니다. recall@k(hit rate)와 MRR을 계산합니다.
+    hits = 0
+    reciprocal_ranks = []
+    for docs, item in zip(results, items):
+        rank = next((i + 1 for i, doc in enumerate(docs[:k]) if is_relevant(doc, item)), None)
+        if rank:
+            hits += 1
+            reciprocal_ranks.append(1.0 / rank)
+        else:
+            reciprocal_ranks.append(0.0)
+    return {"recall@k": hits / len(items), "mrr": statistics.mean(reciprocal_ranks)}
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def latency_summary(latencies_sec):
+    # 초 단위 지연 시간 목록을 밀리초 단위 통계로 변환합니다.
+    ms = [t * 1000 for t in latencies_sec]
+    return {
+        "mean_ms": statistics.mean(ms) if ms else 0.0,
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99),
+    }
+
+
+def print_table(rows, columns):
+    widths = {c: max(len(c), *(len(_fmt(r.get(c))) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    print("  ".join("-" * widths[c] for c in columns))
+    for r in rows:
+        print("  ".join(_fmt(r.get(c)).ljust(widths[c]) for c in columns))
+
+
+def _fmt(value):
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return "" if value is None else str(value)
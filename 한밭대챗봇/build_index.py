@@ -0,0 +1,38 @@
+# 벡터 인덱스를 오프라인으로 빌드(임베딩 계산 + IVF/PQ 학습)해 INDEX_DIR에 저장합니다.
+# 앱은 시작할 때 문서/설정 버전이 같은 인덱스가 있으면 다시 빌드하지 않고 그대로 불러옵니다.
+# 사용법 (한밭대챗봇 폴더에서):
+#   VECTOR_INDEX_TYPE=hnsw python build_index.py
+import argparse
+import os
+import time
+
+import config
+from backends import create_embeddings
+from rag_system import load_documents, split_documents, compute_index_version, build_vectorstore, save_vectorstore
+
+
+def main():
+    parser = argparse.ArgumentParser(description="벡터 인덱스 오프라인 빌드")
+    parser.add_argument("--index-dir", default=config.INDEX_DIR)
+    args = parser.parse_args()
+
+    documents, missing_files, failed_files = load_documents()
+    for file_name in missing_files:
+        print(f"⚠️ '{file_name}' 파일을 찾을 수 없습니다.")
+    for file_name, e in failed_files.items():
+        print(f"⚠️ '{file_name}' 파일 로드 중 오류: {e}")
+    if not documents:
+        raise SystemExit("참고할 문서를 전혀 찾거나 로드할 수 없습니다.")
+
+    texts = split_documents(documents)
+    index_version = compute_index_version(documents)
+    start = time.perf_counter()
+    vectorstore = build_vectorstore(texts, create_embeddings(os.getenv("OPENAI_API_KEY")))
+    build_sec = time.perf_counter() - start
+    save_vectorstore(vectorstore, index_version, args.index_dir)
+    print(f"✅ 인덱스 저장 완료: {args.index_dir} (종류: {config.VECTOR_INDEX_TYPE}, 청크 {len(texts)}개, "
+          f"버전 {index_version}, {build_sec:.1f}초)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+# 채팅 기록 내보내기 / 가져오기 (JSONL 또는 Parquet, 청크 단위 스트리밍)
+# 전체 기록을 메모리에 올리지 않고 message_id 순서로 chunk_size개씩 읽고 쓰므로 DB 크기와 상관없이 메모리 사용량이 일정합니다.
+# 내보내기는 출력 폴더의 export_state.json에 마지막으로 쓴 message_id(워터마크)를 남겨, 다시 실행하면 그 뒤부터 이어서 씁니다.
+# 가져오기는 배치 단위 트랜잭션으로 넣으며, 같은 파일을 다시 가져와도 중복이 생기지 않습니다.
+# (내보낸 DB의 고유 id와 원본 message_id를 가져온 DB에 기록해 두고, 이미 넣은 메시지는 건너뜁니다.)
+# 사용법 (한밭대챗봇 폴더에서):
+#   python chat_export.py export --out /backup/chat --format parquet
+#   python chat_export.py import --in /backup/chat --db merged.db                 # 다른 DB에 병합 (새 message_id 부여)
+#   python chat_export.py import --in /backup/chat --db new.db --preserve-ids     # 빈 DB로 이전 (message_id 유지)
+import argparse
+import json
+import os
+import resource
+import sqlite3
+import time
+
+import config
+from db_manager import db_id, init_db
+from storage import DEFAULT_TITLE
+
+EXPORT_CHUNK_SIZE = 10000 # 한 번에 읽고 쓰는 행 수 (Parquet row group 크기)
+PARQUET_ROWS_PER_FILE = 1000000 # Parquet 메시지 파일 하나에 담는 최대 행 수
+STATE_FILE = "export_state.json"
+
+SESSION_COLUMNS = ["session_id", "title", "start_time", "last_updated"]
+MESSAGE_COLUMNS = ["message_id", "session_id", "role", "content", "timestamp", "retrieval"]
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("Parquet 형식을 사용하려면 `pip install pyarrow`가 필요합니다.") from e
+    return pyarrow, pyarrow.parquet
+
+
+def _arrow_schema(pa, columns):
+    return pa.schema([(c, pa.int64() if c == "message_id" else pa.string()) for c in columns])
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # Linux: KB 단위
+
+
+# --- 청크 단위 읽기 (keyset 페이지네이션: OFFSET 없이 마지막 키 다음부터 조회) ---
+
+def _session_chunks(conn, chunk_size):
+    last_rowid = 0
+    while True:
+        rows = conn.execute(
+            "SELECT rowid, session_id, title, start_time, last_updated FROM chat_sessions "
+            "WHERE rowid > ? ORDER BY rowid LIMIT ?", (last_rowid, chunk_size)).fetchall()
+        if not rows:
+            return
+        last_rowid = rows[-1][0]
+        yield [row[1:] for row in rows]
+
+
+def _message_chunks(conn, after_id, chunk_size):
+    while True:
+        rows = conn.execute(
+            "SELECT message_id, session_id, role, content, timestamp, retrieval FROM chat_messages "
+            "WHERE message_id > ? ORDER BY message_id LIMIT ?", (after_id, chunk_size)).fetchall()
+        if not rows:
+            return
+        after_id = rows[-1][0]
+        yield rows
+
+
+# --- 내보내기 ---
+
+def _load_state(out_dir, fmt, origin):
+    # origin: 내보내는 DB의 고유 id. 가져오기가 원본 message_id로 중복을 확인할 때 사용합니다.
+    path = os.path.join(out_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {"format": fmt, "origin": origin, "last_message_id": 0, "jsonl_bytes": 0}
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    if state["format"] != fmt:
+        raise ValueError(f"이 폴더에는 이미 {state['format']} 형식으로 내보낸 기록이 있습니다. 다른 폴더를 지정해주세요.")
+    if state.setdefault("origin", origin) != origin:
+        raise ValueError("이 폴더에는 다른 DB에서 내보낸 기록이 있습니다. 다른 폴더를 지정해주세요.")
+    return state
+
+
+def _export_origin(in_dir):
+    # 내보낸 DB의 고유 id. 이 정보가 생기기 전에 내보낸 폴더에는 없습니다. (None)
+    path = os.path.join(in_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("origin")
+
+
+def _save_state(out_dir, state):
+    path = os.path.join(out_dir, STATE_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def _write_sessions(conn, out_dir, fmt, chunk_size):
+    # 세션은 제목/마지막 갱신 시각이 바뀌므로 매번 전체를 새로 씁니다. (임시 파일에 쓴 뒤 교체)
+    path = os.path.join(out_dir, f"sessions.{fmt}")
+    count = 0
+    if fmt == "jsonl":
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            for rows in _session_chunks(conn, chunk_size):
+                f.writelines(json.dumps(dict(zip(SESSION_COLUMNS, r)), ensure_ascii=False) + "\n" for r in rows)
+                count += len(rows)
+    else:
+        pa, pq = _require_pyarrow()
+        schema = _arrow_schema(pa, SESSION_COLUMNS)
+        with pq.ParquetWriter(path + ".tmp", schema, compression="zstd") as writer:
+            for rows in _session_chunks(conn, chunk_size):
+                writer.write_table(pa.Table.from_arrays([pa.array(col) for col in zip(*rows)], schema=schema))
+                count += len(rows)
+    os.replace(path + ".tmp", path)
+    return count
+
+
+def _write_messages_jsonl(conn, out_dir, state, chunk_size):
+    path = os.path.join(out_dir, "messages.jsonl")
+    count = 0
+    with open(path, "ab") as f:
+        # 이전 실행이 워터마크를 남기기 전에 중단됐다면 그 뒤에 쓰인 부분을 잘라내고 이어 씁니다.
+        f.truncate(state["jsonl_bytes"])
+        f.seek(state["jsonl_bytes"])
+        for rows in _message_chunks(conn, state["last_message_id"], chunk_size):
+            f.write("".join(json.dumps(dict(zip(MESSAGE_COLUMNS, r)), ensure_ascii=False) + "\n"
+                            for r in rows).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+            count += len(rows)
+            state.update(last_message_id=rows[-1][0], jsonl_bytes=f.tell())
+            _save_state(out_dir, state)
+    return count
+
+
+def _write_messages_parquet(conn, out_dir, state, chunk_size):
+    # message_id 구간별 파일(messages-<첫 id>-<끝 id>.parquet)로 나눠 씁니다. 파일이 완성될 때마다 워터마크를 남기므로
+    # 중간에 중단되면 마지막으로 완성된 파일 다음부터 다시 씁니다.
+    pa, pq = _require_pyarrow()
+    schema = _arrow_schema(pa, MESSAGE_COLUMNS)
+    count = 0
+    writer, part_path, first_id, part_rows = None, None, None, 0
+
+    def close_part(last_id):
+        writer.close()
+        os.replace(part_path, os.path.join(out_dir, f"messages-{first_id:012d}-{last_id:012d}.parquet"))
+        state["last_message_id"] = last_id
+        _save_state(out_dir, state)
+
+    last_id = state["last_message_id"]
+    for rows in _message_chunks(conn, state["last_message_id"], chunk_size):
+        if writer is None:
+            first_id, part_rows = rows[0][0], 0
+            part_path = os.path.join(out_dir, "messages.part.tmp")
+            writer = pq.ParquetWriter(part_path, schema, compression="zstd")
+        writer.write_table(pa.Table.from_arrays([pa.array(col) for col in zip(*rows)], schema=schema))
+        part_rows += len(rows)
+        count += len(rows)
+        last_id = rows[-1][0]
+        if part_rows >= PARQUET_ROWS_PER_FILE:
+            close_part(last_id)
+            writer = None
+    if writer is not None:
+        close_part(last_id)
+    return count
+
+
+def export_chat(db_name, out_dir, fmt="jsonl", chunk_size=None):
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    os.makedirs(out_dir, exist_ok=True)
+    init_db(db_name) # 고유 id가 없는 예전 DB에는 만들어 둡니다.
+    conn = sqlite3.connect(db_name)
+    try:
+        state = _load_state(out_dir, fmt, db_id(conn))
+        sessions = _write_sessions(conn, out_dir, fmt, chunk_size)
+        if fmt == "jsonl":
+            messages = _write_messages_jsonl(conn, out_dir, state, chunk_size)
+        else:
+            messages = _write_messages_parquet(conn, out_dir, state, chunk_size)
+    finally:
+        conn.close()
+    return {"sessions": sessions, "messages": messages, "last_message_id": state["last_message_id"]}
+
+
+# --- 가져오기 ---
+
+def _read_records(path, batch_size):
+    # 파일 형식에 상관없이 dict 목록을 batch_size개씩 돌려줍니다.
+    if path.endswith(".jsonl"):
+        batch = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    batch.append(json.loads(line))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+    else:
+        _, pq = _require_pyarrow()
+        for record_batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield record_batch.to_pylist()
+
+
+def _import_files(in_dir):
+    names = sorted(os.listdir(in_dir))
+    sessions = [n for n in names if n in ("sessions.jsonl", "sessions.parquet")]
+    messages = [n for n in names if n == "messages.jsonl" or (n.startswith("messages-") and n.endswith(".parquet"))]
+    if not sessions and not messages:
+        raise ValueError(f"'{in_dir}'에서 가져올 채팅 기록 파일을 찾지 못했습니다.")
+    return [os.path.join(in_dir, n) for n in sessions], [os.path.join(in_dir, n) for n in messages]
+
+
+def _upsert_sessions(conn, records):
+    # 같은 세션이 이미 있으면 더 이른 시작 시각 / 더 늦은 갱신 시각을 남기고, 기본 제목만 새 제목으로 바꿉니다.
+    conn.executemany('''
+        INSERT INTO chat_sessions (session_id, title, start_time, last_updated) VALUES (?, ?, ?, ?)
+        ON CONFLICT(session_id) DO UPDATE SET
+            title = CASE WHEN chat_sessions.title = ? THEN excluded.title ELSE chat_sessions.title END,
+            start_time = MIN(chat_sessions.start_time, excluded.start_time),
+            last_updated = MAX(chat_sessions.last_updated, excluded.last_updated)
+    ''', [(r["session_id"], r["title"], r["start_time"], r["last_updated"], DEFAULT_TITLE) for r in records])
+
+
+def _insert_messages(conn, records, preserve_ids, origin=None):
+    # 배치를 임시 테이블에 넣은 뒤 INSERT ... SELECT 한 번으로 옮깁니다.
+    # (INSERT OR IGNORE는 충돌 처리 방식이 FTS 동기화 트리거에도 적용되어 훨씬 느립니다.)
+    conn.execute("DELETE FROM temp.import_batch")
+    # 검색 메타데이터(retrieval) 열이 생기기 전에 내보낸 파일에는 해당 값이 없습니다.
+    conn.executemany("INSERT INTO temp.import_batch VALUES (?, ?, ?, ?, ?, ?)",
+                     [tuple(r.get(c) for c in MESSAGE_COLUMNS) for r in records])
+    if preserve_ids:
+        # 이전(migration): 원래 message_id를 유지하므로 같은 파일을 다시 넣어도 이미 있는 id는 건너뜁니다.
+        cursor = conn.execute('''
+            INSERT INTO chat_messages (message_id, session_id, role, content, timestamp, retrieval)
+            SELECT b.message_id, b.session_id, b.role, b.content, b.timestamp, b.retrieval FROM temp.import_batch b
+            WHERE NOT EXISTS (SELECT 1 FROM chat_messages m WHERE m.message_id = b.message_id)
+            ORDER BY b.message_id
+        ''')
+    elif origin is not None:
+        # 병합(merge): 다른 DB와 message_id가 겹칠 수 있으므로 새 id를 부여하고,
+        # 같은 원본 DB에서 이미 가져온 message_id는 건너뜁니다. (같은 초에 보낸 같은 내용의 메시지도 각각 유지)
+        cursor = conn.execute('''
+            INSERT INTO chat_messages (session_id, role, content, timestamp, retrieval)
+            SELECT b.session_id, b.role, b.content, b.timestamp, b.retrieval FROM temp.import_batch b
+            WHERE NOT EXISTS (SELECT 1 FROM chat_imports i WHERE i.origin = ? AND i.source_message_id = b.message_id)
+            ORDER BY b.message_id
+        ''', (origin,))
+    else:
+        # 원본 DB id가 없는 예전 내보내기 파일: 같은 세션에 (시각, 역할, 내용)이 같은 메시지가 이미 있으면 건너뜁니다.
+        cursor = conn.execute('''
+            INSERT INTO chat_messages (session_id, role, content, timestamp, retrieval)
+            SELECT b.session_id, b.role, b.content, b.timestamp, b.retrieval FROM temp.import_batch b
+            WHERE NOT EXISTS (
+                SELECT 1 FROM chat_messages m
+                WHERE m.session_id = b.session_id AND m.timestamp = b.timestamp AND m.role = b.role
+                    AND m.content = b.content
+            )
+            ORDER BY b.message_id
+        ''')
+    inserted = cursor.rowcount
+    if origin is not None:
+        conn.execute("INSERT OR IGNORE INTO chat_imports SELECT ?, message_id FROM temp.import_batch", (origin,))
+    return inserted
+
+
+def import_chat(db_name, in_dir, preserve_ids=False, batch_size=None):
+    batch_size = batch_size or EXPORT_CHUNK_SIZE
+    session_files, message_files = _import_files(in_dir)
+    origin = _export_origin(in_dir)
+    init_db(db_name)
+    conn = sqlite3.connect(db_name)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS import_batch "
+                 "(message_id INTEGER, session_id TEXT, role TEXT, content TEXT, timestamp TEXT, retrieval TEXT)")
+    stats = {"sessions": 0, "messages_read": 0, "messages_inserted": 0}
+    try:
+        for path in session_files:
+            for records in _read_records(path, batch_size):
+                with conn:
+                    _upsert_sessions(conn, records)
+                stats["sessions"] += len(records)
+        for path in message_files:
+            for records in _read_records(path, batch_size):
+                with conn:
+                    stats["messages_inserted"] += _insert_messages(conn, records, preserve_ids, origin)
+                stats["messages_read"] += len(records)
+    finally:
+        conn.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="채팅 기록 내보내기 / 가져오기")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_export = sub.add_parser("export", help="채팅 기록을 파일로 내보냅니다. (다시 실행하면 이어서)")
+    p_export.add_argument("--db", default=config.DB_NAME)
+    p_export.add_argument("--out", required=True, help="출력 폴더")
+    p_export.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    p_export.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+    p_import = sub.add_parser("import", help="내보낸 파일을 DB로 가져옵니다.")
+    p_import.add_argument("--db", default=config.DB_NAME)
+    p_import.add_argument("--in", dest="in_dir", required=True, help="내보낸 파일이 있는 폴더")
+    p_import.add_argument("--preserve-ids", action="store_true", help="원래 message_id를 유지합니다. (빈 DB로 이전할 때)")
+    p_import.add_argument("--batch-size", type=int, default=EXPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "export":
+        stats = export_chat(args.db, args.out, args.format, args.chunk_size)
+        rows = stats["messages"]
+    else:
+        stats = import_chat(args.db, args.in_dir, args.preserve_ids, args.batch_size)
+        rows = stats["messages_read"]
+    elapsed = time.perf_counter() - start
+    stats.update(seconds=round(elapsed, 2), rows_per_sec=round(rows / elapsed) if elapsed else 0,
+                 peak_rss_mb=round(peak_rss_mb(), 1))
+    print(json.dumps(stats, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
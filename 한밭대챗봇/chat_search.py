@@ -0,0 +1,165 @@
+# 채팅 기록 전문 검색 (FTS5, trigram)
+# 사이드바 검색창과 CLI에서 함께 사용합니다.
+# CLI 사용법 (한밭대챗봇 폴더에서):
+#   python chat_search.py "국가장학금" --since 2026-10-12
+#   python chat_search.py --rebuild        # 인덱스 재구축
+import argparse
+import sqlite3
+
+import config
+from db_manager import init_db, rebuild_fts
+
+TRIGRAM_MIN_CHARS = 3 # trigram 인덱스로 찾을 수 있는 최소 글자 수
+# 짧은 검색어만 있을 때 LIKE로 훑는 최근 메시지 수 상한 (그보다 오래된 메시지는 3글자 이상 검색어로 찾습니다)
+SHORT_QUERY_SCAN_ROWS = 20000
+
+
+def _split_terms(query):
+    # 3글자 이상은 FTS 구문 검색, 그보다 짧은 단어(예: "휴학")는 인덱스로 찾을 수 없으므로 LIKE 조건으로 처리합니다.
+    terms = [t for t in query.split() if t]
+    fts_terms = [t for t in terms if len(t) >= TRIGRAM_MIN_CHARS]
+    like_terms = [t for t in terms if len(t) < TRIGRAM_MIN_CHARS]
+    return fts_terms, like_terms
+
+
+def _fts_query(terms):
+    return " AND ".join('"' + t.replace('"', '""') + '"' for t in terms)
+
+
+def like_pattern(term):
+    # LIKE / ILIKE 부분 일치 패턴 (PostgreSQL 저장소도 같은 함수를 사용합니다)
+    return "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def make_snippet(content, terms, width=30):
+    # 첫 번째로 일치한 검색어 주변만 잘라 [검색어] 형태로 강조합니다.
+    content = " ".join((content or "").split())
+    lowered = content.lower()
+    positions = [(lowered.find(t.lower()), t) for t in terms if lowered.find(t.lower()) >= 0]
+    if not positions:
+        return content[:width * 2]
+    pos, term = min(positions)
+    start, end = max(0, pos - width), min(len(content), pos + len(term) + width)
+    return (("…" if start else "") + content[start:pos] + "[" + content[pos:pos + len(term)] + "]"
+            + content[pos + len(term):end] + ("…" if end < len(content) else ""))
+
+
+def search_messages(conn, query, limit=20, since=None, role=None):
+    # 일치하는 메시지 전체를 관련도(bm25) 순으로 정렬합니다. 순위 계산과 상위 limit개 선택은
+    # FTS5 안에서 ORDER BY rank LIMIT으로 처리하므로 흔한 검색어도 결과 행 전체를 정렬하지 않습니다.
+    fts_terms, like_terms = _split_terms(query)
+    if not fts_terms and not like_terms:
+        return []
+    params = [_fts_query(fts_terms)] if fts_terms else []
+    filters = []
+    for term in like_terms:
+        filters.append("m.content LIKE ? ESCAPE '\\'")
+        params.append(like_pattern(term))
+    if since:
+        filters.append("m.timestamp >= ?")
+        params.append(since)
+    if role:
+        filters.append("m.role = ?")
+        params.append(role)
+    columns = ["message_id", "session_id", "title", "role", "timestamp", "snippet", "rank"]
+    if fts_terms:
+        # 메시지 테이블 조건이 없으면 JOIN 없이 FTS 인덱스만으로 상위 limit개를 뽑고,
+        # 조건이 있으면 조건을 통과한 일치 메시지 전체에서 순위를 매깁니다.
+        join = "JOIN chat_messages m ON m.message_id = chat_messages_fts.rowid" if filters else ""
+        sql = '''
+            SELECT m.message_id, m.session_id, s.title, m.role, m.timestamp, m.content, hits.rank FROM (
+                SELECT chat_messages_fts.rowid AS message_id, chat_messages_fts.rank AS rank
+                FROM chat_messages_fts {join}
+                WHERE chat_messages_fts MATCH ? {filters}
+                ORDER BY chat_messages_fts.rank LIMIT ?
+            ) hits
+            JOIN chat_messages m ON m.message_id = hits.message_id
+            LEFT JOIN chat_sessions s ON s.session_id = m.session_id
+            ORDER BY hits.rank
+        '''.format(join=join, filters="".join(" AND " + f for f in filters))
+        params.append(limit)
+        results = [dict(zip(columns, row)) for row in conn.execute(sql, params)]
+        # 하이라이트 조각은 최종 결과에 대해서만 만듭니다. (FTS snippet()은 후보 전체에 대해 계산되어 느림)
+        for r in results:
+            r["snippet"] = make_snippet(r["snippet"], fts_terms + like_terms)
+        return results
+    # 짧은 검색어(3글자 미만)만 있는 경우: trigram 인덱스로 찾을 수 없으므로 LIKE로 훑되,
+    # 테이블 전체를 읽지 않도록 최근 SHORT_QUERY_SCAN_ROWS개 메시지 안에서만 최신순으로 찾습니다.
+    filters.append("m.message_id > (SELECT COALESCE(MAX(message_id), 0) FROM chat_messages) - ?")
+    params += [SHORT_QUERY_SCAN_ROWS, limit]
+    sql = '''
+        SELECT m.message_id, m.session_id, s.title, m.role, m.timestamp, substr(m.content, 1, 80), 0
+        FROM chat_messages m
+        LEFT JOIN chat_sessions s ON s.session_id = m.session_id
+        WHERE {filters} ORDER BY m.message_id DESC LIMIT ?
+    '''.format(filters=" AND ".join(filters))
+    return [dict(zip(columns, row)) for row in conn.execute(sql, params)]
+
+
+def search_sessions(conn, query, limit=20):
+    fts_terms, like_terms = _split_terms(query)
+    if fts_terms:
+        sql = '''
+            SELECT s.session_id, s.title, s.last_updated FROM chat_sessions_fts
+            JOIN chat_sessions s ON s.rowid = chat_sessions_fts.rowid
+            WHERE chat_sessions_fts MATCH ?
+        '''
+        params = [_fts_query(fts_terms)]
+    elif like_terms:
+        sql = "SELECT s.session_id, s.title, s.last_updated FROM chat_sessions s WHERE 1 = 1"
+        params = []
+    else:
+        return []
+    for term in like_terms:
+        sql += " AND s.title LIKE ? ESCAPE '\\'"
+        params.append(like_pattern(term))
+    sql += (" ORDER BY bm25(chat_sessions_fts)" if fts_terms else " ORDER BY s.last_updated DESC") + " LIMIT ?"
+    params.append(limit)
+    return [dict(zip(["session_id", "title", "last_updated"], row)) for row in conn.execute(sql, params)]
+
+
+def search(db_name, query, limit=20, since=None):
+    # 세션 단위로 묶은 검색 결과: 제목 일치 세션을 먼저, 이어서 메시지 일치 세션을 관련도 순으로 돌려줍니다.
+    conn = sqlite3.connect(db_name)
+    try:
+        results = {}
+        for s in search_sessions(conn, query, limit):
+            results[s["session_id"]] = {"session_id": s["session_id"], "title": s["title"], "snippet": None,
+                                        "timestamp": s["last_updated"], "matches": 0}
+        for m in search_messages(conn, query, limit * 5, since):
+            entry = results.setdefault(m["session_id"], {"session_id": m["session_id"], "title": m["title"],
+                                                         "snippet": m["snippet"], "timestamp": m["timestamp"],
+                                                         "matches": 0})
+            entry["matches"] += 1
+            entry["snippet"] = entry["snippet"] or m["snippet"]
+        return list(results.values())[:limit]
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="채팅 기록 전문 검색")
+    parser.add_argument("query", nargs="?", default="")
+    parser.add_argument("--db", default=config.DB_NAME)
+    parser.add_argument("--since", default=None, help="이 시각 이후 메시지만 (예: 2026-10-12)")
+    parser.add_argument("--role", choices=["user", "assistant"], default=None)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--rebuild", action="store_true", help="FTS 인덱스를 처음부터 다시 만듭니다.")
+    args = parser.parse_args()
+
+    init_db(args.db)
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.rebuild:
+            rebuild_fts(conn)
+            print("✅ 검색 인덱스를 다시 만들었습니다.")
+        if args.query:
+            for m in search_messages(conn, args.query, args.limit, args.since, args.role):
+                print(f"[{m['timestamp']}] ({m['role']}) {m['title'] or '새로운 대화'} / {m['session_id']}")
+                print(f"    {m['snippet']}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import json
+import mmap
+import os
+
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_core.documents import Document
+
+import config
+
+# --- 메모리 절약형 청크 저장소 ---
+# 모든 청크 본문을 UTF-8로 이어 붙인 파일 하나(.bin)를 mmap으로 열어 두고,
+# 청크마다 (시작 바이트, 끝 바이트, 메타데이터 번호, start_index) 네 개의 정수만 들고 있습니다.
+# 검색 결과로 필요한 청크만 그때그때 Document로 만들기 때문에 프로세스가 모든 청크를
+# Python 문자열/Document 객체로 상주시키지 않고, 여러 프로세스가 같은 파일 페이지를 공유합니다.
+# LangChain FAISS의 docstore 자리에 그대로 끼워 쓸 수 있습니다. (docstore id는 일반 모드와 같은 chunk_id)
+
+
+def chunk_id(source, start_index, position):
+    # 청크 id = "문서 파일명:문서 안의 시작 위치". 같은 문서와 청크 설정으로 인덱스를 다시 만들어도(다른 프로세스,
+    # 메모리 절약 모드 포함) id가 같아서, 답변과 함께 저장한 청크 id(answer_metadata.py)로 원문을 다시 찾을 수 있습니다.
+    # 시작 위치가 없는 청크는 인덱스 안의 위치 번호를 씁니다.
+    name = os.path.basename(source or "")
+    return f"{name}:{start_index}" if start_index is not None and start_index >= 0 else f"{name}#{position}"
+
+
+def chunk_store_path(index_version):
+    # 인덱스 버전마다 별도 파일을 쓰므로 문서가 바뀌어도 이전 버전을 읽는 프로세스와 충돌하지 않습니다.
+    return os.path.join(config.CHUNK_STORE_DIR, index_version)
+
+
+def _paths(path):
+    return path + ".bin", path + ".idx.npy", path + ".meta.json"
+
+
+def write_chunk_store(path, documents):
+    # documents[i]는 FAISS 인덱스의 i번째 벡터에 해당하는 청크입니다.
+    # 같은 메타데이터(출처 파일 등)는 한 번만 저장하고 청크는 번호로 참조합니다. (start_index만 청크별로 저장)
+    bin_path, idx_path, meta_path = _paths(path)
+    tmp = f".{os.getpid()}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    metadatas = []
+    metadata_ids = {}
+    rows = np.empty((len(documents), 4), dtype="int64")
+    offset = 0
+    with open(bin_path + tmp, "wb") as f:
+        for i, doc in enumerate(documents):
+            data = doc.page_content.encode("utf-8")
+            f.write(data)
+            shared = {k: v for k, v in doc.metadata.items() if k != "start_index"}
+            key = json.dumps(shared, sort_keys=True, ensure_ascii=False)
+            if key not in metadata_ids:
+                metadata_ids[key] = len(metadatas)
+                metadatas.append(shared)
+            rows[i] = (offset, offset + len(data), metadata_ids[key], doc.metadata.get("start_index", -1))
+            offset += len(data)
+    with open(idx_path + tmp, "wb") as f:
+        np.save(f, rows)
+    with open(meta_path + tmp, "w", encoding="utf-8") as f:
+        json.dump({"chunks": len(documents), "metadatas": metadatas}, f, ensure_ascii=False)
+    # 여러 프로세스가 동시에 만들더라도 읽는 쪽은 항상 완성된 파일만 보도록 메타 파일을 마지막에 교체합니다.
+    for final in (bin_path, idx_path, meta_path):
+        os.replace(final + tmp, final)
+
+
+def chunk_store_exists(path, chunks=None):
+    meta_path = _paths(path)[2]
+    if not os.path.exists(meta_path):
+        return False
+    with open(meta_path, encoding="utf-8") as f:
+        return chunks is None or json.load(f).get("chunks") == chunks
+
+
+class MmapDocstore(Docstore):
+    def __init__(self, path):
+        bin_path, idx_path, meta_path = _paths(path)
+        self.path = path
+        with open(meta_path, encoding="utf-8") as f:
+            self.metadatas = json.load(f)["metadatas"]
+        self.rows = np.load(idx_path, mmap_mode="r")
+        with open(bin_path, "rb") as f:
+            # 빈 파일은 mmap할 수 없으므로 (청크가 모두 빈 문자열인 경우) 빈 바이트열로 대신합니다.
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+        # FAISS 위치 번호 → 청크 id (index_to_docstore_id로 사용), 청크 id → 위치 번호
+        self.ids = [chunk_id(self.metadatas[int(metadata_id)].get("source"), int(start_index), position)
+                    for position, (_, _, metadata_id, start_index) in enumerate(self.rows)]
+        self.positions = {doc_id: position for position, doc_id in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def search(self, search):
+        position = self.positions.get(search)
+        if position is None:
+            return f"ID {search} not found."
+        start, end, metadata_id, start_index = (int(v) for v in self.rows[position])
+        metadata = dict(self.metadatas[metadata_id])
+        if start_index >= 0:
+            metadata["start_index"] = start_index
+        return Document(id=self.ids[position], page_content=self._data[start:end].decode("utf-8"), metadata=metadata)
+
+    def delete(self, ids):
+        raise NotImplementedError("MmapDocstore는 읽기 전용입니다.")
+
+
+def compact_vectorstore(vectorstore, path):
+    # 이미 만든 FAISS 저장소의 InMemoryDocstore(Document 객체들)를 mmap 청크 저장소로 바꿉니다.
+    # 같은 경로에 같은 개수의 청크 저장소가 있으면 (다른 프로세스가 이미 만든 경우) 그대로 엽니다.
+    if isinstance(vectorstore.docstore, MmapDocstore):
+        return vectorstore
+    n_chunks = vectorstore.index.ntotal
+    if not chunk_store_exists(path, n_chunks):
+        documents = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]) for i in range(n_chunks)]
+        write_chunk_store(path, documents)
+    vectorstore.docstore = MmapDocstore(path)
+    vectorstore.index_to_docstore_id = dict(enumerate(vectorstore.docstore.ids))
+    return vectorstore
@@ -0,0 +1,137 @@
+import difflib
+import hashlib
+import threading
+from collections import OrderedDict
+
+from langchain.prompts import PromptTemplate
+
+import config
+import metrics
+from text_utils import strip_html, normalize_query, estimate_tokens
+
+# --- 대화 맥락을 반영한 검색 (후속 질문 → 독립 질문 변환) ---
+# "그럼 기숙사는?" 같은 후속 질문은 그대로 검색하면 관련 문서를 찾지 못하므로,
+# 최근 대화 몇 턴을 참고해 혼자서도 의미가 통하는 질문으로 바꾼 뒤 검색합니다.
+
+CONDENSE_PROMPT_TEMPLATE = """다음은 한밭대학교 규정 안내 챗봇과 사용자의 최근 대화입니다.
+대화 맥락을 참고하여 마지막 후속 질문을 이전 대화 없이도 이해할 수 있는 하나의 독립된 질문으로 다시 작성하세요.
+질문에 답하지 말고, 다시 작성한 질문만 한 줄로 출력하세요. 질문의 언어는 그대로 유지하세요.
+
+대화:
+{history}
+
+후속 질문: {question}
+독립된 질문:"""
+condense_prompt = PromptTemplate(
+    input_variables=["history", "question"],
+    template=CONDENSE_PROMPT_TEMPLATE,
+)
+
+# 이전 대화를 가리키는 표현이 있거나 질문이 매우 짧으면 후속 질문으로 봅니다.
+FOLLOW_UP_MARKERS = (
+    "그럼", "그러면", "그건", "그거", "그것", "그게", "그런데", "그리고", "거기", "그때", "그 ",
+    "이건", "이거", "저건", "저거", "방금", "아까", "위에", "또", "더 ", "다른", "나머지",
+    "what about", "and ", "how about", "that", "it ",
+)
+SHORT_QUESTION_CHARS = 12
+
+
+SOURCES_SEPARATOR = "\n\n--- 참고 문서 ---\n"
+
+
+def answer_copy_text(msg):
+    # 봇 답변의 순수 텍스트(답변 + 참고 문서 목록). 화면용 HTML과 복사용 텍스트는 메시지에 따로 저장하지 않고
+    # 답변 본문(content)과 출처 파일명 목록(sources)에서 필요할 때 만듭니다.
+    sources = msg.get("sources")
+    if not sources:
+        return msg["content"]
+    return msg["content"] + SOURCES_SEPARATOR + ", ".join(sources)
+
+
+def answer_from_copy_text(text, sources):
+    # answer_copy_text의 반대: DB에 저장된 텍스트에서 참고 문서 목록을 떼어 답변 본문만 돌려줍니다.
+    suffix = SOURCES_SEPARATOR + ", ".join(sources)
+    return text[:-len(suffix)] if sources and text.endswith(suffix) else text
+
+
+def build_history_window(messages, max_turns=None, max_tokens=None):
+    # 최근 대화부터 거꾸로 훑으면서 (최대 턴 수, 토큰 예산) 안에 들어오는 메시지만 남깁니다.
+    # 인사말처럼 답변이 아닌 봇 메시지(sources 없음)와 오류 안내 메시지는 제외합니다.
+    max_turns = config.HISTORY_MAX_TURNS if max_turns is None else max_turns
+    max_tokens = config.HISTORY_MAX_TOKENS if max_tokens is None else max_tokens
+    window = []
+    used_tokens = 0
+    for msg in reversed(messages):
+        if msg["role"] == "assistant" and ("sources" not in msg or msg.get("is_error")):
+            continue
+        text = strip_html(answer_copy_text(msg))[:config.HISTORY_MESSAGE_MAX_CHARS]
+        tokens = estimate_tokens(text)
+        if len(window) >= max_turns * 2 or used_tokens + tokens > max_tokens:
+            break
+        window.append((msg["role"], text))
+        used_tokens += tokens
+    window.reverse()
+    return tuple(window)
+
+
+def format_history(history):
+    return "\n".join(f"{'사용자' if role == 'user' else '챗봇'}: {text}" for role, text in history)
+
+
+def needs_condensing(history, question):
+    if not history:
+        return False
+    normalized = normalize_query(question)
+    return len(normalized) <= SHORT_QUESTION_CHARS or any(m in normalized for m in FOLLOW_UP_MARKERS)
+
+
+def is_reask(previous_question, question, threshold=0.6):
+    # 직전 질문을 거의 그대로 다시 입력한 경우(재질문)를 판별합니다.
+    if not previous_question:
+        return False
+    a, b = normalize_query(previous_question), normalize_query(question)
+    return a == b or difflib.SequenceMatcher(None, a, b).ratio() >= threshold
+
+
+class QueryCondenser:
+    # 후속 질문을 독립 질문으로 바꾸는 단계. 같은 (대화, 질문) 조합은 LLM을 다시 부르지 않도록 LRU로 캐시합니다.
+    def __init__(self, llm, cache_size=None):
+        self.llm = llm
+        self.cache_size = config.CONDENSE_CACHE_SIZE if cache_size is None else cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cache_key(self, history, question):
+        raw = format_history(history) + "\n\x00" + normalize_query(question)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def condense(self, history, question, call=None):
+        # call(fn, estimated, usage)을 주면 LLM 호출을 그 함수로 실행합니다. (답변 파이프라인의 제한 시간 / 거버너)
+        if not needs_condensing(history, question):
+            metrics.incr("condense_skipped")
+            return question
+
+        key = self._cache_key(history, question)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                metrics.incr("condense_cache_hits")
+                return self._cache[key]
+
+        with metrics.timer("condense_latency"):
+            prompt = condense_prompt.format(history=format_history(history), question=question)
+            if call is None:
+                result = self.llm.invoke(prompt)
+            else:
+                prompt_tokens = estimate_tokens(prompt)
+                result = call(lambda: self.llm.invoke(prompt), prompt_tokens + config.CONDENSE_MAX_TOKENS,
+                              lambda r: prompt_tokens + estimate_tokens(getattr(r, "content", r) or ""))
+        metrics.incr("condense_llm_calls")
+        standalone = (getattr(result, "content", result) or "").strip().splitlines()
+        standalone = standalone[0].strip() if standalone else question
+
+        with self._lock:
+            self._cache[key] = standalone
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return standalone
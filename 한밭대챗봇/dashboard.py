@@ -0,0 +1,49 @@
+# 운영자용 채팅 분석 대시보드
+# 학생용 챗봇 화면과 분리된 별도 앱입니다. analytics.py run 으로 집계된 롤업 테이블만 읽습니다.
+# 실행: streamlit run dashboard.py
+import sqlite3
+
+import pandas as pd
+import streamlit as st
+
+import config
+from analytics import daily_stats, ensure_tables, source_citations, top_questions, unanswered_questions
+from db_manager import init_db
+
+st.set_page_config(page_title="한밭대 챗봇 분석", page_icon="📊", layout="wide")
+st.title("📊 한밭대 챗봇 이용 분석")
+
+init_db(config.DB_NAME)
+conn = sqlite3.connect(config.DB_NAME)
+ensure_tables(conn)
+
+state = conn.execute("SELECT last_message_id, updated_at FROM analytics_state").fetchone()
+if state:
+    st.caption(f"마지막 집계: {state[1]} (message_id {state[0]}까지)")
+else:
+    st.info("아직 집계된 데이터가 없습니다. `python analytics.py run`을 먼저 실행해주세요.")
+
+daily = pd.DataFrame(daily_stats(conn, days=60))
+if not daily.empty:
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("일별 질문 수")
+        st.bar_chart(daily.set_index("day")["questions"])
+    with col2:
+        st.subheader("일별 미답변 비율")
+        st.line_chart(daily.set_index("day")["fallback_rate"])
+
+col1, col2 = st.columns(2)
+with col1:
+    st.subheader("자주 묻는 질문")
+    st.dataframe(pd.DataFrame(top_questions(conn, 30)), hide_index=True, use_container_width=True)
+with col2:
+    st.subheader("답변하지 못한 질문 (문서 보완 후보)")
+    st.dataframe(pd.DataFrame(unanswered_questions(conn, 30)), hide_index=True, use_container_width=True)
+
+st.subheader("문서별 인용 수")
+citations = pd.DataFrame(source_citations(conn))
+if not citations.empty:
+    st.bar_chart(citations.set_index("source")["citations"])
+
+conn.close()
@@ -0,0 +1,104 @@
+import sqlite3
+import uuid
+
+import config
+
+# --- 데이터베이스 스키마 ---
+# app.py와 CLI/벤치마크 스크립트가 같은 스키마를 사용하도록 한곳에 모아 둡니다.
+
+
+def init_db(db_name=None):
+    conn = sqlite3.connect(db_name or config.DB_NAME)
+    c = conn.cursor()
+    # 채팅 세션 저장 테이블 (대화 목록을 위한 메타데이터)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS chat_sessions (
+            session_id TEXT PRIMARY KEY,
+            title TEXT,
+            start_time TEXT,
+            last_updated TEXT
+        )
+    ''')
+    # 각 메시지 저장 테이블 (실제 대화 내용)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS chat_messages (
+            message_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT,
+            role TEXT,
+            content TEXT,
+            timestamp TEXT,
+            retrieval TEXT,
+            FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id)
+        )
+    ''')
+    # 봇 답변의 검색 메타데이터(JSON, answer_metadata.py). 이 열이 생기기 전에 만든 DB에는 열을 추가합니다.
+    if "retrieval" not in [row[1] for row in c.execute("PRAGMA table_info(chat_messages)")]:
+        c.execute("ALTER TABLE chat_messages ADD COLUMN retrieval TEXT")
+    # 세션별 메시지 조회(대화 불러오기)와 가져오기 시 중복 확인에 사용하는 인덱스
+    c.execute("CREATE INDEX IF NOT EXISTS idx_chat_messages_session ON chat_messages(session_id, timestamp)")
+    # DB마다 처음 한 번 만드는 고유 id. 내보낸 기록에 함께 남겨, 병합할 때 어느 DB의 message_id인지 구분합니다.
+    c.execute("CREATE TABLE IF NOT EXISTS chat_meta (key TEXT PRIMARY KEY, value TEXT)")
+    c.execute("INSERT OR IGNORE INTO chat_meta VALUES ('db_id', ?)", (uuid.uuid4().hex,))
+    # 가져오기(chat_export.py)로 이미 넣은 메시지: (원본 DB id, 원본 message_id)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS chat_imports (
+            origin TEXT,
+            source_message_id INTEGER,
+            PRIMARY KEY (origin, source_message_id)
+        ) WITHOUT ROWID
+    ''')
+    ensure_fts(conn)
+    conn.commit()
+    conn.close()
+
+
+def db_id(conn):
+    return conn.execute("SELECT value FROM chat_meta WHERE key = 'db_id'").fetchone()[0]
+
+
+def ensure_fts(conn):
+    # 메시지 내용과 세션 제목에 대한 FTS5 전문 검색 인덱스.
+    # 한국어는 형태소 분석 없이도 부분 일치가 되도록 trigram 토크나이저를 사용하고,
+    # 원본 테이블을 참조하는 external content 방식이라 본문을 중복 저장하지 않습니다.
+    # 인덱스는 트리거로 원본 테이블과 항상 동기화됩니다.
+    c = conn.cursor()
+    created = c.execute("SELECT 1 FROM sqlite_master WHERE name = 'chat_messages_fts'").fetchone() is None
+    c.executescript('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS chat_messages_fts USING fts5(
+            content, content='chat_messages', content_rowid='message_id', tokenize='trigram'
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS chat_sessions_fts USING fts5(
+            title, content='chat_sessions', content_rowid='rowid', tokenize='trigram'
+        );
+
+        CREATE TRIGGER IF NOT EXISTS chat_messages_fts_ai AFTER INSERT ON chat_messages BEGIN
+            INSERT INTO chat_messages_fts(rowid, content) VALUES (new.message_id, new.content);
+        END;
+        CREATE TRIGGER IF NOT EXISTS chat_messages_fts_ad AFTER DELETE ON chat_messages BEGIN
+            INSERT INTO chat_messages_fts(chat_messages_fts, rowid, content) VALUES ('delete', old.message_id, old.content);
+        END;
+        CREATE TRIGGER IF NOT EXISTS chat_messages_fts_au AFTER UPDATE OF content ON chat_messages BEGIN
+            INSERT INTO chat_messages_fts(chat_messages_fts, rowid, content) VALUES ('delete', old.message_id, old.content);
+            INSERT INTO chat_messages_fts(rowid, content) VALUES (new.message_id, new.content);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS chat_sessions_fts_ai AFTER INSERT ON chat_sessions BEGIN
+            INSERT INTO chat_sessions_fts(rowid, title) VALUES (new.rowid, new.title);
+        END;
+        CREATE TRIGGER IF NOT EXISTS chat_sessions_fts_ad AFTER DELETE ON chat_sessions BEGIN
+            INSERT INTO chat_sessions_fts(chat_sessions_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+        END;
+        CREATE TRIGGER IF NOT EXISTS chat_sessions_fts_au AFTER UPDATE OF title ON chat_sessions BEGIN
+            INSERT INTO chat_sessions_fts(chat_sessions_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+            INSERT INTO chat_sessions_fts(rowid, title) VALUES (new.rowid, new.title);
+        END;
+    ''')
+    if created:
+        # 기존 DB에 처음 인덱스를 만드는 경우 이미 저장된 행들을 색인합니다.
+        rebuild_fts(conn)
+
+
+def rebuild_fts(conn):
+    conn.execute("INSERT INTO chat_messages_fts(chat_messages_fts) VALUES ('rebuild')")
+    conn.execute("INSERT INTO chat_sessions_fts(chat_sessions_fts) VALUES ('rebuild')")
+    conn.commit()
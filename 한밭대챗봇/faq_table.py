@@ -0,0 +1,226 @@
+# 사전 계산 FAQ 답변 표
+# 질문 대부분은 학점 / 장학금 / 생활관 규정에 관한 정형 질문이고, 그 답은 .txt 문서가 바뀔 때만 달라집니다.
+# 오프라인 작업(build)이 운영자가 정한 질문 목록(FAQ_QUESTIONS_PATH)의 답변을 기존 프롬프트와 QA 체인으로
+# 배치 질의 엔진(batch_query.py, 작업자 풀)을 통해 생성해 SQLite 표(FAQ_DB_PATH)에 저장합니다.
+# 앱은 시작할 때 유효한 답변만 메모리로 읽어 두고, 정규화한 질문이 일치하면 LLM 호출 없이 출처 청크와 함께 바로 답합니다.
+# 각 답변에는 답변에 쓰인 청크가 나온 문서의 해시를 함께 저장해, 그 문서가 바뀐 답변만 무효가 됩니다.
+# (프롬프트, 생성 모델, 청크 / 검색 설정이 바뀌면 모든 답변이 무효가 됩니다.)
+# 앱이 시작할 때 무효가 된 답변을 발견하면 백그라운드에서 그 답변만 다시 생성해 표를 갱신합니다. (FAQ_AUTO_REFRESH)
+# 사용법 (한밭대챗봇 폴더에서):
+#   python faq_table.py build      # 새 질문과 문서가 바뀐 질문만 생성 (--force: 전체 다시 생성)
+#   python faq_table.py report     # 저장된 답변과 유효 여부 출력
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from langchain_core.documents import Document
+
+import config
+import metrics
+from answer_cache import CachedQueryEmbeddings
+from answer_pipeline import AnswerPipeline
+from backends import create_embeddings, create_llm, create_reranker, embedding_model_name, llm_model_name
+from batch_query import BatchQueryEngine
+from query_router import QueryRouter
+from rag_system import (PROMPT_TEMPLATE, build_qa_chain, build_vectorstore, compute_index_version, load_documents,
+                        load_vectorstore, split_documents)
+from text_utils import normalize_query
+
+
+def ensure_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS faq_answers (
+            question_key TEXT PRIMARY KEY,
+            question TEXT,
+            answer TEXT,
+            source_documents TEXT,
+            doc_hashes TEXT,
+            generation_version TEXT,
+            index_version TEXT,
+            generated_at TEXT
+        )
+    ''')
+
+
+def document_hashes(documents):
+    # {문서 파일명: 내용 해시}
+    hashes = {}
+    for doc in sorted(documents, key=lambda d: (d.metadata.get("source", ""), d.page_content)):
+        source = os.path.basename(doc.metadata.get("source", ""))
+        hashes[source] = hashlib.sha256((hashes.get(source, "") + doc.page_content).encode("utf-8")).hexdigest()[:12]
+    return hashes
+
+
+def generation_version():
+    # 문서 내용 외에 답변을 바꾸는 설정(프롬프트, 생성 모델, 청크 / 검색 / 재순위화 / 라우팅 / 벡터 인덱스 설정)이
+    # 같으면 같은 버전 문자열이 나옵니다. FAQ 답변은 독립 질문으로 생성하므로 대화 맥락 반영 설정은 넣지 않습니다.
+    settings = [PROMPT_TEMPLATE, config.LLM_BACKEND, llm_model_name(), config.LLM_TEMPERATURE, config.CHUNK_SIZE,
+                config.CHUNK_OVERLAP, config.RETRIEVER_K, config.EMBEDDING_BACKEND, embedding_model_name(),
+                config.RERANK_ENABLED, config.RERANK_MODEL, config.RERANK_FETCH_K, config.RERANK_TOP_N,
+                config.RERANK_MAX_LENGTH, config.ROUTING_ENABLED, config.DOC_CATEGORIES, config.ROUTING_MAX_CATEGORIES,
+                config.ROUTING_RELATIVE_THRESHOLD, config.VECTOR_INDEX_TYPE, config.IVF_NLIST, config.IVF_NPROBE,
+                config.PQ_M, config.HNSW_M, config.HNSW_EF_CONSTRUCTION, config.HNSW_EF_SEARCH]
+    return hashlib.sha256(json.dumps(settings, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def is_current(doc_hashes, version, current_hashes, current_version):
+    return version == current_version and all(current_hashes.get(s) == h for s, h in doc_hashes.items())
+
+
+def load_questions(path=None):
+    with open(path or config.FAQ_QUESTIONS_PATH, encoding="utf-8") as f:
+        lines = (line.strip() for line in f)
+        return [line for line in lines if line and not line.startswith("#")]
+
+
+def _encode_documents(documents):
+    # 청크 id는 (문서 파일명, 시작 위치)로 정해지므로(rag_system.chunk_ids) 인덱스를 다시 만들어도 디버그 화면에서 찾을 수 있습니다.
+    return json.dumps([{"id": d.id, "page_content": d.page_content, "metadata": d.metadata} for d in documents],
+                      ensure_ascii=False, separators=(",", ":"))
+
+
+def _decode_documents(text):
+    return [Document(id=d["id"], page_content=d["page_content"], metadata=d["metadata"]) for d in json.loads(text)]
+
+
+class FaqTable:
+    # {정규화된 질문: 응답} - 응답은 pipeline.answer와 같은 형식에 faq 표시와 생성 당시 인덱스 버전이 붙습니다.
+    # stale: 표에 있지만 문서 / 설정이 바뀌어 무효가 된 답변 수
+    def __init__(self, responses, stale=0):
+        self._responses = responses
+        self.stale = stale
+
+    def get(self, query):
+        response = self._responses.get(normalize_query(query))
+        metrics.incr("faq_hits" if response is not None else "faq_misses")
+        return response
+
+    def __len__(self):
+        return len(self._responses)
+
+
+def load_faq_table(documents, db_path=None):
+    # 현재 문서 / 설정으로 여전히 유효한 답변만 읽습니다. 표 파일이 없으면 빈 표
+    db_path = db_path or config.FAQ_DB_PATH
+    if not os.path.exists(db_path):
+        return FaqTable({})
+    current_hashes, current_version = document_hashes(documents), generation_version()
+    conn = sqlite3.connect(db_path)
+    try:
+        ensure_table(conn)
+        rows = conn.execute("SELECT question_key, question, answer, source_documents, doc_hashes, generation_version, "
+                            "index_version FROM faq_answers").fetchall()
+    finally:
+        conn.close()
+    responses = {}
+    for key, question, answer, source_documents, doc_hashes, version, index_version in rows:
+        if is_current(json.loads(doc_hashes), version, current_hashes, current_version):
+            responses[key] = {"query": question, "result": answer, "source_documents": _decode_documents(source_documents),
+                              "faq": True, "index_version": index_version}
+    metrics.set_gauge("faq_entries", len(responses))
+    metrics.set_gauge("faq_stale_entries", len(rows) - len(responses))
+    return FaqTable(responses, stale=len(rows) - len(responses))
+
+
+def build(pipeline, documents, questions, db_path=None, force=False, workers=None, queue_timeout=None,
+          budget_reserve=0.0):
+    # 새 질문과 무효가 된 답변만 생성해 저장하고, 목록에서 빠진 질문은 지웁니다. (생성 / 유지 / 삭제 / 실패 수 반환)
+    current_hashes, current_version = document_hashes(documents), generation_version()
+    questions = {normalize_query(q): q for q in questions}
+    conn = sqlite3.connect(db_path or config.FAQ_DB_PATH)
+    try:
+        ensure_table(conn)
+        stored = {key: (json.loads(doc_hashes), version) for key, doc_hashes, version in
+                  conn.execute("SELECT question_key, doc_hashes, generation_version FROM faq_answers")}
+        removed = [key for key in stored if key not in questions]
+        conn.executemany("DELETE FROM faq_answers WHERE question_key = ?", [(key,) for key in removed])
+        pending = [q for key, q in questions.items()
+                   if force or key not in stored or not is_current(*stored[key], current_hashes, current_version)]
+        failed = 0
+        for question, response in zip(pending, BatchQueryEngine(pipeline, workers=workers).answer(
+                pending, queue_timeout, budget_reserve)):
+            if "error" in response or response.get("degraded"):
+                failed += 1 # 실패한 질문은 이전 답변(무효면 앱이 쓰지 않음)을 그대로 두고 다음 build에서 다시 시도합니다.
+                continue
+            chunks = response.get("source_documents", [])
+            sources = {os.path.basename(d.metadata.get("source", "")) for d in chunks}
+            conn.execute("INSERT OR REPLACE INTO faq_answers VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (normalize_query(question), question, response["result"], _encode_documents(chunks),
+                          json.dumps({s: current_hashes[s] for s in sorted(sources) if s in current_hashes}),
+                          current_version, pipeline.index_version, datetime.now().isoformat(timespec="seconds")))
+        conn.commit()
+    finally:
+        conn.close()
+    return {"generated": len(pending) - failed, "kept": len(questions) - len(pending), "removed": len(removed),
+            "failed": failed}
+
+
+def start_faq_refresh(pipeline, documents, db_path=None):
+    # 무효가 된 답변(과 목록에 새로 추가된 질문)만 앱의 답변 파이프라인으로 백그라운드에서 다시 생성하고,
+    # 끝나면 새 표를 파이프라인에 넣습니다. 사용자 몫의 LLM 예산을 쓰지 않도록 대기하지 않고, 예산이 충분히 남아 있을 때만 생성합니다.
+    # 실패한 질문은 다음에 앱이 시작할 때(또는 python faq_table.py build) 다시 시도됩니다.
+    def run():
+        try:
+            counts = build(pipeline, documents, load_questions(), db_path, workers=config.FAQ_REFRESH_WORKERS,
+                           queue_timeout=0, budget_reserve=config.GOVERNOR_BACKGROUND_RESERVE)
+            metrics.incr("faq_refreshed", counts["generated"])
+            pipeline.faq_table = load_faq_table(documents, db_path)
+        except Exception:
+            metrics.incr("faq_refresh_failures")
+
+    thread = threading.Thread(target=run, name="faq-refresh", daemon=True)
+    thread.start()
+    return thread
+
+
+def _offline_pipeline(documents):
+    # 앱과 같은 설정(라우팅, 재순위화)의 답변 파이프라인. 실패를 저하 모드 답변으로 바꾸지 않도록 회로 차단기는 쓰지 않습니다.
+    api_key = os.getenv("OPENAI_API_KEY")
+    index_version = compute_index_version(documents)
+    embeddings = CachedQueryEmbeddings(create_embeddings(api_key))
+    vectorstore = load_vectorstore(embeddings, index_version)
+    if vectorstore is None:
+        vectorstore = build_vectorstore(split_documents(documents), embeddings)
+    reranker = create_reranker() if config.RERANK_ENABLED else None
+    router = QueryRouter() if config.ROUTING_ENABLED else None
+    return AnswerPipeline(build_qa_chain(create_llm(api_key), vectorstore, reranker=reranker, router=router),
+                          index_version, coalesce=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="사전 계산 FAQ 답변 표")
+    parser.add_argument("command", choices=["build", "report"])
+    parser.add_argument("--db", default=config.FAQ_DB_PATH)
+    parser.add_argument("--questions", default=config.FAQ_QUESTIONS_PATH)
+    parser.add_argument("--workers", type=int, default=None, help="답변 생성 작업자 수 (기본: BATCH_QUERY_WORKERS)")
+    parser.add_argument("--force", action="store_true", help="유효한 답변도 모두 다시 생성")
+    args = parser.parse_args()
+
+    documents, missing_files, failed_files = load_documents()
+    if missing_files or failed_files:
+        # 일부 문서가 빠진 상태로 만든 답변이 표에 저장되지 않도록 중단합니다.
+        raise SystemExit(f"문서를 불러오지 못했습니다: {', '.join(missing_files + list(failed_files))}")
+
+    if args.command == "build":
+        counts = build(_offline_pipeline(documents), documents, load_questions(args.questions), args.db, args.force,
+                       args.workers)
+        print(f"✅ FAQ 답변 표 갱신: 생성 {counts['generated']}개, 유지 {counts['kept']}개, 삭제 {counts['removed']}개, "
+              f"실패 {counts['failed']}개 ({args.db})")
+        return
+
+    current_hashes, current_version = document_hashes(documents), generation_version()
+    conn = sqlite3.connect(args.db)
+    ensure_table(conn)
+    for question, doc_hashes, version, generated_at in conn.execute(
+            "SELECT question, doc_hashes, generation_version, generated_at FROM faq_answers ORDER BY question"):
+        valid = is_current(json.loads(doc_hashes), version, current_hashes, current_version)
+        print(f"  {'유효' if valid else '무효'}  {generated_at}  {question}  ({', '.join(json.loads(doc_hashes))})")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from langchain_core.caches import BaseCache
+from langchain_core.globals import set_llm_cache
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, Generation
+
+import config
+import metrics
+
+# --- LLM 응답 캐시 (완성된 프롬프트 기준, 레플리카 공유) ---
+# 표현이 다른 질문이라도 검색 결과 청크가 같으면 LLM에 들어가는 프롬프트(PROMPT_TEMPLATE에 청크와 질문을 채운 것)는
+# 바이트 단위로 같을 수 있습니다. (모델, 온도 등 LLM 설정, 완성된 프롬프트)의 해시를 키로 응답을 SQLite(WAL) 파일에 저장하고,
+# 같은 파일을 보는 모든 레플리카가 함께 재사용합니다. LangChain 전역 LLM 캐시(set_llm_cache)로 등록하므로
+# 답변 체인, 질문 변환 등 모든 LLM 호출이 자동으로 거칩니다.
+# 항목은 인덱스 버전별로 구분되어 버전이 바뀌면 더 이상 쓰이지 않고, 크기 제한을 넘으면 다른 버전 항목부터
+# 오래 쓰이지 않은 순서로 지웁니다. 캐시 파일 오류는 LLM 호출을 막지 않고 캐시 미스로 처리합니다.
+# 답변 파이프라인은 LLM 거버너의 자리와 예산을 얻기 전에 probe로 캐시만 먼저 확인하므로, 캐시된 응답은 예산을 쓰지 않습니다.
+
+
+def _encode(generations):
+    # 답변 텍스트만 저장합니다. (캐시에서 꺼낸 응답은 토큰 사용량 등 호출 메타데이터가 없습니다)
+    return json.dumps([{"text": g.text, "chat": isinstance(g, ChatGeneration)} for g in generations],
+                      ensure_ascii=False)
+
+
+class LLMCacheMiss(Exception):
+    # probe 중 캐시에 없는 호출을 만나면 LLM을 부르지 않고 체인 실행을 멈추기 위한 예외
+    pass
+
+
+class LLMResponseCache(BaseCache):
+    def __init__(self, index_version, path=None, max_entries=None):
+        self.index_version = index_version
+        self.path = path or config.LLM_CACHE_PATH
+        self.max_entries = max_entries or config.LLM_CACHE_MAX_ENTRIES
+        self._inserts = 0
+        self._lock = threading.Lock()
+        self._local = threading.local() # 스레드별 probe 여부
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL") # 여러 프로세스가 읽는 동안에도 쓰기가 막히지 않도록 (파일에 영구 적용)
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    index_version TEXT,
+                    response TEXT,
+                    created_at REAL,
+                    last_used REAL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used)")
+        conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=config.LLM_CACHE_BUSY_TIMEOUT)
+
+    def key(self, prompt, llm_string):
+        # llm_string은 LangChain이 만든 모델 설정 직렬화(모델 이름, 온도, 최대 토큰 수 등)입니다.
+        # 인덱스 버전도 키에 넣어 배포가 바뀌는 동안 버전이 다른 레플리카끼리 항목을 덮어쓰지 않게 합니다.
+        return hashlib.sha256(f"{self.index_version}\0{llm_string}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def probe(self, fn):
+        # fn 안의 LLM 호출이 모두 캐시에 있으면 fn의 결과를, 하나라도 없으면 LLM을 부르지 않고 None을 돌려줍니다.
+        self._local.probing = True
+        try:
+            return fn()
+        except LLMCacheMiss:
+            return None
+        finally:
+            self._local.probing = False
+
+    def lookup(self, prompt, llm_string):
+        key = self.key(prompt, llm_string)
+        row = None
+        conn = None
+        try:
+            conn = self._connect()
+            with conn:
+                row = conn.execute("SELECT response FROM llm_cache WHERE cache_key = ?", (key,)).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE llm_cache SET last_used = ?, hits = hits + 1 WHERE cache_key = ?",
+                                 (time.time(), key))
+        except sqlite3.Error:
+            metrics.incr("llm_cache_errors")
+        finally:
+            if conn is not None:
+                conn.close()
+        if row is None:
+            if getattr(self._local, "probing", False):
+                raise LLMCacheMiss() # 이어서 실제로 호출할 때 다시 찾으므로 조회 수는 그때 셉니다.
+            metrics.incr("llm_cache_lookups")
+            return None
+        metrics.incr("llm_cache_lookups")
+        metrics.incr("llm_cache_hits")
+        return [ChatGeneration(message=AIMessage(content=g["text"])) if g["chat"] else Generation(text=g["text"])
+                for g in json.loads(row[0])]
+
+    def update(self, prompt, llm_string, return_val):
+        now = time.time()
+        conn = None
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO llm_cache (cache_key, index_version, response, created_at, last_used) "
+                             "VALUES (?, ?, ?, ?, ?)", (self.key(prompt, llm_string), self.index_version,
+                                                         _encode(return_val), now, now))
+                if self._due_for_eviction():
+                    self._evict(conn)
+        except sqlite3.Error:
+            metrics.incr("llm_cache_errors")
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _due_for_eviction(self):
+        # 저장할 때마다 개수를 세지 않고 LLM_CACHE_EVICT_EVERY번마다 한 번씩 정리합니다.
+        with self._lock:
+            self._inserts += 1
+            return self._inserts % config.LLM_CACHE_EVICT_EVERY == 1
+
+    def _evict(self, conn):
+        # 현재 인덱스 버전의 최근 항목을 남기고, 다른 버전 항목과 오래 쓰이지 않은 항목부터 지웁니다.
+        conn.execute("DELETE FROM llm_cache WHERE cache_key IN (SELECT cache_key FROM llm_cache "
+                     "ORDER BY index_version = ? DESC, last_used DESC LIMIT -1 OFFSET ?)",
+                     (self.index_version, self.max_entries))
+        metrics.set_gauge("llm_cache_entries", conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0])
+
+    def clear(self, **kwargs):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM llm_cache")
+        conn.close()
+
+
+def install_llm_cache(index_version, path=None):
+    # LangChain 전역 LLM 캐시로 등록합니다. 모델 생성 시 cache를 따로 지정하지 않은 모든 LLM 호출에 적용됩니다.
+    cache = LLMResponseCache(index_version, path)
+    set_llm_cache(cache)
+    return cache
@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import defaultdict, deque
+
+# --- 프로세스 단위 간단한 메트릭 수집기 ---
+# 카운터와 최근 지연 시간 샘플을 메모리에 보관하고, 사이드바 디버그 화면과 벤치마크에서 조회합니다.
+
+_LATENCY_WINDOW = 1000 # 지표별로 보관할 최근 샘플 수
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_latencies = defaultdict(lambda: deque(maxlen=_LATENCY_WINDOW))
+_gauges = {}
+
+
+def incr(name, amount=1):
+    with _lock:
+        _counters[name] += amount
+
+
+def observe(name, seconds):
+    with _lock:
+        _latencies[name].append(seconds)
+
+
+def set_gauge(name, value):
+    with _lock:
+        _gauges[name] = value
+
+
+class timer:
+    # with metrics.timer("이름"): 블록의 실행 시간을 기록합니다.
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        observe(self.name, self.elapsed)
+        return False
+
+
+def ratio(numerator, denominator):
+    with _lock:
+        total = _counters.get(denominator, 0)
+        return _counters.get(numerator, 0) / total if total else 0.0
+
+
+def snapshot():
+    with _lock:
+        latencies = {}
+        for name, samples in _latencies.items():
+            ordered = sorted(samples)
+            if ordered:
+                latencies[name] = {
+                    "count": len(ordered),
+                    "p50_ms": ordered[len(ordered) // 2] * 1000,
+                    "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+                }
+        return {"counters": dict(_counters), "gauges": dict(_gauges), "latencies": latencies}
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _latencies.clear()
+        _gauges.clear()
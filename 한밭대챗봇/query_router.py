@@ -0,0 +1,93 @@
+import os
+from collections import defaultdict
+from typing import Any, Optional
+
+from langchain_core.retrievers import BaseRetriever
+
+import config
+import metrics
+from text_utils import normalize_query
+from vector_index import scored_similarity_search, search_subset, with_distances
+
+# --- 질문 카테고리 라우팅 ---
+# 다섯 문서가 하나의 FAISS 저장소를 공유하므로 기숙사 통금 질문도 학칙/장학금 청크와 경쟁합니다.
+# 가벼운 키워드 분류기로 질문의 카테고리를 정하고, 로더가 넣어 둔 `source` 메타데이터로
+# 해당 문서의 청크만 골라 사전 필터 검색합니다. 분류가 불확실하면 전체 인덱스를 검색합니다.
+
+CATEGORY_KEYWORDS = {
+    "학칙": ["학칙", "휴학", "복학", "전과", "제적", "자퇴", "학사경고", "졸업", "수업", "학기", "입학", "편입",
+             "재입학", "징계", "수강", "성적", "평점", "학위", "계절학기", "등록", "학년"],
+    "학점": ["학점", "이수", "교양", "전공", "계열", "대학특화", "기본전공", "심화전공", "복수전공", "최저"],
+    "장학금": ["장학", "국가장학금", "근로", "등록금", "감면", "학자금", "중복수혜", "혜윰", "성적우수", "포상"],
+    "생활관": ["기숙사", "생활관", "통금", "점호", "외박", "입사", "퇴사", "호실", "관생", "식사", "식당",
+               "벌점", "btl", "한밭관", "룸메"],
+    "wifi": ["와이파이", "wifi", "wi-fi", "무선", "인터넷", "eduroam", "wlan", "네트워크", "접속", "공유기"],
+}
+
+
+class QueryRouter:
+    def __init__(self, keywords=None, max_categories=None, relative_threshold=None):
+        self.keywords = keywords or CATEGORY_KEYWORDS
+        self.max_categories = max_categories or config.ROUTING_MAX_CATEGORIES
+        self.relative_threshold = relative_threshold or config.ROUTING_RELATIVE_THRESHOLD
+
+    def scores(self, query):
+        normalized = normalize_query(query)
+        # 긴 키워드일수록 구체적이므로 가중치를 조금 더 줍니다.
+        return {category: sum(1 + len(k) / 10 for k in words if k in normalized)
+                for category, words in self.keywords.items()}
+
+    def route(self, query):
+        # 검색할 카테고리 목록을 반환합니다. 확신이 없으면 None (전체 검색)
+        scores = self.scores(query)
+        top = max(scores.values())
+        if top <= 0:
+            return None
+        selected = [c for c, s in sorted(scores.items(), key=lambda x: -x[1]) if s >= top * self.relative_threshold]
+        if len(selected) > self.max_categories:
+            return None
+        return selected
+
+
+def category_id_map(vectorstore):
+    # {카테고리: [FAISS 내부 id, ...]} - 인덱스를 만들거나 불러온 뒤 한 번만 계산합니다.
+    ids_by_category = defaultdict(list)
+    for faiss_id, doc_id in vectorstore.index_to_docstore_id.items():
+        doc = vectorstore.docstore.search(doc_id)
+        source = os.path.basename(getattr(doc, "metadata", {}).get("source", ""))
+        category = config.DOC_CATEGORIES.get(source)
+        if category:
+            ids_by_category[category].append(faiss_id)
+    return dict(ids_by_category)
+
+
+def routed_search(vectorstore, ids_by_category, query, categories, k):
+    if not categories:
+        return scored_similarity_search(vectorstore, query, k)
+    allowed_ids = sorted(i for c in categories for i in ids_by_category.get(c, []))
+    if not allowed_ids:
+        return scored_similarity_search(vectorstore, query, k)
+    query_vector = vectorstore.embeddings.embed_query(query)
+    distances, indices = search_subset(vectorstore.index, [query_vector], min(k, len(allowed_ids)), allowed_ids)
+    found = [(i, d) for i, d in zip(indices[0], distances[0]) if i != -1]
+    return with_distances([vectorstore.docstore.search(vectorstore.index_to_docstore_id[int(i)]) for i, _ in found],
+                          [d for _, d in found])
+
+
+class CategoryRoutedRetriever(BaseRetriever):
+    # 카테고리 라우팅 + (선택) 재순위화를 함께 수행하는 LangChain 검색기
+    vectorstore: Any
+    router: Any
+    ids_by_category: dict
+    k: int = 4
+    reranker: Optional[Any] = None
+    fetch_k: int = 30
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        categories = self.router.route(query)
+        metrics.incr("routing_fallback" if categories is None else "routing_routed")
+        with metrics.timer("routed_retrieval"):
+            if self.reranker is None:
+                return routed_search(self.vectorstore, self.ids_by_category, query, categories, self.k)
+            candidates = routed_search(self.vectorstore, self.ids_by_category, query, categories, self.fetch_k)
+            return self.reranker.rerank(query, candidates, top_n=self.k)
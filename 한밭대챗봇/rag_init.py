@@ -0,0 +1,82 @@
+import threading
+import time
+
+import metrics
+
+# --- RAG 파이프라인 백그라운드 초기화 ---
+# 문서 로드, 인덱스 불러오기(없으면 빌드), 답변 파이프라인 구성을 백그라운드 스레드에서 진행하고
+# 진행 상태 객체를 바로 돌려줍니다. 화면 스레드는 기다리지 않으므로 콜드 스타트 중에도 채팅 화면과
+# 대화 기록이 먼저 표시되고, 상태가 ready가 되면 입력창이 켜집니다.
+# 시작 후 첫 화면 표시까지(first paint)와 답변 준비 완료까지(ready) 걸린 시간을 따로 기록합니다.
+
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+STARTED_AT = time.perf_counter() # 첫 스크립트 실행에서 이 모듈을 임포트한 시각 (app.py가 무거운 모듈보다 먼저 임포트)
+_first_paint_lock = threading.Lock()
+_first_paint_recorded = False
+
+
+class RagInitStatus:
+    def __init__(self, total_steps):
+        self.state = LOADING
+        self.step = "시작 준비 중"
+        self.step_number = 0 # 현재 진행 중인 단계 번호 (1부터)
+        self.total_steps = total_steps
+        self.pipeline = None
+        self.error = None
+        self.warnings = [] # 백그라운드 스레드에서는 화면에 쓸 수 없으므로 모아 두었다가 화면 스레드가 표시합니다.
+        self.ready_seconds = None
+        self._lock = threading.Lock()
+
+    def advance(self, step):
+        # 각 단계를 시작할 때 호출합니다. (진행률 = 끝난 단계 수 / 전체 단계 수)
+        with self._lock:
+            self.step_number += 1
+            self.step = step
+
+    def warn(self, message):
+        with self._lock:
+            self.warnings.append(message)
+
+    @property
+    def progress(self):
+        if self.state != LOADING:
+            return 1.0
+        return min(1.0, max(0, self.step_number - 1) / self.total_steps) if self.total_steps else 0.0
+
+
+def start_rag_init(setup, total_steps):
+    # setup(status)는 (answer_pipeline, error_message)를 돌려주는 함수입니다. (기존 setup_rag와 같은 규약)
+    status = RagInitStatus(total_steps)
+    metrics.set_gauge("rag_init_state", LOADING)
+
+    def run():
+        try:
+            pipeline, error = setup(status)
+        except Exception as e:
+            pipeline, error = None, f"RAG 시스템 초기화 중 오류 발생: {e}"
+        status.pipeline = pipeline
+        status.error = error if pipeline is None else None
+        status.ready_seconds = time.perf_counter() - STARTED_AT
+        # 파이프라인을 먼저 채운 뒤 상태를 바꿔서, ready를 본 화면 스레드가 항상 파이프라인을 쓸 수 있게 합니다.
+        status.state = READY if pipeline is not None else FAILED
+        metrics.set_gauge("rag_init_state", status.state)
+        metrics.set_gauge("startup_ready_seconds", round(status.ready_seconds, 3))
+        print(f"[시작] RAG 초기화 {status.state}: 시작 후 {status.ready_seconds:.2f}초", flush=True)
+
+    threading.Thread(target=run, name="rag-init", daemon=True).start()
+    return status
+
+
+def record_first_paint():
+    # 프로세스의 첫 화면(채팅 화면과 입력창)이 모두 그려진 시점에 한 번만 기록합니다.
+    global _first_paint_recorded
+    with _first_paint_lock:
+        if _first_paint_recorded:
+            return
+        _first_paint_recorded = True
+    seconds = time.perf_counter() - STARTED_AT
+    metrics.set_gauge("startup_first_paint_seconds", round(seconds, 3))
+    print(f"[시작] 첫 화면 표시: 시작 후 {seconds:.2f}초", flush=True)
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+from typing import Any
+
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.document_loaders import TextLoader
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.vectorstores import FAISS
+from langchain.chains import RetrievalQA
+from langchain.prompts import PromptTemplate
+from langchain_core.retrievers import BaseRetriever
+
+import config
+from backends import embedding_model_name
+from chunk_store import MmapDocstore, chunk_id, chunk_store_exists, chunk_store_path, compact_vectorstore
+from reranker import RerankingRetriever
+from query_router import CategoryRoutedRetriever, category_id_map
+from vector_index import build_index, configure_search_params, scored_similarity_search
+
+# --- RAG 시스템 구성 요소 ---
+# app.py의 setup_rag와 벤치마크/배치 스크립트가 같은 파이프라인을 사용하도록 Streamlit과 분리해 둡니다.
+
+# 프롬프트 개선
+PROMPT_TEMPLATE = """
+당신은 한밭대학교의 공식 학칙, 이수 학점 체계, 장학금 규정, 학생생활관 관리운영 지침에 기반한 정보를 제공하는 전문 AI 챗봇입니다.  
+다음 원칙에 따라 사용자의 질문에 답변해주세요:
+
+1. **문서 기반 우선**  
+   제공된 공식 문서(학칙, 규정 등)에 명시된 내용만을 바탕으로 답변하는 것을 원칙으로 합니다. 문서에 존재하지 않는 내용은 임의로 추론하지 마세요.
+
+2. **출처 명시**  
+   문서 기반 정보에는 반드시 출처를 함께 제공해주세요. (예: “한밭대학교 학칙 제N조에 따르면” 등)
+
+3. **문서에 정보가 없는 경우의 대응**  
+   제공된 문서에서 관련 정보를 찾을 수 없는 경우, 다음 두 가지 중 하나를 선택합니다:
+   
+   - **(1) 질문이 학교 공식 정보와 직접적으로 관련 있을 경우:**  
+     최신 정보를 제공하기 위해 한밭대학교 공식 웹사이트 또는 신뢰 가능한 출처를 조건부로 검색해, 반드시 **출처를 명확히 밝힌 후** 안내합니다.  
+     (예: “한밭대학교 홈페이지에 따르면... (출처: https://홈페이지주소)”)
+
+   - **(2) 질문이 학교 공식 문서 또는 신뢰 가능한 출처 어디에도 없는 경우:**  
+     “죄송합니다. 제공된 문서 및 공개된 정보에서는 해당 내용을 찾을 수 없습니다. 관련 부서에 직접 문의하시는 것을 권장드립니다.” 라고 안내합니다.
+
+4. **어조와 형식**  
+   답변은 간결하고 정중하며, 이해하기 쉬운 자연스러운 한국어로 제공되어야 합니다.
+
+5. **언어**  
+   사용자가 한국어로 질문할 경우에는 한국어로, 외국어(예: 영어)로 질문할 경우에는 해당 언어로 답변해주세요. 
+   단, 응답의 정확성을 위해 항상 문서 기반 정보를 바탕으로 하며, 출처 표기는 한국어 또는 해당 언어로 적절히 표현합니다.
+
+---
+문서 내용:
+{context}
+
+---
+질문: {question}
+
+---
+답변:
+"""
+qa_chain_prompt = PromptTemplate(
+    input_variables=["context", "question"],
+    template=PROMPT_TEMPLATE,
+)
+
+
+def load_documents(doc_dir=None, file_names=None):
+    # (불러온 문서 목록, 찾을 수 없는 파일 목록, {로드 실패 파일: 예외}) 를 반환합니다.
+    doc_dir = doc_dir or config.DOC_DIR
+    file_names = file_names or config.DOC_FILES
+    documents = []
+    missing_files = []
+    failed_files = {}
+    for file_name in file_names:
+        file_path = os.path.join(doc_dir, file_name)
+        if not os.path.exists(file_path):
+            missing_files.append(file_name)
+            continue
+        try:
+            loader = TextLoader(file_path, encoding='utf-8')
+            documents.extend(loader.load())
+        except Exception as e:
+            failed_files[file_name] = e
+    return documents, missing_files, failed_files
+
+
+def split_documents(documents):
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=config.CHUNK_SIZE, chunk_overlap=config.CHUNK_OVERLAP,
+        length_function=len, add_start_index=True,
+    )
+    return text_splitter.split_documents(documents)
+
+
+def compute_index_version(documents, index_type=None):
+    # 문서 내용, 청크 설정, 임베딩 모델, 인덱스 종류가 같으면 같은 버전 문자열이 나옵니다.
+    # 저장된 인덱스 재사용 여부 판단 및 캐시 무효화 기준으로 사용합니다.
+    h = hashlib.sha256()
+    for doc in sorted(documents, key=lambda d: (d.metadata.get("source", ""), d.page_content)):
+        h.update(os.path.basename(doc.metadata.get("source", "")).encode("utf-8"))
+        h.update(doc.page_content.encode("utf-8"))
+    settings = [config.CHUNK_SIZE, config.CHUNK_OVERLAP, config.EMBEDDING_BACKEND, embedding_model_name(),
+                index_type or config.VECTOR_INDEX_TYPE]
+    h.update(json.dumps(settings).encode("utf-8"))
+    return h.hexdigest()[:12]
+
+
+def chunk_ids(texts):
+    # 청크마다 다시 만들어도 바뀌지 않는 docstore id (LangChain 기본값은 실행할 때마다 새 uuid)
+    return [chunk_id(t.metadata.get("source"), t.metadata.get("start_index"), i) for i, t in enumerate(texts)]
+
+
+def build_vectorstore(texts, embeddings_model, index_type=None):
+    index_type = index_type or config.VECTOR_INDEX_TYPE
+    if index_type == "flat":
+        return FAISS.from_documents(texts, embeddings_model, ids=chunk_ids(texts))
+    # 근사 인덱스는 벡터를 먼저 계산해 학습(train)한 뒤 LangChain 저장소에 추가합니다.
+    contents = [t.page_content for t in texts]
+    vectors = embeddings_model.embed_documents(contents)
+    index = build_index(vectors, index_type, add=False)
+    vectorstore = FAISS(embedding_function=embeddings_model, index=index,
+                        docstore=InMemoryDocstore(), index_to_docstore_id={})
+    vectorstore.add_embeddings(zip(contents, vectors), metadatas=[t.metadata for t in texts], ids=chunk_ids(texts))
+    return vectorstore
+
+
+def save_vectorstore(vectorstore, index_version, index_dir=None):
+    index_dir = index_dir or config.INDEX_DIR
+    vectorstore.save_local(index_dir)
+    if config.MEMORY_LEAN_MODE:
+        # 앱이 docstore pickle 대신 읽을 청크 저장소도 함께 만들어 둡니다. (pickle 저장 뒤에 변환)
+        compact_vectorstore(vectorstore, chunk_store_path(index_version))
+    with open(os.path.join(index_dir, "index_meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"index_version": index_version, "index_type": config.VECTOR_INDEX_TYPE,
+                   "embedding_model": embedding_model_name(), "chunks": vectorstore.index.ntotal}, f,
+                  ensure_ascii=False)
+
+
+def load_vectorstore(embeddings_model, index_version, index_dir=None):
+    # 오프라인으로 빌드해 둔 인덱스가 현재 문서/설정과 같은 버전일 때만 불러옵니다. 아니면 None
+    index_dir = index_dir or config.INDEX_DIR
+    meta_path = os.path.join(index_dir, "index_meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding="utf-8") as f:
+        if json.load(f).get("index_version") != index_version:
+            return None
+    if config.MEMORY_LEAN_MODE and chunk_store_exists(chunk_store_path(index_version)):
+        # 메모리 절약 모드: 청크 본문은 mmap 저장소에서 읽으므로 Document 객체가 담긴 pickle은 읽지 않습니다.
+        import faiss
+        index = faiss.read_index(os.path.join(index_dir, "index.faiss"))
+        docstore = MmapDocstore(chunk_store_path(index_version))
+        vectorstore = FAISS(embedding_function=embeddings_model, index=index, docstore=docstore,
+                            index_to_docstore_id=dict(enumerate(docstore.ids)))
+    else:
+        # 직접 빌드해 저장한 파일만 불러오므로 pickle 역직렬화를 허용합니다.
+        vectorstore = FAISS.load_local(index_dir, embeddings_model, allow_dangerous_deserialization=True)
+    configure_search_params(vectorstore.index)
+    return vectorstore
+
+
+def fetch_documents(vectorstore, ids):
+    # docstore id로 청크를 다시 찾습니다. 인덱스가 다시 만들어져 없어진 id는 건너뜁니다.
+    documents = (vectorstore.docstore.search(i) for i in ids)
+    return [d for d in documents if not isinstance(d, str)]
+
+
+class ScoredVectorRetriever(BaseRetriever):
+    # 기본 벡터 검색기. vectorstore.as_retriever()와 같은 결과에 검색 거리(vector_distance)를 함께 담아 돌려줍니다.
+    vectorstore: Any
+    k: int = 4
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        return scored_similarity_search(self.vectorstore, query, self.k)
+
+
+def build_retriever(vectorstore, k=None, reranker=None, router=None):
+    if router is not None:
+        # 질문 카테고리에 해당하는 문서 청크만 대상으로 검색합니다. (재순위화와 함께 사용 가능)
+        return CategoryRoutedRetriever(
+            vectorstore=vectorstore, router=router, ids_by_category=category_id_map(vectorstore),
+            k=k or (config.RERANK_TOP_N if reranker is not None else config.RETRIEVER_K),
+            reranker=reranker, fetch_k=config.RERANK_FETCH_K,
+        )
+    if reranker is not None:
+        # 후보를 넉넉히 가져와 재순위화한 뒤 상위 몇 개만 stuff 프롬프트에 넣습니다.
+        return RerankingRetriever(vectorstore=vectorstore, reranker=reranker,
+                                  fetch_k=config.RERANK_FETCH_K, top_n=k or config.RERANK_TOP_N)
+    return ScoredVectorRetriever(vectorstore=vectorstore, k=k or config.RETRIEVER_K)
+
+
+def build_qa_chain(llm_model, vectorstore, k=None, reranker=None, router=None):
+    retriever = build_retriever(vectorstore, k, reranker, router)
+    return RetrievalQA.from_chain_type(
+        llm=llm_model, chain_type="stuff", retriever=retriever,
+        chain_type_kwargs={"prompt": qa_chain_prompt},
+        return_source_documents=True
+    )
@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import deque
+
+import config
+import metrics
+
+# --- 요청 속도 제한 / LLM 사용량 관리 ---
+# 1) 클라이언트(세션)별 토큰 버킷: 한 사용자가 폼을 연타해도 분당 질문 수가 제한됩니다.
+# 2) 전역 거버너: 동시에 실행되는 LLM 호출 수와 최근 1분간 사용한(추정) 토큰 수를 제한합니다.
+#    여유가 없으면 잠시 대기열에서 기다리고, 대기 시간 안에 자리가 나지 않으면 요청을 거절(부하 차단)합니다.
+#    캐시된 답변은 거버너를 거치지 않으므로 예산이 바닥나도 계속 제공됩니다.
+
+
+class LLMOverloaded(RuntimeError):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate_per_sec, capacity):
+        self.rate = rate_per_sec
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, n=1):
+        self._refill(time.monotonic())
+        if self.tokens >= n:
+            self.tokens -= n
+            return True
+        return False
+
+    def retry_after(self, n=1):
+        # 토큰 n개가 다시 찰 때까지 남은 시간(초)
+        return max(0.0, (n - self.tokens) / self.rate)
+
+
+class RateLimiter:
+    # 클라이언트 키별 토큰 버킷. 오래 쓰지 않아 가득 찬 버킷은 주기적으로 정리합니다.
+    def __init__(self, per_minute=None, burst=None, max_keys=10000):
+        self.rate = (per_minute or config.RATE_LIMIT_PER_MINUTE) / 60.0
+        self.burst = burst or config.RATE_LIMIT_BURST
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._prune()
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+            allowed = bucket.try_acquire()
+        metrics.incr("rate_limit_allowed" if allowed else "rate_limit_rejected")
+        return allowed
+
+    def retry_after(self, key):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            return bucket.retry_after() if bucket else 0.0
+
+    def _prune(self):
+        now = time.monotonic()
+        for key, bucket in list(self._buckets.items()):
+            bucket._refill(now)
+            if bucket.tokens >= bucket.capacity:
+                del self._buckets[key]
+
+
+class LLMGovernor:
+    WINDOW_SECONDS = 60
+
+    def __init__(self, max_concurrency=None, tokens_per_minute=None, queue_timeout=None):
+        self.max_concurrency = max_concurrency or config.GOVERNOR_MAX_CONCURRENCY
+        self.tokens_per_minute = tokens_per_minute or config.GOVERNOR_TOKENS_PER_MINUTE
+        self.queue_timeout = config.GOVERNOR_QUEUE_TIMEOUT if queue_timeout is None else queue_timeout
+        self.in_flight = 0
+        self.reserved = 0 # 실행 중인 요청의 추정 토큰
+        self.used = 0 # 최근 1분간 완료된 요청의 토큰
+        self._usage = deque() # (완료 시각, 토큰)
+        self._cond = threading.Condition()
+
+    def _expire(self, now):
+        while self._usage and now - self._usage[0][0] >= self.WINDOW_SECONDS:
+            self.used -= self._usage.popleft()[1]
+
+    def _publish(self):
+        metrics.set_gauge("governor_in_flight", self.in_flight)
+        metrics.set_gauge("governor_tokens_last_minute", self.used + self.reserved)
+        metrics.set_gauge("governor_budget_remaining", max(0, self.tokens_per_minute - self.used - self.reserved))
+
+    def remaining(self):
+        with self._cond:
+            self._expire(time.monotonic())
+            return max(0, self.tokens_per_minute - self.used - self.reserved)
+
+    def acquire(self, estimated_tokens, timeout=None, reserve=0.0):
+        # 실행 자리와 토큰 예산이 생길 때까지 최대 timeout초 기다립니다. 얻지 못하면 False
+        # reserve: 예산 중 이 비율은 남겨 두고 들어옵니다. (백그라운드 작업이 실제 사용자 몫을 쓰지 않도록)
+        estimated_tokens = min(estimated_tokens, self.tokens_per_minute)
+        limit = self.tokens_per_minute * (1.0 - reserve)
+        deadline = time.monotonic() + (self.queue_timeout if timeout is None else timeout)
+        queued = False
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+                if self._has_room(estimated_tokens, limit):
+                    break
+                if now >= deadline:
+                    metrics.incr("governor_shed")
+                    self._publish()
+                    return False
+                if not queued:
+                    metrics.incr("governor_queued")
+                    queued = True
+                # 가장 오래된 사용 기록이 만료되거나 다른 요청이 끝나면 다시 확인합니다.
+                next_expiry = self._usage[0][0] + self.WINDOW_SECONDS - now if self._usage else deadline - now
+                self._cond.wait(max(0.01, min(deadline - now, next_expiry)))
+            self._admit(estimated_tokens)
+            return True
+
+    def try_acquire(self, estimated_tokens, reserve=0.0):
+        # 기다리지 않고 지금 자리와 예산이 있을 때만 들어옵니다. (헤지 요청처럼 없으면 생략해도 되는 호출용)
+        estimated_tokens = min(estimated_tokens, self.tokens_per_minute)
+        with self._cond:
+            self._expire(time.monotonic())
+            if not self._has_room(estimated_tokens, self.tokens_per_minute * (1.0 - reserve)):
+                return False
+            self._admit(estimated_tokens)
+            return True
+
+    def _has_room(self, estimated_tokens, limit):
+        return self.in_flight < self.max_concurrency and self.used + self.reserved + estimated_tokens <= limit
+
+    def _admit(self, estimated_tokens):
+        self.in_flight += 1
+        self.reserved += estimated_tokens
+        metrics.incr("governor_admitted")
+        self._publish()
+
+    def release(self, estimated_tokens, actual_tokens):
+        with self._cond:
+            self.in_flight -= 1
+            self.reserved -= min(estimated_tokens, self.tokens_per_minute)
+            self._usage.append((time.monotonic(), actual_tokens))
+            self.used += actual_tokens
+            metrics.incr("governor_tokens_used", actual_tokens)
+            self._publish()
+            self._cond.notify_all()
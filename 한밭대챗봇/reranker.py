@@ -0,0 +1,95 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+import config
+import metrics
+from text_utils import normalize_query
+from vector_index import scored_similarity_search
+
+# --- cross-encoder 재순위화 ---
+# 단일 벡터 검색(k=4)에서는 정답 조항이 5~10위로 밀려 "찾을 수 없습니다" 답변이 나오는 경우가 많아,
+# 후보를 넉넉히 가져온 뒤 (질문, 청크) 쌍을 함께 보는 cross-encoder로 다시 정렬합니다.
+#
+# 지연 예산: 재순위화는 RERANK_LATENCY_BUDGET_MS 안에서 끝나도록 설계합니다.
+#   - 캐시에 없는 쌍만 RERANK_BATCH_SIZE 단위로 묶어 한 번에 추론합니다.
+#   - 쌍당 처리 시간을 지수 이동 평균으로 추적해, 예산으로 처리 가능한 후보 수만큼만 재순위화합니다.
+#   - 기본 모델(MiniLM-L12, max_length 256) 기준 CPU 4코어에서 30쌍 ≈ 150~250ms 입니다.
+
+
+class CrossEncoderReranker:
+    def __init__(self, model, batch_size=None, cache_size=None):
+        self.model = model # sentence_transformers.CrossEncoder 호환 객체 (predict(pairs, batch_size) 제공)
+        self.batch_size = batch_size or config.RERANK_BATCH_SIZE
+        self.cache_size = config.RERANK_CACHE_SIZE if cache_size is None else cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.seconds_per_pair = None # 측정된 쌍당 추론 시간 (지수 이동 평균)
+
+    def _cache_key(self, query, content):
+        return hashlib.sha1((normalize_query(query) + "\x00" + content).encode("utf-8")).hexdigest()
+
+    def max_pairs_within(self, budget_ms):
+        # 예산 안에서 새로 추론할 수 있는 쌍 수. 아직 측정값이 없으면 제한하지 않습니다.
+        if not self.seconds_per_pair:
+            return None
+        return int(budget_ms / 1000 / self.seconds_per_pair)
+
+    def score(self, query, contents):
+        keys = [self._cache_key(query, c) for c in contents]
+        scores = [None] * len(contents)
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[i] = self._cache[key]
+        missing = [i for i, s in enumerate(scores) if s is None]
+        metrics.incr("rerank_cache_hits", len(contents) - len(missing))
+        if missing:
+            start = time.perf_counter()
+            predicted = self.model.predict([(query, contents[i]) for i in missing], batch_size=self.batch_size)
+            elapsed = time.perf_counter() - start
+            metrics.observe("rerank_inference", elapsed)
+            metrics.incr("rerank_pairs_scored", len(missing))
+            per_pair = elapsed / len(missing)
+            self.seconds_per_pair = per_pair if self.seconds_per_pair is None else 0.8 * self.seconds_per_pair + 0.2 * per_pair
+            with self._lock:
+                for i, s in zip(missing, predicted):
+                    scores[i] = float(s)
+                    self._cache[keys[i]] = float(s)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return scores
+
+    def rerank(self, query, documents, top_n=None, budget_ms=None):
+        top_n = top_n or config.RERANK_TOP_N
+        budget_ms = config.RERANK_LATENCY_BUDGET_MS if budget_ms is None else budget_ms
+        limit = self.max_pairs_within(budget_ms)
+        if limit is not None and limit < len(documents):
+            # 예산을 넘길 것으로 예상되면 벡터 검색 순위 상위 후보만 재순위화합니다.
+            metrics.incr("rerank_budget_truncations")
+            documents = documents[:max(limit, top_n)]
+        scores = self.score(query, [d.page_content for d in documents])
+        ranked = sorted(zip(documents, scores), key=lambda pair: pair[1], reverse=True)[:top_n]
+        # docstore의 원본 Document를 건드리지 않도록 복사본에 점수를 기록합니다.
+        # id는 유지해 디버그 화면에서 원본 청크를 다시 찾을 수 있게 합니다.
+        return [Document(id=d.id, page_content=d.page_content, metadata={**d.metadata, "rerank_score": s})
+                for d, s in ranked]
+
+
+class RerankingRetriever(BaseRetriever):
+    # 벡터 저장소에서 fetch_k개 후보를 가져와 재순위화한 뒤 top_n개를 돌려주는 LangChain 검색기
+    vectorstore: Any
+    reranker: Any
+    fetch_k: int = 30
+    top_n: int = 4
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        with metrics.timer("rerank_retrieval"):
+            candidates = scored_similarity_search(self.vectorstore, query, self.fetch_k)
+            return self.reranker.rerank(query, candidates, top_n=self.top_n)
@@ -0,0 +1,129 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import openai
+import requests
+
+import config
+import metrics
+
+# --- LLM 호출 안정화: 제한 시간 / 헤지 요청 / 회로 차단기 ---
+# qa_chain.invoke가 응답 없이 멈춰도 세션이 무한정 기다리지 않도록 호출마다 제한 시간을 둡니다.
+# 헤지 요청은 첫 호출이 hedge_after초 안에 끝나지 않으면 같은 호출을 하나 더 보내 먼저 끝난 결과를 씁니다.
+# (꼬리 지연은 줄지만 그만큼 LLM 호출이 늘어나므로 기본값은 꺼 두었습니다.)
+# 연속 실패가 쌓이면 회로 차단기가 열려 한동안 LLM을 부르지 않고 검색 결과 원문만 보여주는 저하 모드로 답합니다.
+
+
+class LLMTimeout(TimeoutError):
+    pass
+
+
+# 제한 시간이 지난 호출은 취소할 수 없으므로 별도 스레드 풀에서 실행하고 결과만 버립니다.
+# (백엔드 자체의 요청 제한 시간(LLM_REQUEST_TIMEOUT)이 남은 호출을 정리합니다.)
+# 버려진 호출이 자리를 차지해 새 호출이 풀 대기열에서 제한 시간을 다 쓰지 않도록 넉넉하게 둡니다.
+_executor = ThreadPoolExecutor(max_workers=config.LLM_CALL_WORKERS, thread_name_prefix="llm-call")
+
+
+def _submit(fn, on_done):
+    future = _executor.submit(fn)
+    if on_done is not None:
+        future.add_done_callback(on_done)
+    return future
+
+
+def call_with_deadline(fn, timeout=None, hedge_after=None, admit_hedge=None, on_done=None):
+    # on_done(future): 호출마다 그 호출이 실제로 끝날 때 한 번 불립니다. (제한 시간이 지나 결과를 버린 호출 포함)
+    # admit_hedge(): 헤지 요청을 보내기 전에 자리를 얻습니다. False를 돌려주면 헤지 없이 첫 호출만 기다립니다.
+    timeout = config.LLM_CALL_TIMEOUT if timeout is None else timeout
+    hedge_after = config.LLM_HEDGE_AFTER if hedge_after is None else hedge_after
+    deadline = time.monotonic() + timeout
+    first = _submit(fn, on_done)
+    pending = {first}
+    hedged = not hedge_after
+    last_error = None
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining if hedged else min(remaining, hedge_after),
+                             return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is not first:
+                    metrics.incr("llm_hedge_wins")
+                return future.result()
+            last_error = future.exception()
+        if not done and not hedged:
+            # 첫 호출이 느리면 같은 호출을 한 번 더 보내고, 둘 중 먼저 성공한 결과를 씁니다.
+            hedged = True
+            if admit_hedge is not None and not admit_hedge():
+                metrics.incr("llm_hedge_skipped")
+                continue
+            metrics.incr("llm_hedged")
+            pending.add(_submit(fn, on_done))
+        elif not pending:
+            raise last_error
+    metrics.incr("llm_timeouts")
+    raise LLMTimeout(f"LLM 응답이 {timeout:.0f}초 안에 오지 않았습니다.")
+
+
+def is_transient(error):
+    # 잠시 뒤에는 나아질 수 있는 상위 장애(제한 시간 초과, 연결 실패, 서버 5xx 오류)인지 판단합니다.
+    # 인증 오류, 잘못된 요청, 코드 오류 등은 저하 모드로 가리지 않고 그대로 알려야 합니다.
+    if isinstance(error, (TimeoutError, ConnectionError, openai.APIConnectionError, requests.ConnectionError,
+                          requests.Timeout)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return isinstance(status, int) and status >= 500
+
+
+class CircuitBreaker:
+    # closed(정상) → 연속 실패 failure_threshold회 → open(차단) → reset_timeout초 후 half_open(시험 호출 1회)
+    # 시험 호출이 성공하면 closed, 실패하면 다시 open
+    def __init__(self, failure_threshold=None, reset_timeout=None):
+        self.failure_threshold = failure_threshold or config.BREAKER_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or config.BREAKER_RESET_TIMEOUT
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._set_state("half_open")
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            metrics.incr("breaker_rejected")
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probe_in_flight = False
+            if self.state != "closed":
+                self._set_state("closed")
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                if self.state != "open":
+                    metrics.incr("breaker_trips")
+                self._set_state("open")
+
+    def release_probe(self):
+        # 시험 호출이 성공/실패 판정 없이 끝난 경우(예산 부족으로 거절 등) 다음 요청이 다시 시험할 수 있게 합니다.
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _set_state(self, state):
+        self.state = state
+        metrics.set_gauge("breaker_state", state)
@@ -0,0 +1,55 @@
+import threading
+
+import metrics
+
+# --- 동일 요청 합치기 (single-flight) ---
+# 공지 직후처럼 여러 학생이 같은 질문을 거의 동시에 보내면 답변 캐시는 아직 비어 있어 모두 LLM을 호출합니다.
+# 같은 키의 요청이 이미 진행 중이면 새로 계산하지 않고 그 결과(또는 예외)를 함께 받습니다.
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+            metrics.set_gauge("singleflight_in_flight", len(self._calls))
+
+        if not leader:
+            metrics.incr("singleflight_shared")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        metrics.incr("singleflight_leaders")
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                metrics.set_gauge("singleflight_in_flight", len(self._calls))
+            call.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,127 @@
+import sqlite3
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+import config
+from db_manager import init_db
+
+# --- 채팅 기록 저장소 ---
+# app.py는 세션/메시지 저장, 목록, 삭제를 이 인터페이스로만 다룹니다.
+# 기본은 단일 SQLite 파일이고, 여러 서버(레플리카)에서 같은 기록을 공유해야 하면
+# CHAT_STORE_BACKEND=postgres 로 서버 DB 구현(storage_postgres.py)을 사용합니다.
+
+DEFAULT_TITLE = "새로운 대화"
+TITLE_MAX_CHARS = 40
+
+
+def now_timestamp():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def session_title_from_question(question):
+    # 첫 질문의 첫 줄로 세션 제목을 만듭니다. (최대 40자)
+    first_line = question.split("\n")[0]
+    return first_line[:TITLE_MAX_CHARS] + ("..." if len(first_line) > TITLE_MAX_CHARS else "")
+
+
+class ChatStore(ABC):
+    # 구현체가 채워야 하는 메서드 목록. 빠진 메서드가 있으면 저장소를 만들 때 TypeError가 납니다.
+    # 반환 형식은 기존 SQL 조회 결과(튜플 목록)와 같습니다.
+    @abstractmethod
+    def create_session(self, session_id, title=DEFAULT_TITLE):
+        pass
+
+    @abstractmethod
+    def save_message(self, session_id, role, content, title=None, retrieval=None):
+        # 메시지 저장 + 세션 last_updated 갱신 (+ title이 있으면 제목 변경)을 한 트랜잭션으로 처리합니다.
+        # retrieval은 봇 답변의 검색 메타데이터 JSON 문자열입니다. (answer_metadata.encode_metadata)
+        pass
+
+    @abstractmethod
+    def load_messages(self, session_id):
+        # [(role, content, timestamp, retrieval), ...] 오래된 순
+        pass
+
+    @abstractmethod
+    def list_sessions(self, limit=None):
+        # [(session_id, title, start_time, last_updated), ...] 최근 갱신 순
+        pass
+
+    @abstractmethod
+    def delete_session(self, session_id):
+        pass
+
+    @abstractmethod
+    def search(self, query, limit=20):
+        # 세션 단위 검색 결과 [{"session_id", "title", "snippet", "timestamp", "matches"}, ...]
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteChatStore(ChatStore):
+    def __init__(self, db_name=None):
+        self.db_name = db_name or config.DB_NAME
+        init_db(self.db_name)
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL") # 읽기와 쓰기가 서로 막지 않도록 (DB 파일에 영구 적용)
+        conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_name, timeout=config.CHAT_STORE_BUSY_TIMEOUT)
+        return conn
+
+    def create_session(self, session_id, title=DEFAULT_TITLE):
+        timestamp = now_timestamp()
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT INTO chat_sessions (session_id, title, start_time, last_updated) VALUES (?, ?, ?, ?)",
+                         (session_id, title, timestamp, timestamp))
+        conn.close()
+
+    def save_message(self, session_id, role, content, title=None, retrieval=None):
+        timestamp = now_timestamp()
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT INTO chat_messages (session_id, role, content, timestamp, retrieval) VALUES (?, ?, ?, ?, ?)",
+                         (session_id, role, content, timestamp, retrieval))
+            conn.execute("UPDATE chat_sessions SET last_updated = ? WHERE session_id = ?", (timestamp, session_id))
+            if title is not None:
+                conn.execute("UPDATE chat_sessions SET title = ? WHERE session_id = ?", (title, session_id))
+        conn.close()
+
+    def load_messages(self, session_id):
+        conn = self._connect()
+        rows = conn.execute("SELECT role, content, timestamp, retrieval FROM chat_messages WHERE session_id = ? "
+                            "ORDER BY timestamp ASC, message_id ASC", (session_id,)).fetchall()
+        conn.close()
+        return rows
+
+    def list_sessions(self, limit=None):
+        conn = self._connect()
+        sql = "SELECT session_id, title, start_time, last_updated FROM chat_sessions ORDER BY last_updated DESC"
+        rows = conn.execute(sql + " LIMIT ?", (limit,)).fetchall() if limit else conn.execute(sql).fetchall()
+        conn.close()
+        return rows
+
+    def delete_session(self, session_id):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+        conn.close()
+
+    def search(self, query, limit=20):
+        from chat_search import search
+        return search(self.db_name, query, limit)
+
+
+def create_chat_store(backend=None):
+    backend = backend or config.CHAT_STORE_BACKEND
+    if backend == "sqlite":
+        return SQLiteChatStore()
+    if backend == "postgres":
+        from storage_postgres import PostgresChatStore
+        return PostgresChatStore(config.CHAT_STORE_DSN)
+    raise ValueError(f"지원하지 않는 채팅 기록 저장소입니다: {backend} (지원: sqlite, postgres)")
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+
+import config
+from chat_search import like_pattern, make_snippet
+from storage import DEFAULT_TITLE, ChatStore, now_timestamp
+
+# --- PostgreSQL 채팅 기록 저장소 ---
+# 여러 앱 서버(레플리카)가 같은 대화 기록을 공유할 때 사용합니다.
+# psycopg 3의 비동기 드라이버와 연결 풀(AsyncConnectionPool)을 전용 이벤트 루프 스레드에서 돌리고,
+# Streamlit 스크립트(동기 코드)에는 ChatStore와 같은 동기 메서드로 제공합니다.
+# 필요 패키지: pip install "psycopg[binary,pool]"
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS chat_sessions (
+        session_id TEXT PRIMARY KEY,
+        title TEXT,
+        start_time TEXT,
+        last_updated TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS chat_messages (
+        message_id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+        session_id TEXT REFERENCES chat_sessions(session_id) ON DELETE CASCADE,
+        role TEXT,
+        content TEXT,
+        timestamp TEXT,
+        retrieval TEXT
+    )''',
+    "ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS retrieval TEXT", # 이 열이 생기기 전에 만든 DB
+    "CREATE INDEX IF NOT EXISTS idx_chat_messages_session ON chat_messages(session_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_chat_sessions_updated ON chat_sessions(last_updated DESC)",
+]
+# 부분 문자열 검색(ILIKE)용 trigram 인덱스. 확장 설치 권한이 없으면 인덱스 없이 검색합니다.
+TRGM_SCHEMA = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS idx_chat_messages_content_trgm ON chat_messages USING gin (content gin_trgm_ops)",
+]
+
+
+def _require_psycopg():
+    try:
+        from psycopg_pool import AsyncConnectionPool
+    except ImportError as e:
+        raise RuntimeError('PostgreSQL 저장소를 사용하려면 `pip install "psycopg[binary,pool]"`가 필요합니다.') from e
+    return AsyncConnectionPool
+
+
+class PostgresChatStore(ChatStore):
+    def __init__(self, dsn, min_size=None, max_size=None):
+        AsyncConnectionPool = _require_psycopg()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="chat-store-loop", daemon=True)
+        self._thread.start()
+
+        async def open_pool():
+            pool = AsyncConnectionPool(dsn, min_size=min_size or config.CHAT_STORE_POOL_MIN,
+                                       max_size=max_size or config.CHAT_STORE_POOL_MAX, open=False)
+            await pool.open(wait=True, timeout=config.CHAT_STORE_TIMEOUT)
+            return pool
+
+        self.pool = self._run(open_pool())
+        self._run(self._init_schema())
+
+    def _run(self, coro):
+        # 동기 호출자 → 저장소 이벤트 루프에서 코루틴 실행 후 결과 대기
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout=config.CHAT_STORE_TIMEOUT)
+
+    async def _init_schema(self):
+        async with self.pool.connection() as conn:
+            for statement in SCHEMA:
+                await conn.execute(statement)
+        try:
+            async with self.pool.connection() as conn:
+                for statement in TRGM_SCHEMA:
+                    await conn.execute(statement)
+        except Exception:
+            pass
+
+    # --- 비동기 구현 ---
+
+    async def _create_session(self, session_id, title):
+        timestamp = now_timestamp()
+        async with self.pool.connection() as conn:
+            await conn.execute("INSERT INTO chat_sessions (session_id, title, start_time, last_updated) "
+                               "VALUES (%s, %s, %s, %s)", (session_id, title, timestamp, timestamp))
+
+    async def _save_message(self, session_id, role, content, title, retrieval):
+        timestamp = now_timestamp()
+        async with self.pool.connection() as conn:
+            async with conn.transaction():
+                await conn.execute("INSERT INTO chat_messages (session_id, role, content, timestamp, retrieval) "
+                                   "VALUES (%s, %s, %s, %s, %s)", (session_id, role, content, timestamp, retrieval))
+                await conn.execute("UPDATE chat_sessions SET last_updated = %s, title = COALESCE(%s, title) "
+                                   "WHERE session_id = %s", (timestamp, title, session_id))
+
+    async def _fetch(self, sql, params=()):
+        async with self.pool.connection() as conn:
+            cursor = await conn.execute(sql, params)
+            return await cursor.fetchall()
+
+    async def _delete_session(self, session_id):
+        async with self.pool.connection() as conn:
+            await conn.execute("DELETE FROM chat_sessions WHERE session_id = %s", (session_id,)) # 메시지는 CASCADE
+
+    # --- ChatStore (동기) ---
+
+    def create_session(self, session_id, title=DEFAULT_TITLE):
+        self._run(self._create_session(session_id, title))
+
+    def save_message(self, session_id, role, content, title=None, retrieval=None):
+        self._run(self._save_message(session_id, role, content, title, retrieval))
+
+    def load_messages(self, session_id):
+        return self._run(self._fetch("SELECT role, content, timestamp, retrieval FROM chat_messages WHERE session_id = %s "
+                                     "ORDER BY timestamp ASC, message_id ASC", (session_id,)))
+
+    def list_sessions(self, limit=None):
+        sql = "SELECT session_id, title, start_time, last_updated FROM chat_sessions ORDER BY last_updated DESC"
+        return self._run(self._fetch(sql + " LIMIT %s", (limit,)) if limit else self._fetch(sql))
+
+    def delete_session(self, session_id):
+        self._run(self._delete_session(session_id))
+
+    def search(self, query, limit=20):
+        # 모든 검색어를 포함하는 최근 메시지 / 제목을 세션 단위로 묶습니다. (SQLite FTS의 관련도 정렬 대신 최신순)
+        terms = [t for t in query.split() if t]
+        if not terms:
+            return []
+        patterns = [like_pattern(t) for t in terms]
+        title_rows = self._run(self._fetch(
+            "SELECT session_id, title, last_updated FROM chat_sessions WHERE "
+            + " AND ".join("title ILIKE %s" for _ in terms) + " ORDER BY last_updated DESC LIMIT %s",
+            (*patterns, limit)))
+        message_rows = self._run(self._fetch(
+            "SELECT m.session_id, s.title, m.content, m.timestamp FROM chat_messages m "
+            "JOIN chat_sessions s ON s.session_id = m.session_id WHERE "
+            + " AND ".join("m.content ILIKE %s" for _ in terms) + " ORDER BY m.message_id DESC LIMIT %s",
+            (*patterns, limit * 5)))
+        results = {}
+        for session_id, title, last_updated in title_rows:
+            results[session_id] = {"session_id": session_id, "title": title, "snippet": None,
+                                   "timestamp": last_updated, "matches": 0}
+        for session_id, title, content, timestamp in message_rows:
+            entry = results.setdefault(session_id, {"session_id": session_id, "title": title, "snippet": None,
+                                                    "timestamp": timestamp, "matches": 0})
+            entry["matches"] += 1
+            entry["snippet"] = entry["snippet"] or make_snippet(content, terms)
+        return list(results.values())[:limit]
+
+    def close(self):
+        self._run(self.pool.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 테스트에서 앱 모듈(config, rag_system 등)을 임포트할 수 있도록 경로를 추가합니다.
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
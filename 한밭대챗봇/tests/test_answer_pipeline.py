@@ -0,0 +1,170 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import config
+from answer_pipeline import AnswerPipeline
+from conversation import QueryCondenser
+from rate_limit import LLMGovernor, LLMOverloaded
+from resilience import CircuitBreaker, LLMTimeout
+
+
+class SlowChain:
+    # 호출마다 latency초 걸리는 가짜 QA 체인. 동시에 실행 중인 호출 수의 최댓값을 기록합니다.
+    def __init__(self, latency):
+        self.latency = latency
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, inputs):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            time.sleep(self.latency)
+            return {"query": inputs["query"], "result": "답변", "source_documents": []}
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+def ask(pipeline, query):
+    try:
+        return pipeline.answer(query, queue_timeout=0.1)
+    except (LLMTimeout, LLMOverloaded) as e:
+        return e
+
+
+def test_timed_out_calls_keep_governor_slot_until_finished(monkeypatch):
+    monkeypatch.setattr(config, "LLM_CALL_TIMEOUT", 0.3)
+    monkeypatch.setattr(config, "LLM_HEDGE_AFTER", 0.1)
+    chain = SlowChain(latency=1.0)
+    governor = LLMGovernor(max_concurrency=2, tokens_per_minute=10**9, queue_timeout=0.1)
+    pipeline = AnswerPipeline(chain, "v1", governor=governor, coalesce=False)
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        results = list(executor.map(lambda i: ask(pipeline, f"질문 {i}"), range(10)))
+
+    # 제한 시간이 지나 돌아온 호출도 끝날 때까지 자리를 차지하므로 동시에 실행되는 호출은 최대 자리 수까지만 늘어납니다.
+    assert chain.peak <= 2
+    assert sum(isinstance(r, LLMOverloaded) for r in results) >= 8
+    assert governor.in_flight == 2
+    time.sleep(1.2)
+    assert governor.in_flight == 0 and governor.reserved == 0
+
+
+def test_hedge_runs_only_with_free_slot(monkeypatch):
+    monkeypatch.setattr(config, "LLM_CALL_TIMEOUT", 2.0)
+    monkeypatch.setattr(config, "LLM_HEDGE_AFTER", 0.1)
+    chain = SlowChain(latency=0.3)
+    governor = LLMGovernor(max_concurrency=1, tokens_per_minute=10**9, queue_timeout=0.1)
+    pipeline = AnswerPipeline(chain, "v1", governor=governor, coalesce=False)
+
+    assert pipeline.answer("질문")["result"] == "답변"
+    assert chain.peak == 1 # 자리가 하나뿐이므로 헤지 요청을 보내지 않습니다.
+
+    governor = LLMGovernor(max_concurrency=2, tokens_per_minute=10**9, queue_timeout=0.1)
+    pipeline = AnswerPipeline(chain, "v1", governor=governor, coalesce=False)
+    assert pipeline.answer("질문")["result"] == "답변"
+    assert chain.peak == 2
+    time.sleep(0.5)
+    assert governor.in_flight == 0
+
+
+class FailingRetriever:
+    def invoke(self, query):
+        return []
+
+
+class FailingChain:
+    # 호출마다 주어진 예외를 일으키는 가짜 QA 체인
+    def __init__(self, error):
+        self.error = error
+        self.retriever = FailingRetriever()
+
+    def invoke(self, inputs):
+        raise self.error
+
+
+def test_transient_failures_degrade():
+    breaker = CircuitBreaker(failure_threshold=5)
+    pipeline = AnswerPipeline(FailingChain(ConnectionError("연결 실패")), "v1", coalesce=False, breaker=breaker)
+    assert pipeline.answer("질문")["degraded"]
+    assert breaker.failures == 1
+
+
+def test_other_failures_are_raised_and_do_not_trip_breaker():
+    breaker = CircuitBreaker(failure_threshold=2)
+    pipeline = AnswerPipeline(FailingChain(ValueError("버그")), "v1", coalesce=False, breaker=breaker)
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            pipeline.answer("질문")
+    assert breaker.state == "closed" and breaker.failures == 0
+
+    # 반 열림 상태의 시험 호출이 일시적이지 않은 오류로 끝나면 시험 자리만 돌려받습니다.
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.1)
+    pipeline = AnswerPipeline(FailingChain(ValueError("버그")), "v1", coalesce=False, breaker=breaker)
+    with pytest.raises(ValueError):
+        pipeline.answer("질문")
+    assert breaker.state == "half_open" and breaker.allow()
+
+
+def test_open_breaker_degrades_without_calling_llm():
+    breaker = CircuitBreaker(failure_threshold=1)
+    breaker.record_failure()
+    pipeline = AnswerPipeline(FailingChain(ValueError("버그")), "v1", coalesce=False, breaker=breaker)
+    assert pipeline.answer("질문")["degraded"]
+
+
+class SlowLLM:
+    def __init__(self, latency, content="기숙사 외박 신청 방법은?"):
+        self.latency = latency
+        self.content = content
+
+    def invoke(self, prompt):
+        time.sleep(self.latency)
+        if isinstance(self.content, Exception):
+            raise self.content
+        return self.content
+
+
+HISTORY = [("user", "기숙사 통금 시간 알려줘"), ("assistant", "생활관 통금은 ...")]
+
+
+def test_condense_uses_governor_and_falls_back(monkeypatch):
+    monkeypatch.setattr(config, "CONDENSE_TIMEOUT", 0.2)
+    governor = LLMGovernor(max_concurrency=1, tokens_per_minute=10**9, queue_timeout=0.1)
+    pipeline = AnswerPipeline(SlowChain(latency=0.0), "v1", governor=governor, coalesce=False)
+
+    assert pipeline.condense(QueryCondenser(SlowLLM(0.0)), HISTORY, "그럼 외박은?") == "기숙사 외박 신청 방법은?"
+    # 시간 초과 / 오류가 나면 원래 질문으로 검색합니다.
+    assert pipeline.condense(QueryCondenser(SlowLLM(1.0)), HISTORY, "그럼 외박은?") == "그럼 외박은?"
+    assert governor.in_flight == 1 # 버려진 호출은 끝날 때까지 자리를 차지합니다.
+    assert pipeline.condense(QueryCondenser(SlowLLM(0.0)), HISTORY, "그럼 외박은?") == "그럼 외박은?" # 자리 없음
+    time.sleep(1.0)
+    assert governor.in_flight == 0
+    llm = SlowLLM(0.0, content=RuntimeError("오류"))
+    assert pipeline.condense(QueryCondenser(llm), HISTORY, "그럼 외박은?") == "그럼 외박은?"
+
+
+def test_shed_half_open_probe_lets_breaker_close():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    governor = LLMGovernor(max_concurrency=1, tokens_per_minute=10**9, queue_timeout=0.05)
+    pipeline = AnswerPipeline(SlowChain(latency=0.0), "v1", governor=governor, coalesce=False, breaker=breaker)
+    time.sleep(0.1)
+
+    # 자리가 모두 차 있어 반 열림 상태의 시험 호출이 거절되어도 시험 자리는 돌려받습니다.
+    governor.acquire(1)
+    with pytest.raises(LLMOverloaded):
+        pipeline.answer("질문")
+    assert breaker.state == "half_open"
+    governor.release(1, 1)
+
+    assert pipeline.answer("질문")["result"] == "답변"
+    assert breaker.state == "closed"
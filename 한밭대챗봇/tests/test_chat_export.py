@@ -0,0 +1,47 @@
+import sqlite3
+
+from chat_export import export_chat, import_chat
+from db_manager import init_db
+
+
+def add_messages(path, messages):
+    conn = sqlite3.connect(str(path))
+    conn.execute("INSERT OR IGNORE INTO chat_sessions VALUES ('s1', '새로운 대화', '2026-10-01 09:00:00', "
+                 "'2026-10-01 09:00:00')")
+    conn.executemany("INSERT INTO chat_messages (session_id, role, content, timestamp) VALUES ('s1', ?, ?, ?)",
+                     messages)
+    conn.commit()
+    conn.close()
+
+
+def contents(path):
+    conn = sqlite3.connect(str(path))
+    try:
+        return [row[0] for row in conn.execute("SELECT content FROM chat_messages ORDER BY message_id")]
+    finally:
+        conn.close()
+
+
+def test_merge_keeps_identical_messages_and_skips_reimports(tmp_path):
+    source, target, out = tmp_path / "source.db", tmp_path / "target.db", str(tmp_path / "export")
+    init_db(str(source))
+    # 같은 초에 같은 내용을 두 번 보낸 경우도 서로 다른 메시지입니다.
+    add_messages(source, [("user", "안녕", "2026-10-01 09:00:00"), ("user", "안녕", "2026-10-01 09:00:00")])
+    export_chat(str(source), out)
+
+    assert import_chat(str(target), out)["messages_inserted"] == 2
+    assert import_chat(str(target), out)["messages_inserted"] == 0 # 같은 파일을 다시 가져와도 중복 없음
+
+    add_messages(source, [("assistant", "무엇을 도와드릴까요?", "2026-10-01 09:00:01")])
+    export_chat(str(source), out)
+    assert import_chat(str(target), out)["messages_inserted"] == 1
+    assert contents(target) == ["안녕", "안녕", "무엇을 도와드릴까요?"]
+
+
+def test_preserve_ids_then_merge_does_not_duplicate(tmp_path):
+    source, target, out = tmp_path / "source.db", tmp_path / "target.db", str(tmp_path / "export")
+    init_db(str(source))
+    add_messages(source, [("user", "기숙사 통금 시간", "2026-10-01 09:00:00")])
+    export_chat(str(source), out, fmt="parquet")
+    assert import_chat(str(target), out, preserve_ids=True)["messages_inserted"] == 1
+    assert import_chat(str(target), out)["messages_inserted"] == 0
@@ -0,0 +1,34 @@
+import sqlite3
+
+import chat_search
+from chat_search import search_messages
+from db_manager import init_db
+
+
+def make_db(path, contents):
+    init_db(str(path))
+    conn = sqlite3.connect(str(path))
+    conn.execute("INSERT INTO chat_sessions VALUES ('s1', '장학금 문의', '2026-10-01', '2026-10-01')")
+    conn.executemany("INSERT INTO chat_messages (session_id, role, content, timestamp) VALUES ('s1', 'user', ?, ?)",
+                     [(c, f"2026-10-01 00:{i // 60 % 60:02d}:{i % 60:02d}") for i, c in enumerate(contents)])
+    conn.commit()
+    return conn
+
+
+def test_ranks_over_all_matches(tmp_path):
+    # 가장 관련도가 높은 메시지가 최근 일치 메시지 1000개보다 오래되어도 맨 앞에 나와야 합니다.
+    best = "국가장학금 국가장학금 국가장학금"
+    filler = "국가장학금 신청 기간과 서류, 소득 분위 산정 방법, 지급 일정에 대한 긴 안내 문장입니다." * 3
+    conn = make_db(tmp_path / "chat.db", [best] + [filler] * 1500)
+    results = search_messages(conn, "국가장학금", limit=5)
+    assert len(results) == 5
+    assert results[0]["message_id"] == 1
+    assert [r["rank"] for r in results] == sorted(r["rank"] for r in results)
+    # 메시지 테이블 조건이 있어도 전체 일치 메시지에서 순위를 매깁니다.
+    assert search_messages(conn, "국가장학금", limit=5, role="user")[0]["message_id"] == 1
+
+
+def test_short_query_scans_only_recent_messages(tmp_path, monkeypatch):
+    monkeypatch.setattr(chat_search, "SHORT_QUERY_SCAN_ROWS", 10)
+    conn = make_db(tmp_path / "chat.db", ["휴학 문의"] + ["다른 질문"] * 20 + ["휴학 기간"])
+    assert [r["message_id"] for r in search_messages(conn, "휴학")] == [22]
@@ -0,0 +1,60 @@
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.llms.fake import FakeListLLM
+
+import config
+from answer_pipeline import AnswerPipeline
+from faq_table import build, generation_version, load_faq_table, start_faq_refresh
+from rag_system import build_qa_chain, build_vectorstore, fetch_documents, load_documents, split_documents
+
+
+def test_generation_version_tracks_retrieval_settings(monkeypatch):
+    version = generation_version()
+    for name, value in [("RERANK_TOP_N", 8), ("RERANK_FETCH_K", 50), ("VECTOR_INDEX_TYPE", "hnsw"),
+                        ("HNSW_EF_SEARCH", 128), ("IVF_NPROBE", 16)]:
+        with monkeypatch.context() as m:
+            m.setattr(config, name, value)
+            assert generation_version() != version, name
+    # FAQ 답변은 독립 질문으로 생성하므로 대화 맥락 설정은 답변을 무효로 만들지 않습니다.
+    for name, value in [("HISTORY_MAX_TURNS", 5), ("CONDENSE_MODEL", "gpt-4o-mini")]:
+        with monkeypatch.context() as m:
+            m.setattr(config, name, value)
+            assert generation_version() == version, name
+
+
+def test_faq_sources_resolve_in_rebuilt_index(tmp_path):
+    documents, _, _ = load_documents()
+    texts = split_documents(documents)
+    embeddings = DeterministicFakeEmbedding(size=64)
+    pipeline = AnswerPipeline(build_qa_chain(FakeListLLM(responses=["답변"]), build_vectorstore(texts, embeddings)),
+                              "v1", coalesce=False)
+    db_path = str(tmp_path / "faq.db")
+    assert build(pipeline, documents, ["기숙사 통금 시간 알려줘."], db_path, workers=1)["generated"] == 1
+
+    response = load_faq_table(documents, db_path).get("기숙사 통금 시간 알려줘")
+    saved = {d.id: d.page_content for d in response["source_documents"]}
+    rebuilt = build_vectorstore(texts, embeddings) # 앱이 다른 프로세스에서 다시 만든 인덱스
+    assert {d.id: d.page_content for d in fetch_documents(rebuilt, list(saved))} == saved
+
+
+def test_stale_answers_refresh_in_background(tmp_path, monkeypatch):
+    documents, _, _ = load_documents()
+    embeddings = DeterministicFakeEmbedding(size=64)
+    pipeline = AnswerPipeline(build_qa_chain(FakeListLLM(responses=["답변"]),
+                                             build_vectorstore(split_documents(documents), embeddings)),
+                              "v1", coalesce=False)
+    questions = tmp_path / "faq_questions.txt"
+    questions.write_text("기숙사 통금 시간 알려줘.\n", encoding="utf-8")
+    monkeypatch.setattr(config, "FAQ_QUESTIONS_PATH", str(questions))
+    db_path = str(tmp_path / "faq.db")
+    build(pipeline, documents, ["기숙사 통금 시간 알려줘."], db_path, workers=1)
+
+    # 답변에 쓰인 문서가 바뀌면 그 답변은 무효가 되고, 백그라운드 재생성이 끝나면 다시 표에서 답합니다.
+    source = load_faq_table(documents, db_path).get("기숙사 통금 시간 알려줘")["source_documents"][0].metadata["source"]
+    changed = [d.model_copy(update={"page_content": d.page_content + " (개정)"}) if d.metadata["source"] == source else d
+               for d in documents]
+    table = load_faq_table(changed, db_path)
+    assert table.stale == 1 and table.get("기숙사 통금 시간 알려줘") is None
+    pipeline.faq_table = table
+    start_faq_refresh(pipeline, changed, db_path).join(timeout=30)
+    assert pipeline.faq_table.stale == 0
+    assert pipeline.faq_table.get("기숙사 통금 시간 알려줘")["result"] == "답변"
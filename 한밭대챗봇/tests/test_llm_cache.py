@@ -0,0 +1,41 @@
+import pytest
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.llms.fake import FakeListLLM
+from langchain_core.globals import set_llm_cache
+
+import metrics
+from answer_pipeline import AnswerPipeline
+from llm_cache import install_llm_cache
+from rag_system import build_qa_chain, build_vectorstore, load_documents, split_documents
+from rate_limit import LLMGovernor, LLMOverloaded
+
+
+@pytest.fixture
+def llm_cache(tmp_path):
+    cache = install_llm_cache("v1", str(tmp_path / "llm_cache.db"))
+    yield cache
+    set_llm_cache(None)
+
+
+def test_cached_answers_skip_governor(llm_cache):
+    documents, _, _ = load_documents()
+    vectorstore = build_vectorstore(split_documents(documents), DeterministicFakeEmbedding(size=64))
+    governor = LLMGovernor(max_concurrency=1, tokens_per_minute=10**9, queue_timeout=0.1)
+    pipeline = AnswerPipeline(build_qa_chain(FakeListLLM(responses=["답변"]), vectorstore), "v1", governor=governor,
+                              coalesce=False, llm_cache=llm_cache)
+    assert pipeline.answer("기숙사 통금 시간")["result"] == "답변"
+    assert governor.in_flight == 0
+
+    # 자리가 모두 찬 상태에서도 캐시에 있는 답변은 바로 나가고, 자리 / 예산을 쓰지 않습니다.
+    assert governor.acquire(1)
+    admitted, hits = metrics.snapshot()["counters"].get("governor_admitted", 0), llm_cache_hits()
+    response = pipeline.answer("기숙사 통금 시간")
+    assert response["result"] == "답변" and response["source_documents"]
+    assert metrics.snapshot()["counters"].get("governor_admitted", 0) == admitted
+    assert llm_cache_hits() == hits + 1
+    with pytest.raises(LLMOverloaded):
+        pipeline.answer("국가장학금 신청 자격") # 캐시에 없는 질문은 자리를 기다리다 거절됩니다.
+
+
+def llm_cache_hits():
+    return metrics.snapshot()["counters"].get("llm_cache_hits", 0)
@@ -0,0 +1,48 @@
+import pytest
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+import config
+from chunk_store import chunk_store_path, compact_vectorstore
+from rag_system import (build_vectorstore, compute_index_version, fetch_documents, load_documents, load_vectorstore,
+                        save_vectorstore, split_documents)
+from vector_index import scored_similarity_search
+
+QUERIES = ["기숙사 외박 신청 방법", "국가장학금 신청 자격", "졸업 이수 학점"]
+
+
+def saved_chunks(vectorstore):
+    # 답변과 함께 저장되는 것과 같은 (청크 id, 원문) 목록
+    return {doc.id: doc.page_content for q in QUERIES for doc in scored_similarity_search(vectorstore, q, 4)}
+
+
+@pytest.fixture(scope="module")
+def texts():
+    documents, _, _ = load_documents()
+    return split_documents(documents)
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_rebuilt_index_resolves_saved_ids(texts, index_type):
+    embeddings = DeterministicFakeEmbedding(size=64)
+    saved = saved_chunks(build_vectorstore(texts, embeddings, index_type))
+
+    rebuilt = build_vectorstore(texts, embeddings, index_type) # 다른 프로세스에서 다시 만든 인덱스와 같은 상황
+    found = {doc.id: doc.page_content for doc in fetch_documents(rebuilt, list(saved))}
+    assert found == saved
+
+
+def test_saved_and_lean_index_resolve_saved_ids(texts, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CHUNK_STORE_DIR", str(tmp_path / "chunks"))
+    embeddings = DeterministicFakeEmbedding(size=64)
+    documents, _, _ = load_documents()
+    index_version = compute_index_version(documents, "flat")
+    saved = saved_chunks(build_vectorstore(texts, embeddings, "flat"))
+
+    save_vectorstore(build_vectorstore(texts, embeddings, "flat"), index_version, str(tmp_path / "index"))
+    loaded = load_vectorstore(embeddings, index_version, str(tmp_path / "index"))
+    assert {d.id: d.page_content for d in fetch_documents(loaded, list(saved))} == saved
+
+    # 메모리 절약 모드(mmap 청크 저장소)에서도 같은 id로 찾고, 검색 결과도 같은 id를 돌려줍니다.
+    lean = compact_vectorstore(loaded, chunk_store_path(index_version))
+    assert {d.id: d.page_content for d in fetch_documents(lean, list(saved))} == saved
+    assert saved_chunks(lean) == saved
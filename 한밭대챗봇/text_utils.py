@@ -0,0 +1,29 @@
+import re
+import unicodedata
+
+# --- 텍스트 처리 공통 함수 ---
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+_PUNCT_RE = re.compile(r"[?？!！.。,~]+$")
+
+
+def strip_html(text):
+    # 화면 표시용 HTML(참고 문서 목록 등)을 제거한 순수 텍스트를 돌려줍니다.
+    return _SPACE_RE.sub(" ", _TAG_RE.sub(" ", text or "")).strip()
+
+
+def normalize_query(text):
+    # 캐시 키 등에 쓰기 위한 질문 정규화: 유니코드 정규화, 소문자, 공백 정리, 끝 문장부호 제거
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = _SPACE_RE.sub(" ", text).strip()
+    return _PUNCT_RE.sub("", text).strip()
+
+
+def estimate_tokens(text):
+    # tiktoken 없이 쓰는 보수적인 토큰 수 추정치입니다.
+    # 한글은 대략 글자당 1토큰, 그 외(영문/숫자/공백)는 4글자당 1토큰으로 계산합니다.
+    if not text:
+        return 0
+    hangul = sum(1 for ch in text if "가" <= ch <= "힣")
+    return hangul + (len(text) - hangul + 3) // 4
@@ -0,0 +1,117 @@
+import math
+
+import numpy as np
+from langchain_core.documents import Document
+
+import config
+
+# --- FAISS 인덱스 종류 선택 ---
+# 문서가 수십만 청크로 늘어나면 정확 검색(Flat)은 질의마다 전체를 훑으므로,
+# 설정(VECTOR_INDEX_TYPE)에 따라 IVF/HNSW 근사 검색과 float16/int8/PQ 압축을 선택할 수 있게 합니다.
+# 거리 척도는 기존 LangChain FAISS 기본값과 같은 L2를 사용합니다.
+
+INDEX_TYPES = ("flat", "flat_fp16", "flat_int8", "ivf", "ivf_sq8", "ivf_pq", "hnsw", "hnsw_fp16", "hnsw_sq8")
+
+MIN_POINTS_PER_CENTROID = 39 # FAISS k-means가 권장하는 중심점당 최소 학습 벡터 수
+
+
+def auto_nlist(n_vectors):
+    # IVF 클러스터 수: 보통 4*sqrt(N)을 쓰되, 학습 데이터가 부족하지 않도록 제한합니다.
+    nlist = config.IVF_NLIST or int(4 * math.sqrt(max(n_vectors, 1)))
+    return max(1, min(nlist, n_vectors // MIN_POINTS_PER_CENTROID or 1))
+
+
+def _pq_spec(dim, n_vectors):
+    m = config.PQ_M
+    while m > 1 and dim % m:
+        m -= 1 # 차원을 나누어 떨어지게 하는 가장 가까운 서브벡터 수
+    # 코드북(2^nbits개 중심점)을 학습할 데이터가 부족하면 비트 수를 줄입니다.
+    nbits = max(1, min(8, int(math.log2(max(n_vectors // MIN_POINTS_PER_CENTROID, 2)))))
+    return f"PQ{m}x{nbits}"
+
+
+def factory_string(index_type, dim, n_vectors):
+    if index_type.startswith("factory:"):
+        return index_type.split(":", 1)[1]
+    nlist = auto_nlist(n_vectors)
+    hnsw_m = config.HNSW_M
+    specs = {
+        "flat": "Flat",
+        "flat_fp16": "SQfp16",
+        "flat_int8": "SQ8",
+        "ivf": f"IVF{nlist},Flat",
+        "ivf_sq8": f"IVF{nlist},SQ8",
+        "ivf_pq": f"IVF{nlist},{_pq_spec(dim, n_vectors)}",
+        "hnsw": f"HNSW{hnsw_m}",
+        "hnsw_fp16": f"HNSW{hnsw_m}_SQfp16",
+        "hnsw_sq8": f"HNSW{hnsw_m}_SQ8",
+    }
+    if index_type not in specs:
+        raise ValueError(f"지원하지 않는 인덱스 종류입니다: {index_type} (지원: {', '.join(INDEX_TYPES)})")
+    return specs[index_type]
+
+
+def configure_search_params(index, nprobe=None, ef_search=None):
+    # 저장된 인덱스를 불러온 뒤에도 현재 설정의 검색 파라미터가 적용되도록 합니다.
+    import faiss
+    try:
+        faiss.extract_index_ivf(index).nprobe = nprobe or config.IVF_NPROBE
+    except RuntimeError:
+        pass # IVF 계열이 아님
+    hnsw = getattr(faiss.downcast_index(index), "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = ef_search or config.HNSW_EF_SEARCH
+    return index
+
+
+def build_index(vectors, index_type=None, add=True):
+    # vectors: (N, dim) float32 행렬. 필요한 경우 학습(train)까지 마친 인덱스를 반환합니다.
+    # add=False이면 학습만 하고 벡터 추가는 호출자(LangChain FAISS.add_embeddings)에게 맡깁니다.
+    import faiss
+    index_type = index_type or config.VECTOR_INDEX_TYPE
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    n_vectors, dim = vectors.shape
+    index = faiss.index_factory(dim, factory_string(index_type, dim, n_vectors), faiss.METRIC_L2)
+    hnsw = getattr(faiss.downcast_index(index), "hnsw", None)
+    if hnsw is not None:
+        hnsw.efConstruction = config.HNSW_EF_CONSTRUCTION
+    if not index.is_trained:
+        index.train(vectors)
+    if add:
+        index.add(vectors)
+    return configure_search_params(index)
+
+
+def search_subset(index, query_vectors, k, allowed_ids):
+    # allowed_ids에 속한 벡터만 대상으로 검색합니다(사전 필터). 나머지 벡터는 거리 계산에서 제외됩니다.
+    # 현재 인덱스의 nprobe/efSearch 설정은 그대로 유지합니다.
+    import faiss
+    selector = faiss.IDSelectorBatch(np.ascontiguousarray(allowed_ids, dtype="int64"))
+    try:
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=faiss.extract_index_ivf(index).nprobe)
+    except RuntimeError:
+        hnsw = getattr(faiss.downcast_index(index), "hnsw", None)
+        if hnsw is not None:
+            params = faiss.SearchParametersHNSW(sel=selector, efSearch=hnsw.efSearch)
+        else:
+            params = faiss.SearchParameters(sel=selector)
+    query_vectors = np.ascontiguousarray(query_vectors, dtype="float32").reshape(-1, index.d)
+    return index.search(query_vectors, k, params=params)
+
+
+def with_distances(documents, distances):
+    # 검색 거리(L2, 작을수록 가까움)를 메타데이터(vector_distance)에 담은 복사본을 돌려줍니다.
+    # 답변과 함께 저장하는 검색 메타데이터에 쓰이며, docstore의 원본 Document는 바꾸지 않습니다.
+    return [Document(id=d.id, page_content=d.page_content, metadata={**d.metadata, "vector_distance": float(s)})
+            for d, s in zip(documents, distances)]
+
+
+def scored_similarity_search(vectorstore, query, k):
+    pairs = vectorstore.similarity_search_with_score(query, k=k)
+    return with_distances([d for d, _ in pairs], [s for _, s in pairs])
+
+
+def index_memory_bytes(index):
+    # 직렬화 크기로 인덱스가 차지하는 메모리를 근사합니다.
+    import faiss
+    return int(faiss.serialize_index(index).nbytes)
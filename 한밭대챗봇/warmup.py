@@ -0,0 +1,76 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import metrics
+from analytics import prewarm_questions
+from text_utils import normalize_query
+
+# --- 답변 캐시 사전 준비 (warm-up) ---
+# 배포 직후 첫 사용자들이 자주 묻는 질문에 대해 LLM 지연을 그대로 겪지 않도록,
+# setup_rag 이후 백그라운드 스레드에서 자주 묻는 질문을 미리 답변 파이프라인에 통과시켜
+# 답변 캐시와 질문 임베딩 캐시를 채웁니다. 동시 실행 수를 제한해 실제 사용자 요청과 경쟁을 줄이고,
+# 화면 스레드는 기다리지 않으므로 첫 사용자의 응답을 막지 않습니다.
+
+
+def warmup_questions(db_name=None, curated=None, mined_limit=None):
+    # 운영자가 정한 질문 + 채팅 기록 분석(analytics.py)에서 뽑은 자주 묻는 질문, 정규화 기준 중복 제거
+    questions = list(config.WARMUP_QUESTIONS if curated is None else curated)
+    try:
+        questions += prewarm_questions(db_name or config.DB_NAME, mined_limit)
+    except Exception:
+        pass # 분석 테이블을 읽지 못해도 운영자 목록만으로 진행합니다.
+    seen, unique = set(), []
+    for q in questions:
+        key = normalize_query(q)
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(q)
+    return unique
+
+
+class WarmupStatus:
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.finished = total == 0
+        self._lock = threading.Lock()
+
+    def record(self, ok):
+        with self._lock:
+            self.done += 1
+            self.failed += 0 if ok else 1
+            metrics.set_gauge("warmup_done", self.done)
+
+    @property
+    def progress(self):
+        return self.done / self.total if self.total else 1.0
+
+
+def start_warmup(pipeline, questions, concurrency=None):
+    # 백그라운드에서 사전 준비를 시작하고 진행 상태 객체를 바로 돌려줍니다.
+    status = WarmupStatus(len(questions))
+    metrics.set_gauge("warmup_total", len(questions))
+    if not questions:
+        return status
+
+    def warm(question):
+        if pipeline.answer_cache is not None and question in pipeline.answer_cache:
+            status.record(True)
+            return
+        try:
+            # 사용자 몫의 LLM 예산을 쓰지 않도록 대기하지 않고, 예산이 충분히 남아 있을 때만 실행합니다.
+            pipeline.answer(question, queue_timeout=0, budget_reserve=config.GOVERNOR_BACKGROUND_RESERVE)
+            status.record(True)
+        except Exception:
+            status.record(False) # 실패한 질문은 실제 사용자가 물을 때 다시 시도됩니다.
+
+    def run():
+        with ThreadPoolExecutor(max_workers=concurrency or config.WARMUP_CONCURRENCY,
+                                thread_name_prefix="warmup") as executor:
+            list(executor.map(warm, questions))
+        status.finished = True
+
+    threading.Thread(target=run, name="answer-warmup", daemon=True).start()
+    return status